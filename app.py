@@ -3,17 +3,76 @@ LockTracker - With User Accounts
 A web app to track your sports bets with user authentication via Supabase.
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, Response
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, Response, send_from_directory, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from supabase import create_client
-from datetime import datetime, timedelta
+from markupsafe import Markup
+from datetime import datetime, timedelta, timezone
 from functools import wraps
+from collections import OrderedDict
+import importlib
 import os
-import stripe
 import csv
+import gzip
+import hashlib
 import io
+import json
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import threading
+import time
+
+from archive import archived_months, delete_user_archive, read_archived_bets, read_month
+import bet_files
+import downsample
+from cache import make_cache
+from local_cache import LocalBetCache
+from resilience import GuardedTransport, Remote, RemoteUnavailable, http_failure
+from search import TrigramIndex, escape_like, search_terms
+import simulate
+from singleflight import SingleFlight
+
+try:
+    import brotli  # optional - gzip is used when it isn't installed
+except ImportError:
+    brotli = None
+
+try:
+    import orjson  # optional - the standard json module is used when it isn't installed
+except ImportError:
+    orjson = None
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through orjson, several times faster on the analytics payloads.
+    Dates and anything else orjson doesn't know go through Flask's own
+    default(), and keys are sorted like the standard provider sorts them, so
+    responses decode the same - only non-ASCII text is sent as UTF-8 rather
+    than \\u escapes. Options orjson can't do (other indents or separators,
+    a custom encoder) go to the standard provider."""
+
+    # orjson's own output is compact, i.e. separators=(',', ':')
+    ORJSON_KWARGS = {'default', 'indent', 'sort_keys', 'separators', 'ensure_ascii'}
+
+    def dumps(self, obj, **kwargs):
+        if (set(kwargs) - self.ORJSON_KWARGS or kwargs.get('indent') not in (None, 0, 2)
+                or kwargs.get('separators') not in (None, (',', ':'))):
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+if orjson:
+    app.json = FastJSONProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'bet-tracker-dev-key-change-in-production')
 
 # Enable CORS for API routes (so extension can communicate)
@@ -24,31 +83,281 @@ SUPABASE_URL = os.environ.get('SUPABASE_URL')
 SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
 SUPABASE_SERVICE_KEY = os.environ.get('SUPABASE_SERVICE_KEY')
 
-if not all([SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_KEY]):
-    raise ValueError("Missing Supabase environment variables. Set SUPABASE_URL, SUPABASE_KEY, and SUPABASE_SERVICE_KEY.")
-
-# Public client for auth
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-# Service client for server-side operations (bypasses RLS)
-supabase_admin = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-
 # Stripe configuration
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
 STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
 STRIPE_PRICE_ID = os.environ.get('STRIPE_PRICE_ID')  # Pro subscription price ID
 
-if STRIPE_SECRET_KEY:
-    stripe.api_key = STRIPE_SECRET_KEY
-else:
-    print("WARNING: STRIPE_SECRET_KEY not set. Stripe payments will not work.")
+# ==============================================
+# CLIENTS
+# ==============================================
+# The supabase and stripe packages take ~2s to import and the clients hold
+# connection pools that must not be shared across a fork. Both are set up on
+# first use instead of at import, once per process, so the module can be
+# imported without secrets and `gunicorn --preload` forks cleanly.
+
+class LazyClient:
+    """A Supabase client created on first use in each process, sending its
+    requests through `remote` (see resilience.py)"""
+
+    def __init__(self, key_name, remote):
+        self._key_name = key_name
+        self._remote = remote
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    url, key = SUPABASE_URL, os.environ.get(self._key_name)
+                    if not url or not key:
+                        raise ValueError("Missing Supabase environment variables. Set SUPABASE_URL, SUPABASE_KEY, and SUPABASE_SERVICE_KEY.")
+                    import httpx
+                    from supabase import create_client
+                    from supabase.lib.client_options import SyncClientOptions
+                    http = httpx.Client(
+                        transport=GuardedTransport(self._remote, httpx.HTTPTransport(http2=True)),
+                        follow_redirects=True,
+                        timeout=SUPABASE_TIMEOUT_SECONDS
+                    )
+                    self._client = create_client(url, key, options=SyncClientOptions(httpx_client=http))
+                    self._pid = os.getpid()
+        return self._client
+
+    def reset(self):
+        self._client = None
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+class AuthClients:
+    """A fresh auth client for every auth call, all sharing one connection pool.
+
+    An auth client keeps the session it signed in, so with one shared client
+    two logins running at once (gevent, gthread) could hand each other's
+    session back. Each call gets its own client, which only ever holds its
+    own session and is dropped afterwards; the HTTP connections behind them
+    are shared and reused, one pool per process."""
+
+    def __init__(self, key_name):
+        self._key_name = key_name
+        self._http = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def http_client(self):
+        if self._http is None or self._pid != os.getpid():
+            with self._lock:
+                if self._http is None or self._pid != os.getpid():
+                    import httpx
+                    # Same settings the auth library uses for its own client
+                    self._http = httpx.Client(
+                        transport=GuardedTransport(auth_remote, httpx.HTTPTransport(http2=True)),
+                        follow_redirects=True,
+                        timeout=AUTH_TIMEOUT_SECONDS
+                    )
+                    self._pid = os.getpid()
+        return self._http
+
+    def new(self):
+        key = os.environ.get(self._key_name)
+        if not SUPABASE_URL or not key:
+            raise ValueError("Missing Supabase environment variables. Set SUPABASE_URL, SUPABASE_KEY, and SUPABASE_SERVICE_KEY.")
+        from supabase_auth import SyncGoTrueClient, SyncMemoryStorage
+        return SyncGoTrueClient(
+            url=f"{SUPABASE_URL.rstrip('/')}/auth/v1",
+            headers={'apiKey': key, 'Authorization': f'Bearer {key}'},
+            storage=SyncMemoryStorage(),
+            auto_refresh_token=False,  # no refresh timer thread per login
+            persist_session=False,
+            http_client=self.http_client()
+        )
+
+    def reset(self):
+        self._http = None
+
+class LazyModule:
+    """A module imported the first time one of its attributes is used"""
+
+    def __init__(self, name, on_import=None):
+        self._name = name
+        self._on_import = on_import
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            module = importlib.import_module(self._name)
+            if self._on_import:
+                self._on_import(module)
+            self._module = module
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+def configure_stripe(module):
+    if STRIPE_SECRET_KEY:
+        module.api_key = STRIPE_SECRET_KEY
+    # Stripe retries failed requests itself, with idempotency keys, so even
+    # creates are safe to retry; stripe_remote only adds the breaker
+    module.max_network_retries = STRIPE_MAX_RETRIES
+    module.default_http_client = module.new_default_http_client(timeout=STRIPE_TIMEOUT_SECONDS)
+
+def stripe_failure(e):
+    """Stripe being unreachable or erroring on its side (not a declined card)"""
+    return isinstance(e, (stripe.error.APIConnectionError, stripe.error.APIError))
+
+# How long one remote call may take in all, retries included (see
+# resilience.py). Batch scripts raise the Supabase deadline and the
+# per-attempt timeout with
+# supabase_remote.deadline(BATCH_DEADLINE_SECONDS, BATCH_TIMEOUT_SECONDS).
+SUPABASE_DEADLINE_SECONDS = float(os.environ.get('SUPABASE_DEADLINE_SECONDS', 8))
+SUPABASE_TIMEOUT_SECONDS = 5   # one attempt; the library default is 120
+BATCH_DEADLINE_SECONDS = 60
+BATCH_TIMEOUT_SECONDS = 30     # one attempt, leaving time for a retry
+AUTH_TIMEOUT_SECONDS = 10
+STRIPE_TIMEOUT_SECONDS = 20
+STRIPE_MAX_RETRIES = 2
+
+supabase_remote = Remote('supabase', deadline=SUPABASE_DEADLINE_SECONDS, is_failure=http_failure)
+auth_remote = Remote('auth', deadline=AUTH_TIMEOUT_SECONDS, is_failure=http_failure)
+stripe_remote = Remote('stripe', deadline=STRIPE_TIMEOUT_SECONDS, retries=0, is_failure=stripe_failure)
+
+# Auth calls (sign up/in/out, get_user) - see AuthClients
+auth_clients = AuthClients('SUPABASE_KEY')
+# Service client for server-side operations (bypasses RLS)
+supabase_admin = LazyClient('SUPABASE_SERVICE_KEY', supabase_remote)
+stripe = LazyModule('stripe', on_import=configure_stripe)
+
+def create_app():
+    """Check configuration and return the app (gunicorn entry point).
+
+    With `--preload` this runs once in the gunicorn master: it imports the
+    heavy client libraries there so forked workers share them, but leaves
+    client construction to init_worker() in each worker."""
+    if not all([SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_KEY]):
+        raise ValueError("Missing Supabase environment variables. Set SUPABASE_URL, SUPABASE_KEY, and SUPABASE_SERVICE_KEY.")
+    if not STRIPE_SECRET_KEY:
+        print("WARNING: STRIPE_SECRET_KEY not set. Stripe payments will not work.")
+
+    importlib.import_module('supabase')
+    stripe.load()
+    return app
+
+def init_worker():
+    """Build this process's clients and job thread (gunicorn post_fork hook)"""
+    auth_clients.reset()
+    supabase_admin.reset()
+    auth_clients.http_client()
+    supabase_admin.get()
+    start_background_worker()
 
 # Free tier limit
 FREE_TIER_MONTHLY_LIMIT = 15
 
+# Columns each view reads from bets (PostgREST select lists)
+BET_LIST_COLUMNS = 'id,sport,matchup,bet_type,bet_description,odds,amount,result,profit,sportsbook'
+STATS_COLUMNS = 'result,amount,profit'
+CATEGORY_COLUMNS = 'sport,bet_type,result,profit'
+ANALYTICS_COLUMNS = 'date,sport,bet_type,result,profit'
+EXPORT_COLUMNS = 'date,sport,matchup,bet_type,bet_description,odds,amount,result,profit,sportsbook,created_at'
+
+# Stripe webhook events are retried this many times before being marked failed
+MAX_WEBHOOK_ATTEMPTS = 5
+# A claimed event not finished within this long is handed back on recovery
+STRIPE_CLAIM_LEASE_MINUTES = 5
+
+# Max rendered dashboard fragments kept in memory per worker
+FRAGMENT_CACHE_SIZE = 512
+
+# Responses smaller than this aren't worth compressing
+COMPRESS_MIN_SIZE = 500
+COMPRESS_MIMETYPES = ['text/html', 'application/json']
+
+# Optional local SQLite cache of users' bets (see local_cache.py).
+# Set LOCAL_CACHE_PATH to enable it, e.g. /tmp/locktracker-bets.db
+LOCAL_CACHE_PATH = os.environ.get('LOCAL_CACHE_PATH')
+LOCAL_CACHE_MAX_USERS = int(os.environ.get('LOCAL_CACHE_MAX_USERS', 200))
+# How often a cached user is checked for bets added elsewhere
+LOCAL_CACHE_REFRESH_SECONDS = 15
+
+bet_cache = LocalBetCache(LOCAL_CACHE_PATH, max_users=LOCAL_CACHE_MAX_USERS) if LOCAL_CACHE_PATH else None
+
+# Shared cache for tier, stats and analytics lookups (see cache.py).
+# memory:// (default), file:///path/cache.db or redis://host:6379/0
+CACHE_URL = os.environ.get('CACHE_URL', 'memory://')
+CACHE_TTL_SECONDS = 60
+
+cache = make_cache(CACHE_URL)
+# Last good values kept for when Supabase is unreachable (see cached())
+STALE_TTL_SECONDS = 3600
+fallback_counts = {}  # name -> times a stale value was served
+
+# Identical reads running at the same moment in a worker share one query
+# (see singleflight.py); counts are served at /api/admin/metrics
+flights = SingleFlight()
+
+# Live dashboard updates (Server-Sent Events)
+SSE_POLL_SECONDS = 1          # how often each worker checks for new events
+SSE_HEARTBEAT_SECONDS = 15    # keeps proxies from closing idle streams
+SSE_STREAM_SECONDS = 300      # streams end after this; EventSource reconnects
+SSE_EVENT_TTL_SECONDS = 300
+
+# How long the extension may reuse a handshake before asking again
+HANDSHAKE_TTL_SECONDS = 300
+
+# Emails allowed to see operator reporting (comma-separated)
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()}
+
+# Cold storage for old settled bets (see archive.py). Leave ARCHIVE_DIR unset
+# to keep every bet in Supabase.
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR')
+ARCHIVE_HORIZON_DAYS = int(os.environ.get('ARCHIVE_HORIZON_DAYS', 365))
+
+# Account deletion removes bets this many rows at a time
+ACCOUNT_DELETE_CHUNK_SIZE = 500
+MAX_ACCOUNT_DELETE_ATTEMPTS = 5
+# A running deletion whose claim isn't renewed for this long is taken over
+ACCOUNT_DELETE_LEASE_MINUTES = 10
+
+# Bet search (see search.py)
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 200
+SEARCH_COLUMNS = 'id,date,sport,matchup,bet_type,bet_description,odds,amount,result,profit,sportsbook,created_at'
+# Users whose search index each worker keeps in memory (local cache only)
+SEARCH_INDEX_MAX_USERS = 20
+
+# Login prefetch: queries each worker runs at once to warm caches, and how
+# many logins may wait for them before further logins skip the prefetch
+PREFETCH_CONCURRENCY = 4
+PREFETCH_MAX_PENDING = 32
+# The range the dashboard charts load first (loadCharts in index.html)
+DEFAULT_ANALYTICS_DAYS = 30
+# Bounds on /api/analytics?points= (see downsample_analytics)
+ANALYTICS_MIN_POINTS = 10
+ANALYTICS_MAX_POINTS = 2000
+
+# Bankroll simulation (see simulate.py): processes each worker runs them on,
+# the defaults and limits for one request, and how few bets are too few
+SIMULATION_PROCESSES = int(os.environ.get('SIMULATION_PROCESSES', 2))
+SIMULATION_PATHS = 10000
+SIMULATION_MAX_PATHS = 50000
+SIMULATION_BETS = 500
+SIMULATION_MAX_BETS = 2000
+SIMULATION_MAX_CELLS = 20_000_000  # paths x bets
+SIMULATION_MIN_BETS = 20
+SIMULATION_TIMEOUT_SECONDS = 10
+SIMULATION_COLUMNS = 'sport,odds,amount,result'
+
 # ==============================================
 # AUTHENTICATION HELPERS
 # ==============================================
 
+# Shown instead of "invalid password" when Supabase Auth can't be reached
+SIGN_IN_UNAVAILABLE = 'Sign-in is temporarily unavailable. Please try again in a minute.'
+
 def login_required(f):
     """Decorator to require login for routes"""
     @wraps(f)
@@ -58,6 +367,17 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def admin_required(f):
+    """Decorator for operator-only JSON endpoints (emails in ADMIN_EMAILS)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user' not in session:
+            return jsonify({'error': 'Not logged in'}), 401
+        if (session['user'].get('email') or '').lower() not in ADMIN_EMAILS:
+            return jsonify({'error': 'Forbidden'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
 def get_current_user():
     """Get the current logged-in user from session"""
     return session.get('user')
@@ -77,7 +397,7 @@ def signup():
             return render_template('signup.html', error='Email and password are required.')
 
         try:
-            response = supabase.auth.sign_up({
+            response = auth_clients.new().sign_up({
                 'email': email,
                 'password': password
             })
@@ -94,6 +414,9 @@ def signup():
             else:
                 return render_template('signup.html', error='Signup failed. Please try again.')
 
+        except RemoteUnavailable as e:
+            print(f"Signup error: {e}")
+            return render_template('signup.html', error=SIGN_IN_UNAVAILABLE)
         except Exception as e:
             error_msg = str(e)
             if 'already registered' in error_msg.lower():
@@ -113,7 +436,7 @@ def login():
             return render_template('login.html', error='Email and password are required.')
 
         try:
-            response = supabase.auth.sign_in_with_password({
+            response = auth_clients.new().sign_in_with_password({
                 'email': email,
                 'password': password
             })
@@ -124,10 +447,15 @@ def login():
                     'email': response.user.email
                 }
                 session['access_token'] = response.session.access_token
+                # Warm the dashboard's data while the redirect is in flight
+                prefetch_user(response.user.id, response.session.access_token)
                 return redirect(url_for('dashboard'))
             else:
                 return render_template('login.html', error='Invalid email or password.')
 
+        except RemoteUnavailable as e:
+            print(f"Login error: {e}")
+            return render_template('login.html', error=SIGN_IN_UNAVAILABLE)
         except Exception as e:
             return render_template('login.html', error='Invalid email or password.')
 
@@ -137,7 +465,9 @@ def login():
 def logout():
     """Logout"""
     try:
-        supabase.auth.sign_out()
+        if 'access_token' in session:
+            # Ends this user's session, not whichever one a shared client last held
+            auth_clients.new().admin.sign_out(session['access_token'])
     except:
         pass
     session.clear()
@@ -158,7 +488,7 @@ def forgot_password():
             redirect_url = f"{base_url}/reset-password"
 
             # Send password reset email via Supabase
-            supabase.auth.reset_password_for_email(
+            auth_clients.new().reset_password_for_email(
                 email,
                 {"redirect_to": redirect_url}
             )
@@ -189,7 +519,7 @@ def resend_verification():
     """Resend email verification"""
     user = get_current_user()
     try:
-        supabase.auth.resend(type='signup', email=user['email'])
+        auth_clients.new().resend(type='signup', email=user['email'])
         return jsonify({'success': True, 'message': 'Verification email sent!'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -201,15 +531,7 @@ def settings():
     user = get_current_user()
     tier = get_user_tier(user['id'])
 
-    # Check email confirmation
-    email_confirmed = True
-    try:
-        if 'access_token' in session:
-            user_response = supabase.auth.get_user(session['access_token'])
-            if user_response and user_response.user:
-                email_confirmed = user_response.user.email_confirmed_at is not None
-    except:
-        pass
+    email_confirmed = get_email_confirmed(user['id'], session.get('access_token'))
 
     return render_template('settings.html', user=user, tier=tier, email_confirmed=email_confirmed)
 
@@ -227,8 +549,13 @@ def import_csv():
         if file.filename == '':
             return render_template('import_csv.html', user=user, error='No file selected')
 
-        if not file.filename.endswith('.csv'):
-            return render_template('import_csv.html', user=user, error='Please upload a CSV file')
+        extension = os.path.splitext(file.filename.lower())[1]
+        if extension in bet_files.IMPORT_EXTENSIONS:
+            return import_bet_file(user, file, bet_files.IMPORT_EXTENSIONS[extension])
+
+        if extension != '.csv':
+            return render_template('import_csv.html', user=user,
+                                   error='Please upload a CSV, NDJSON, Parquet or Arrow file')
 
         try:
             # Read CSV
@@ -278,6 +605,10 @@ def import_csv():
                 except Exception as e:
                     errors.append(f"Row {i+2}: {str(e)}")
 
+            if imported:
+                invalidate_user_cache(user['id'])
+                notify_bets_changed(user['id'], 'bet-added', {'count': imported})
+
             message = f'Successfully imported {imported} bets.'
             if errors:
                 message += f' {len(errors)} rows had errors.'
@@ -289,6 +620,46 @@ def import_csv():
 
     return render_template('import_csv.html', user=user)
 
+IMPORT_INSERT_SIZE = 500
+
+def import_bet_file(user, file, fmt):
+    """Bulk import from NDJSON/Parquet/Arrow: a batch of rows is checked at
+    once and inserted IMPORT_INSERT_SIZE rows per request"""
+    if not bet_files.available(fmt):
+        return render_template('import_csv.html', user=user,
+                               error=f'{fmt.title()} import needs pyarrow installed on the server')
+
+    imported = 0
+    rejected = 0
+    errors = []
+    first_row = 1
+    try:
+        for rows, bad in bet_files.read_import(file.stream, fmt, datetime.now().strftime('%Y-%m-%d'), calculate_profit):
+            rejected += bad
+            for row in rows:
+                row['user_id'] = user['id']
+            for i in range(0, len(rows), IMPORT_INSERT_SIZE):
+                chunk = rows[i:i + IMPORT_INSERT_SIZE]
+                try:
+                    supabase_admin.table('bets').insert(chunk).execute()
+                    imported += len(chunk)
+                except Exception as e:
+                    errors.append(f"Rows {first_row + i}-{first_row + i + len(chunk) - 1}: {str(e)}")
+            first_row += len(rows) + bad
+    except Exception as e:
+        errors.append(f"Stopped at row {first_row}: {str(e)}")
+
+    if imported:
+        invalidate_user_cache(user['id'])
+        notify_bets_changed(user['id'], 'bet-added', {'count': imported})
+
+    message = f'Successfully imported {imported} bets.'
+    if rejected:
+        message += f' {rejected} rows had invalid dates, odds or amounts and were skipped.'
+    if errors:
+        message += f' {len(errors)} batches had errors.'
+    return render_template('import_csv.html', user=user, success=True, message=message, errors=errors[:5])
+
 # ==============================================
 # HELPER FUNCTIONS
 # ==============================================
@@ -305,40 +676,168 @@ def calculate_profit(odds, amount, result):
     else:  # pending or push
         return 0
 
-def get_user_bets(user_id):
-    """Get all bets for a user"""
+def refresh_local_cache(user_id):
+    """Bring the local cache up to date for a user.
+
+    The first read copies the user's whole history; after that only rows
+    created since the last copy are fetched, at most every
+    LOCAL_CACHE_REFRESH_SECONDS. Our own writes invalidate the user instead.
+    archive.py deletes rows this can't see go, and may run on another host,
+    so the history is copied again whenever the user's archive version has
+    moved on since the last full copy.
+    A write invalidating the user while this copies makes it give up (and
+    the caller read Supabase directly) rather than keep what it read."""
+    generation = bet_cache.generation(user_id)
+    state = bet_cache.sync_state(user_id)
+    if state and time.time() - state[1] < LOCAL_CACHE_REFRESH_SECONDS:
+        bet_cache.touch(user_id)
+        return
+
+    def sync():
+        # Read before the bets, so a compaction in between triggers another reload
+        archive_version = get_archive_version(user_id)
+        if state is None or state[0] is None or archive_version != state[2]:
+            response = supabase_admin.table('bets').select('*').eq('user_id', user_id).execute()
+            stored = bet_cache.load(user_id, response.data, archive_version=archive_version, generation=generation)
+        else:
+            response = supabase_admin.table('bets').select('*').eq('user_id', user_id).gt('created_at', state[0]).execute()
+            stored = bet_cache.add(user_id, response.data, generation=generation)
+        if not stored:
+            raise RuntimeError(f"Bets for {user_id} changed while copying them")
+
+    # Requests arriving together wait for one copy instead of each fetching
+    try:
+        flights.do(('bets_sync', user_id), sync)
+    except RemoteUnavailable as e:
+        if state is None or state[0] is None:
+            raise
+        # Already copied once - the bets we have beat no bets at all
+        print(f"Serving cached bets for {user_id}: {e}")
+        fallback_counts['bets'] = fallback_counts.get('bets', 0) + 1
+
+def get_user_bets(user_id, columns='*', status=None, start_date=None, end_date=None):
+    """Get a user's bets, newest first.
+
+    columns: PostgREST select list - ask only for what the caller uses
+    status: 'pending', 'settled', or one result ('win', 'loss', 'push')
+    start_date / end_date: inclusive bounds on the bet date
+    Filters are sent to Supabase, so only matching rows come back."""
+    if bet_cache:
+        try:
+            refresh_local_cache(user_id)
+            return bet_cache.get_bets(user_id, status=status, start_date=start_date, end_date=end_date,
+                                      columns=None if columns == '*' else columns.split(','))
+        except Exception as e:
+            print(f"Local cache error, reading from Supabase: {e}")
+
+    def fetch():
+        query = supabase_admin.table('bets').select(columns).eq('user_id', user_id)
+        if status == 'settled':
+            query = query.neq('result', 'pending')
+        elif status:
+            query = query.eq('result', status)
+        if start_date:
+            query = query.gte('date', start_date)
+        if end_date:
+            query = query.lte('date', end_date)
+        return query.order('created_at', desc=True).execute().data
+
     try:
-        response = supabase_admin.table('bets').select('*').eq('user_id', user_id).order('created_at', desc=True).execute()
-        return response.data
+        return flights.do(('user_bets', user_id, columns, status, start_date, end_date), fetch)
+    except RemoteUnavailable:
+        # Let cached() serve its stale copy rather than caching no bets
+        raise
     except Exception as e:
-        print(f"Error fetching bets: {e}")
+        app.logger.warning("Error fetching bets for %s: %s", user_id, e)
         return []
 
 def get_monthly_bet_count(user_id):
     """Count how many bets user has added this month"""
-    try:
-        # Get first day of current month
-        today = datetime.now()
-        first_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    # Get first day of current month
+    today = datetime.now()
+    first_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
+    def count():
         response = supabase_admin.table('bets').select('id', count='exact').eq('user_id', user_id).gte('created_at', first_of_month.isoformat()).execute()
         return response.count or 0
+
+    try:
+        # Every bet write invalidates the user's cache, so this stays exact
+        return cached(user_id, f"monthly_count:{first_of_month.strftime('%Y-%m')}", count)
     except Exception as e:
         print(f"Error counting monthly bets: {e}")
         return 0
 
+def cached(user_id, name, compute, ttl=CACHE_TTL_SECONDS):
+    """Return compute() through the cache, in the user's namespace.
+    If the cache backend is unreachable the value is just computed.
+
+    Each computed value is also kept as a stale copy outside the namespace
+    for STALE_TTL_SECONDS. When compute() fails because Supabase can't be
+    reached, the stale copy is returned instead of an error."""
+    try:
+        key = cache.user_key(user_id, name)
+    except Exception as e:
+        print(f"Cache unavailable: {e}")
+        return compute()
+
+    stale_key = f'stale:{user_id}:{name}'
+
+    def compute_and_keep():
+        value = compute()
+        try:
+            cache.set(stale_key, value, STALE_TTL_SECONDS)
+        except Exception as e:
+            print(f"Cache unavailable: {e}")
+        return value
+
+    try:
+        return cache.get_or_set(key, compute_and_keep, ttl)
+    except RemoteUnavailable as e:
+        stale = cache.get(stale_key)
+        if stale is None:
+            raise
+        print(f"Serving stale {name} for {user_id}: {e}")
+        kind = name.split(':')[0]  # 'analytics:30:...' counts as analytics
+        fallback_counts[kind] = fallback_counts.get(kind, 0) + 1
+        return stale
+
 def get_user_tier(user_id):
     """Check if user is on free or paid tier"""
-    try:
+    def lookup():
         # Check subscriptions table for active subscription
         response = supabase_admin.table('subscriptions').select('*').eq('user_id', user_id).eq('status', 'active').execute()
-        if response.data and len(response.data) > 0:
-            return 'paid'
+        return 'paid' if response.data else 'free'
+
+    try:
+        return cached(user_id, 'tier', lambda: flights.do(('tier', user_id), lookup))
     except Exception as e:
         # Table might not exist yet, that's ok
         print(f"Error checking subscription: {e}")
     return 'free'
 
+def get_email_confirmed(user_id, access_token):
+    """Whether the user has confirmed their email (True if we can't tell)"""
+    if not access_token:
+        return True
+
+    def lookup():
+        user_response = auth_clients.new().get_user(access_token)
+        if user_response and user_response.user:
+            return user_response.user.email_confirmed_at is not None
+        return True
+
+    try:
+        return cached(user_id, 'email_confirmed', lookup)
+    except Exception:
+        return True  # If we can't check, assume confirmed
+
+def record_quota_hit(user_id, source):
+    """Log that the free tier limit turned a user away (for the nightly rollup)"""
+    def insert():
+        supabase_admin.table('quota_hits').insert({'user_id': user_id, 'source': source}).execute()
+    enqueue_job(insert)
+
 def can_add_bets(user_id, count=1):
     """Check if user can add more bets based on their tier"""
     tier = get_user_tier(user_id)
@@ -350,12 +849,92 @@ def can_add_bets(user_id, count=1):
     can_add = remaining >= count
     return can_add, FREE_TIER_MONTHLY_LIMIT, monthly_count
 
+def get_settled_bets(user_id, columns='*', start_date=None, end_date=None):
+    """Get a user's settled bets, optionally between two dates (inclusive)"""
+    return get_user_bets(user_id, columns, status='settled', start_date=start_date, end_date=end_date)
+
+def get_result_totals(user_id):
+    """Count, amount wagered and profit of settled bets, grouped by result"""
+    if bet_cache:
+        try:
+            refresh_local_cache(user_id)
+            rows = bet_cache.query(
+                "SELECT result, COUNT(*) AS count, SUM(amount) AS wagered, SUM(profit) AS profit "
+                "FROM bets WHERE user_id = ? AND result != 'pending' GROUP BY result", (user_id,))
+            return add_archived_totals(user_id, {row['result']: row for row in rows})
+        except Exception as e:
+            print(f"Local cache error, reading from Supabase: {e}")
+
+    totals = {}
+    for bet in get_settled_bets(user_id, STATS_COLUMNS):
+        if bet['result'] not in totals:
+            totals[bet['result']] = {'count': 0, 'wagered': 0, 'profit': 0}
+        totals[bet['result']]['count'] += 1
+        totals[bet['result']]['wagered'] += bet['amount']
+        totals[bet['result']]['profit'] += bet['profit']
+    return add_archived_totals(user_id, totals)
+
+def get_archive_version(user_id):
+    """When the user's archived months last changed (the newest
+    bet_month_summaries row), or None if they have none"""
+    if not ARCHIVE_DIR:
+        return None
+    response = (supabase_admin.table('bet_month_summaries').select('created_at').eq('user_id', user_id)
+                .order('created_at', desc=True).limit(1).execute())
+    return response.data[0]['created_at'] if response.data else None
+
+def get_archived_summaries(user_id, start_date=None, end_date=None):
+    """Monthly totals of the user's archived bets (see archive.py), shaped
+    like settled bets dated the 1st of the month, with a `count`.
+    A month can't be split by day, so only months lying wholly inside the
+    date range are included."""
+    if not ARCHIVE_DIR:
+        return []
+
+    def lookup():
+        response = supabase_admin.table('bet_month_summaries').select('month,sport,bet_type,result,bet_count,wagered,profit').eq('user_id', user_id).execute()
+        return [{
+            'date': row['month'],
+            'sport': row['sport'],
+            'bet_type': row['bet_type'],
+            'result': row['result'],
+            'count': row['bet_count'],
+            'amount': float(row['wagered']),
+            'profit': float(row['profit'])
+        } for row in response.data]
+
+    try:
+        summaries = cached(user_id, 'archived', lookup)
+    except Exception as e:
+        print(f"Error loading archived summaries: {e}")
+        return []
+    if start_date:
+        summaries = [s for s in summaries if s['date'] >= start_date]
+    if end_date:
+        summaries = [s for s in summaries if month_end(s['date']) <= end_date]
+    return summaries
+
+def month_end(first_day):
+    """Last day (YYYY-MM-DD) of the month starting on `first_day`"""
+    day = datetime.strptime(first_day[:10], '%Y-%m-%d')
+    return ((day + timedelta(days=32)).replace(day=1) - timedelta(days=1)).strftime('%Y-%m-%d')
+
+def add_archived_totals(user_id, totals):
+    """Fold archived months into per-result totals"""
+    for summary in get_archived_summaries(user_id):
+        entry = totals.setdefault(summary['result'], {'count': 0, 'wagered': 0, 'profit': 0})
+        entry['count'] += summary['count']
+        entry['wagered'] += summary['amount']
+        entry['profit'] += summary['profit']
+    return totals
+
 def get_stats(user_id):
     """Calculate overall betting stats for a user"""
-    bets = get_user_bets(user_id)
-    settled_bets = [b for b in bets if b['result'] != 'pending']
+    return cached(user_id, 'stats', lambda: calculate_stats(get_result_totals(user_id)))
 
-    if not settled_bets:
+def calculate_stats(totals):
+    """Turn per-result totals into the stats shown on the dashboard"""
+    if not totals:
         return {
             'total_bets': 0,
             'wins': 0,
@@ -367,17 +946,17 @@ def get_stats(user_id):
             'roi': 0
         }
 
-    wins = sum(1 for b in settled_bets if b['result'] == 'win')
-    losses = sum(1 for b in settled_bets if b['result'] == 'loss')
-    pushes = sum(1 for b in settled_bets if b['result'] == 'push')
-    total_wagered = sum(b['amount'] for b in settled_bets)
-    total_profit = sum(b['profit'] for b in settled_bets)
+    wins = totals.get('win', {}).get('count', 0)
+    losses = totals.get('loss', {}).get('count', 0)
+    pushes = totals.get('push', {}).get('count', 0)
+    total_wagered = sum(t['wagered'] for t in totals.values())
+    total_profit = sum(t['profit'] for t in totals.values())
 
     win_rate = (wins / (wins + losses) * 100) if (wins + losses) > 0 else 0
     roi = (total_profit / total_wagered * 100) if total_wagered > 0 else 0
 
     return {
-        'total_bets': len(settled_bets),
+        'total_bets': sum(t['count'] for t in totals.values()),
         'wins': wins,
         'losses': losses,
         'pushes': pushes,
@@ -387,38 +966,475 @@ def get_stats(user_id):
         'roi': round(roi, 1)
     }
 
+def get_category_totals(user_id, column):
+    """Profit, count and wins of settled bets grouped by sport or bet_type (local cache only)"""
+    rows = bet_cache.query(
+        f"SELECT {column} AS name, SUM(profit) AS profit, COUNT(*) AS count, SUM(result = 'win') AS wins "
+        f"FROM bets WHERE user_id = ? AND result != 'pending' GROUP BY {column} ORDER BY MAX(created_at) DESC", (user_id,))
+    return {row['name']: {'profit': row['profit'], 'count': row['count'], 'wins': row['wins']} for row in rows}
+
 def get_stats_by_category(user_id):
     """Get profit breakdown by sport and bet type"""
-    bets = get_user_bets(user_id)
-    settled_bets = [b for b in bets if b['result'] != 'pending']
+    return cached(user_id, 'categories', lambda: calculate_stats_by_category(user_id))
+
+def calculate_stats_by_category(user_id):
+    if bet_cache:
+        try:
+            refresh_local_cache(user_id)
+            by_sport = get_category_totals(user_id, 'sport')
+            by_bet_type = get_category_totals(user_id, 'bet_type')
+            for summary in get_archived_summaries(user_id):
+                for totals, name in ((by_sport, summary['sport']), (by_bet_type, summary['bet_type'])):
+                    entry = totals.setdefault(name, {'profit': 0, 'count': 0, 'wins': 0})
+                    entry['profit'] += summary['profit']
+                    entry['count'] += summary['count']
+                    if summary['result'] == 'win':
+                        entry['wins'] += summary['count']
+            return {
+                'by_sport': by_sport,
+                'by_bet_type': by_bet_type
+            }
+        except Exception as e:
+            print(f"Local cache error, reading from Supabase: {e}")
+
+    # Archived months come last, like the oldest bets would
+    settled_bets = get_settled_bets(user_id, CATEGORY_COLUMNS) + get_archived_summaries(user_id)
 
     # By sport
     sports = {}
     for bet in settled_bets:
         sport = bet['sport']
+        count = bet.get('count', 1)
         if sport not in sports:
             sports[sport] = {'profit': 0, 'count': 0, 'wins': 0}
         sports[sport]['profit'] += bet['profit']
-        sports[sport]['count'] += 1
+        sports[sport]['count'] += count
         if bet['result'] == 'win':
-            sports[sport]['wins'] += 1
+            sports[sport]['wins'] += count
 
     # By bet type
     bet_types = {}
     for bet in settled_bets:
         bt = bet['bet_type']
+        count = bet.get('count', 1)
         if bt not in bet_types:
             bet_types[bt] = {'profit': 0, 'count': 0, 'wins': 0}
         bet_types[bt]['profit'] += bet['profit']
-        bet_types[bt]['count'] += 1
+        bet_types[bt]['count'] += count
         if bet['result'] == 'win':
-            bet_types[bt]['wins'] += 1
+            bet_types[bt]['wins'] += count
 
     return {
         'by_sport': sports,
         'by_bet_type': bet_types
     }
 
+# ==============================================
+# BACKGROUND JOBS
+# ==============================================
+# Work that shouldn't hold up a request (webhooks, account deletion) goes on a
+# queue that a single daemon thread drains in FIFO order. The thread is started
+# lazily so each gunicorn worker gets its own after forking. Functions in
+# recovery_jobs run first on every new thread to resume work a crashed or
+# restarted worker left behind.
+
+background_jobs = queue.Queue()
+recovery_jobs = []
+_background_worker = None
+_background_worker_pid = None
+_background_lock = threading.Lock()
+
+def start_background_worker():
+    """Start the job thread for this process if it isn't running"""
+    global _background_worker, _background_worker_pid
+    with _background_lock:
+        if _background_worker and _background_worker.is_alive() and _background_worker_pid == os.getpid():
+            return
+        _background_worker = threading.Thread(target=_run_background_jobs, name='locktracker-jobs', daemon=True)
+        _background_worker_pid = os.getpid()
+        _background_worker.start()
+        for recover in recovery_jobs:
+            background_jobs.put((recover, ()))
+
+def enqueue_job(func, *args):
+    """Run func(*args) on the background thread"""
+    start_background_worker()
+    background_jobs.put((func, args))
+
+def enqueue_job_later(delay, func, *args):
+    """Queue a job after `delay` seconds (used for retries)"""
+    timer = threading.Timer(delay, enqueue_job, args=(func,) + args)
+    timer.daemon = True
+    timer.start()
+
+def _run_background_jobs():
+    while True:
+        func, args = background_jobs.get()
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"Background job {func.__name__} failed: {e}")
+        finally:
+            background_jobs.task_done()
+
+# ==============================================
+# LOGIN PREFETCH
+# ==============================================
+# login() hands the user to prefetch_user() before redirecting, so the
+# dashboard's queries are already running (or done) when it asks for them.
+# Everything lands where the dashboard looks: the shared cache for tier,
+# quota, stats, categories, analytics and the email check, and the local
+# cache for bets. Without a local cache there's nowhere to keep the bets,
+# so they're left for the dashboard to read.
+# This has its own small pool rather than the job queue, so warming never
+# waits behind (or delays) webhooks and deletions.
+
+_prefetch_pool = None
+_prefetch_pool_pid = None
+_prefetch_lock = threading.Lock()
+_prefetch_slots = threading.BoundedSemaphore(PREFETCH_MAX_PENDING)
+_prefetching = set()
+prefetch_counts = {'started': 0, 'skipped_busy': 0, 'skipped_duplicate': 0, 'failed': 0}
+
+def get_prefetch_pool():
+    global _prefetch_pool, _prefetch_pool_pid
+    with _prefetch_lock:
+        if _prefetch_pool is None or _prefetch_pool_pid != os.getpid():
+            _prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_CONCURRENCY, thread_name_prefix='locktracker-prefetch')
+            _prefetch_pool_pid = os.getpid()
+    return _prefetch_pool
+
+def prefetch_user(user_id, access_token=None):
+    """Start warming everything the dashboard reads for a user.
+    Returns False (and does nothing) if this user is already being warmed or
+    PREFETCH_MAX_PENDING logins are waiting - under a login storm dashboards
+    just start cold instead of piling more queries onto Supabase."""
+    with _prefetch_lock:
+        if user_id in _prefetching:
+            prefetch_counts['skipped_duplicate'] += 1
+            return False
+        if not _prefetch_slots.acquire(blocking=False):
+            prefetch_counts['skipped_busy'] += 1
+            return False
+        _prefetching.add(user_id)
+        prefetch_counts['started'] += 1
+
+    tasks = [
+        ('tier', lambda: get_user_tier(user_id)),
+        ('quota', lambda: get_monthly_bet_count(user_id)),
+        ('stats', lambda: get_stats(user_id)),
+        ('categories', lambda: get_stats_by_category(user_id)),
+        ('analytics', lambda: get_analytics(user_id, DEFAULT_ANALYTICS_DAYS)),
+        ('email', lambda: get_email_confirmed(user_id, access_token)),
+    ]
+    if bet_cache:
+        # Without the local cache the bet list isn't kept anywhere, so
+        # reading it now would only be thrown away
+        tasks.insert(0, ('bets', lambda: refresh_local_cache(user_id)))
+    remaining = [len(tasks)]
+
+    def run(name, task):
+        try:
+            task()
+        except Exception as e:
+            print(f"Prefetch {name} failed: {e}")
+            with _prefetch_lock:
+                prefetch_counts['failed'] += 1
+        finally:
+            with _prefetch_lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    _prefetching.discard(user_id)
+                    _prefetch_slots.release()
+
+    pool = get_prefetch_pool()
+    for name, task in tasks:
+        pool.submit(run, name, task)
+    return True
+
+# ==============================================
+# DASHBOARD FRAGMENT CACHE
+# ==============================================
+# The stat cards, category cards and bet lists on the dashboard only change
+# when the user's bets change, so their rendered HTML is cached per user and
+# data version. Writes call invalidate_user_cache() to drop the user's entries.
+
+DASHBOARD_FRAGMENTS = {
+    'stat_cards': 'partials/stat_cards.html',
+    'category_breakdown': 'partials/category_breakdown.html',
+    'pending_bets': 'partials/pending_bets.html',
+    'bet_history': 'partials/bet_history.html',
+}
+
+_fragment_cache = OrderedDict()
+_fragment_cache_lock = threading.Lock()
+
+def get_bets_version(bets):
+    """Short fingerprint of a bet list - changes whenever any shown field does"""
+    digest = hashlib.sha1()
+    for bet in bets:
+        digest.update(repr((
+            bet.get('id'), bet.get('result'), bet.get('profit'), bet.get('odds'),
+            bet.get('amount'), bet.get('sport'), bet.get('matchup'),
+            bet.get('bet_description'), bet.get('sportsbook'), bet.get('bet_type')
+        )).encode())
+    return digest.hexdigest()[:16]
+
+def render_fragment(user_id, version, name, **context):
+    """Render one dashboard fragment, or return it from the cache"""
+    key = (user_id, version, name)
+    with _fragment_cache_lock:
+        if key in _fragment_cache:
+            _fragment_cache.move_to_end(key)
+            return _fragment_cache[key]
+
+    html = Markup(render_template(DASHBOARD_FRAGMENTS[name], **context))
+
+    with _fragment_cache_lock:
+        _fragment_cache[key] = html
+        while len(_fragment_cache) > FRAGMENT_CACHE_SIZE:
+            _fragment_cache.popitem(last=False)
+    return html
+
+def render_dashboard_fragments(user_id, bets, pending_bets, stats, category_stats):
+    """All cached dashboard fragments for a user, keyed by fragment name"""
+    version = get_bets_version(bets)
+    # Stats can come from the shared cache, so key their cards on the numbers themselves
+    stats_version = hashlib.sha1(json.dumps([stats, category_stats], sort_keys=True).encode()).hexdigest()[:16]
+    return {
+        'stat_cards': render_fragment(user_id, stats_version, 'stat_cards', stats=stats),
+        'category_breakdown': render_fragment(user_id, stats_version, 'category_breakdown', category_stats=category_stats),
+        'pending_bets': render_fragment(user_id, version, 'pending_bets', pending_bets=pending_bets),
+        'bet_history': render_fragment(user_id, version, 'bet_history', bets=bets),
+    }
+
+def invalidate_user_cache(user_id):
+    """Forget everything cached for a user (call after writing their bets)"""
+    with _fragment_cache_lock:
+        for key in [k for k in _fragment_cache if k[0] == user_id]:
+            del _fragment_cache[key]
+    if bet_cache:
+        try:
+            bet_cache.invalidate(user_id)
+        except Exception as e:
+            print(f"Error invalidating local cache: {e}")
+    try:
+        cache.invalidate_user(user_id)
+    except Exception as e:
+        print(f"Error invalidating cache: {e}")
+
+# ==============================================
+# LIVE UPDATES (SERVER-SENT EVENTS)
+# ==============================================
+# Writes publish small events into the shared cache under a per-user sequence
+# number. Each worker runs one poller thread that checks the sequence for
+# users with an open stream and hands new events to their streams, so a
+# write on any worker (or via the extension) reaches every open dashboard.
+# Run gunicorn with gevent workers (see gunicorn.conf.py) so idle streams
+# cost a greenlet rather than a worker thread.
+
+class EventHub:
+    """Fans per-user events out to the streams open in this process"""
+
+    def __init__(self):
+        self._streams = {}  # user_id -> {queue: last seq seen}
+        self._lock = threading.Lock()
+        self._poller = None
+        self._poller_pid = None
+
+    def subscribe(self, user_id, last_seq):
+        stream = queue.Queue()
+        with self._lock:
+            self._streams.setdefault(user_id, {})[stream] = last_seq
+        self._start_poller()
+        return stream
+
+    def unsubscribe(self, user_id, stream):
+        with self._lock:
+            streams = self._streams.get(user_id, {})
+            streams.pop(stream, None)
+            if not streams:
+                self._streams.pop(user_id, None)
+
+    def _start_poller(self):
+        with self._lock:
+            if self._poller and self._poller.is_alive() and self._poller_pid == os.getpid():
+                return
+            self._poller = threading.Thread(target=self._poll, name='locktracker-events', daemon=True)
+            self._poller_pid = os.getpid()
+            self._poller.start()
+
+    def _poll(self):
+        while True:
+            time.sleep(SSE_POLL_SECONDS)
+            with self._lock:
+                users = {user_id: dict(streams) for user_id, streams in self._streams.items()}
+            for user_id, streams in users.items():
+                try:
+                    latest = int(cache.get_raw(f'events:{user_id}') or 0)
+                    for stream, last_seq in streams.items():
+                        for seq in range(last_seq + 1, latest + 1):
+                            event = cache.get_raw(f'events:{user_id}:{seq}')
+                            if event:
+                                stream.put((seq, event))
+                        with self._lock:
+                            if stream in self._streams.get(user_id, {}):
+                                self._streams[user_id][stream] = max(last_seq, latest)
+                except Exception as e:
+                    print(f"Error polling events for {user_id}: {e}")
+
+event_hub = EventHub()
+
+def publish_event(user_id, event_type, data):
+    """Send an event to every open dashboard of a user"""
+    try:
+        seq = cache.incr(f'events:{user_id}')
+        cache.set_raw(f'events:{user_id}:{seq}', json.dumps({'type': event_type, 'data': data}), SSE_EVENT_TTL_SECONDS)
+    except Exception as e:
+        print(f"Error publishing {event_type} event: {e}")
+
+def latest_event_id(user_id):
+    """Sequence number of the user's most recent event (0 if unknown)"""
+    try:
+        return int(cache.get_raw(f'events:{user_id}') or 0)
+    except Exception:
+        return 0
+
+def notify_bets_changed(user_id, event_type, data):
+    """Publish a bet event followed by the user's new stats"""
+    publish_event(user_id, event_type, data)
+    publish_event(user_id, 'stats-changed', get_stats(user_id))
+
+@app.route('/api/events')
+@login_required
+def api_events():
+    """Server-Sent Events stream of the current user's bet changes"""
+    user_id = get_current_user()['id']
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID') or cache.get_raw(f'events:{user_id}') or 0)
+    except Exception:
+        last_seq = 0
+    stream = event_hub.subscribe(user_id, last_seq)
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            started = last_beat = time.time()
+            while time.time() - started < SSE_STREAM_SECONDS:
+                try:
+                    seq, raw = stream.get(timeout=SSE_POLL_SECONDS)
+                except queue.Empty:
+                    if time.time() - last_beat >= SSE_HEARTBEAT_SECONDS:
+                        last_beat = time.time()
+                        yield ': keep-alive\n\n'
+                    continue
+                event = json.loads(raw)
+                yield f"id: {seq}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            event_hub.unsubscribe(user_id, stream)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/dashboard/fragments')
+@login_required
+def api_dashboard_fragments():
+    """Freshly rendered dashboard sections, for patching the page in place"""
+    user = get_current_user()
+    bets = get_user_bets(user['id'], BET_LIST_COLUMNS)
+    pending_bets = [b for b in bets if b['result'] == 'pending']
+    fragments = render_dashboard_fragments(user['id'], bets, pending_bets,
+                                           get_stats(user['id']), get_stats_by_category(user['id']))
+    return jsonify({name: str(html) for name, html in fragments.items()})
+
+# ==============================================
+# STATIC ASSETS & COMPRESSION
+# ==============================================
+# Every file in static/ is hashed at startup. url_for('static', ...) adds the
+# hash as ?v=..., and requests carrying the current hash get a one-year
+# immutable Cache-Control, so browsers only re-download files that changed.
+
+def build_static_hashes(static_folder):
+    """Map each static file (relative path) to a short content hash"""
+    hashes = {}
+    for root, dirs, files in os.walk(static_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                hashes[rel_path] = hashlib.md5(f.read()).hexdigest()[:10]
+    return hashes
+
+STATIC_HASHES = build_static_hashes(app.static_folder)
+# Changes whenever any static file does - names the service worker cache
+ASSET_VERSION = hashlib.md5(json.dumps(STATIC_HASHES, sort_keys=True).encode()).hexdigest()[:10]
+
+# Files the service worker downloads on install
+PRECACHE_ASSETS = ['style.css', 'favicon.svg', 'manifest.json', 'icons/icon-192.png']
+
+@app.url_defaults
+def add_static_version(endpoint, values):
+    """Fingerprint static URLs built with url_for"""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        file_hash = STATIC_HASHES.get(values['filename'])
+        if file_hash:
+            values['v'] = file_hash
+
+@app.context_processor
+def inject_asset_version():
+    return {'asset_version': ASSET_VERSION}
+
+@app.route('/sw.js')
+def service_worker():
+    """Serve the service worker from the root so it controls every page"""
+    response = send_from_directory(app.static_folder, 'sw.js', mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/asset-manifest.json')
+def asset_manifest():
+    """Fingerprinted URLs for the service worker to precache"""
+    return jsonify({
+        'version': ASSET_VERSION,
+        'assets': [url_for('static', filename=name) for name in PRECACHE_ASSETS if name in STATIC_HASHES]
+    })
+
+@app.after_request
+def set_cache_headers(response):
+    """Long-lived caching for fingerprinted static files"""
+    if request.endpoint == 'static' and response.status_code == 200:
+        filename = (request.view_args or {}).get('filename')
+        if request.args.get('v') and request.args.get('v') == STATIC_HASHES.get(filename):
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Brotli/gzip HTML and JSON responses when the client accepts it"""
+    accept_encoding = request.headers.get('Accept-Encoding', '').lower()
+    if (response.mimetype not in COMPRESS_MIMETYPES
+            or response.status_code < 200 or response.status_code >= 300
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    if brotli and 'br' in accept_encoding:
+        response.set_data(brotli.compress(data, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in accept_encoding:
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
 # ==============================================
 # MAIN ROUTES
 # ==============================================
@@ -446,7 +1462,8 @@ def onboarding():
 def dashboard():
     """Main page - show dashboard and recent bets"""
     user = get_current_user()
-    bets = get_user_bets(user['id'])
+    # Pending and history together are every bet, so one query covers both
+    bets = get_user_bets(user['id'], BET_LIST_COLUMNS)
     pending_bets = [b for b in bets if b['result'] == 'pending']
 
     stats = get_stats(user['id'])
@@ -465,28 +1482,113 @@ def dashboard():
     }
 
     # Check email confirmation status
-    email_confirmed = True  # Default to true
-    try:
-        if 'access_token' in session:
-            user_response = supabase.auth.get_user(session['access_token'])
-            if user_response and user_response.user:
-                email_confirmed = user_response.user.email_confirmed_at is not None
-    except:
-        pass  # If we can't check, assume confirmed
+    email_confirmed = get_email_confirmed(user['id'], session.get('access_token'))
 
     # Check for limit error from redirect
     error = request.args.get('error')
 
+    fragments = render_dashboard_fragments(user['id'], bets, pending_bets, stats, category_stats)
+
     return render_template('index.html',
-                         bets=bets,
-                         pending_bets=pending_bets,
-                         stats=stats,
-                         category_stats=category_stats,
+                         fragments=fragments,
                          user=user,
                          usage=usage,
                          email_confirmed=email_confirmed,
                          error=error)
 
+def insert_bet(user_id, data):
+    """Validate and insert a new pending bet. Returns (bet, error_code)."""
+    date = data.get('date') or datetime.now().strftime('%Y-%m-%d')
+    sport = data.get('sport', '')
+    matchup = data.get('matchup', '')
+    bet_type = data.get('bet_type', '')
+    bet_description = data.get('bet_description', '')
+    sportsbook = data.get('sportsbook', '')
+
+    # Validate required fields
+    if not sport or not matchup or not bet_description:
+        return None, 'missing_fields'
+
+    # Validate and convert numeric fields
+    try:
+        odds = int(data.get('odds', 0))
+        amount = float(data.get('amount', 0))
+    except (ValueError, TypeError):
+        return None, 'invalid_numbers'
+
+    response = supabase_admin.table('bets').insert({
+        'user_id': user_id,
+        'date': date,
+        'sport': sport,
+        'matchup': matchup,
+        'bet_type': bet_type,
+        'bet_description': bet_description,
+        'odds': odds,
+        'amount': amount,
+        'sportsbook': sportsbook,
+        'result': 'pending',
+        'profit': 0
+    }).execute()
+
+    invalidate_user_cache(user_id)
+    notify_bets_changed(user_id, 'bet-added', {'count': 1})
+    return response.data[0], None
+
+def settle_bets(user_id, results):
+    """Set results for {bet_id: result} and recalculate profit.
+
+    Reads the bets in one query and writes them back in one upsert.
+    Returns the updated bet rows."""
+    response = supabase_admin.table('bets').select('*').eq('user_id', user_id).in_('id', list(results.keys())).execute()
+
+    rows = []
+    for bet in response.data:
+        result = results[bet['id']]
+        bet['result'] = result
+        bet['profit'] = calculate_profit(bet['odds'], bet['amount'], result)
+        rows.append(bet)
+
+    # Full rows go back in a single upsert, so this is one UPDATE statement
+    if rows:
+        supabase_admin.table('bets').upsert(rows, on_conflict='id').execute()
+        invalidate_user_cache(user_id)
+        notify_bets_changed(user_id, 'bet-settled', {'ids': [bet['id'] for bet in rows]})
+    return rows
+
+def update_bet_fields(user_id, bet, data):
+    """Apply edited fields to a bet and recalculate profit. Returns the new row."""
+    result = data.get('result', bet['result'])
+    odds = int(data.get('odds', bet['odds']))
+    amount = float(data.get('amount', bet['amount']))
+
+    # Recalculate profit if result is not pending
+    profit = calculate_profit(odds, amount, result) if result != 'pending' else 0
+
+    response = supabase_admin.table('bets').update({
+        'date': data.get('date', bet['date']),
+        'sport': data.get('sport', bet['sport']),
+        'matchup': data.get('matchup', bet['matchup']),
+        'bet_type': data.get('bet_type', bet['bet_type']),
+        'bet_description': data.get('bet_description', bet['bet_description']),
+        'odds': odds,
+        'amount': amount,
+        'sportsbook': data.get('sportsbook', bet['sportsbook']),
+        'result': result,
+        'profit': profit
+    }).eq('id', bet['id']).eq('user_id', user_id).execute()
+    invalidate_user_cache(user_id)
+    notify_bets_changed(user_id, 'bet-updated', {'ids': [bet['id']]})
+    return response.data[0] if response.data else bet
+
+def remove_bet(user_id, bet_id):
+    """Delete a bet. Returns True if it existed."""
+    response = supabase_admin.table('bets').delete().eq('id', bet_id).eq('user_id', user_id).execute()
+    if not response.data:
+        return False  # nothing changed, so nothing to recompute or announce
+    invalidate_user_cache(user_id)
+    notify_bets_changed(user_id, 'bet-deleted', {'ids': [bet_id]})
+    return True
+
 @app.route('/add', methods=['POST'])
 @login_required
 def add_bet():
@@ -496,45 +1598,18 @@ def add_bet():
     # Check if user can add more bets
     can_add, limit, current_count = can_add_bets(user['id'])
     if not can_add:
+        record_quota_hit(user['id'], 'web')
         # Redirect back with error (could use flash messages for better UX)
         return redirect(url_for('dashboard', error='limit_reached'))
 
-    date = request.form.get('date', datetime.now().strftime('%Y-%m-%d'))
-    sport = request.form.get('sport', '')
-    matchup = request.form.get('matchup', '')
-    bet_type = request.form.get('bet_type', '')
-    bet_description = request.form.get('bet_description', '')
-    sportsbook = request.form.get('sportsbook', '')
-
-    # Validate required fields
-    if not sport or not matchup or not bet_description:
-        return redirect(url_for('dashboard', error='missing_fields'))
-
-    # Validate and convert numeric fields
-    try:
-        odds = int(request.form.get('odds', 0))
-        amount = float(request.form.get('amount', 0))
-    except (ValueError, TypeError):
-        return redirect(url_for('dashboard', error='invalid_numbers'))
-
     try:
-        supabase_admin.table('bets').insert({
-            'user_id': user['id'],
-            'date': date,
-            'sport': sport,
-            'matchup': matchup,
-            'bet_type': bet_type,
-            'bet_description': bet_description,
-            'odds': odds,
-            'amount': amount,
-            'sportsbook': sportsbook,
-            'result': 'pending',
-            'profit': 0
-        }).execute()
+        bet, error = insert_bet(user['id'], request.form)
     except Exception as e:
         print(f"Error adding bet: {e}")
         return redirect(url_for('dashboard'))
 
+    if error:
+        return redirect(url_for('dashboard', error=error))
     return redirect(url_for('dashboard', bet_added='true'))
 
 @app.route('/update/<int:bet_id>', methods=['POST'])
@@ -550,17 +1625,7 @@ def update_bet(bet_id):
         return redirect(url_for('dashboard'))
 
     try:
-        # Get the bet first
-        response = supabase_admin.table('bets').select('*').eq('id', bet_id).eq('user_id', user['id']).execute()
-
-        if response.data:
-            bet = response.data[0]
-            profit = calculate_profit(bet['odds'], bet['amount'], result)
-
-            supabase_admin.table('bets').update({
-                'result': result,
-                'profit': profit
-            }).eq('id', bet_id).eq('user_id', user['id']).execute()
+        if settle_bets(user['id'], {bet_id: result}):
             return redirect(url_for('dashboard', bet_updated='true'))
     except Exception as e:
         print(f"Error updating bet: {e}")
@@ -574,7 +1639,7 @@ def delete_bet(bet_id):
     user = get_current_user()
 
     try:
-        supabase_admin.table('bets').delete().eq('id', bet_id).eq('user_id', user['id']).execute()
+        remove_bet(user['id'], bet_id)
         return redirect(url_for('dashboard', bet_deleted='true'))
     except Exception as e:
         print(f"Error deleting bet: {e}")
@@ -597,26 +1662,7 @@ def edit_bet(bet_id):
 
         if request.method == 'POST':
             # Update the bet with new values
-            result = request.form.get('result', bet['result'])
-            odds = int(request.form.get('odds', bet['odds']))
-            amount = float(request.form.get('amount', bet['amount']))
-
-            # Recalculate profit if result is not pending
-            profit = calculate_profit(odds, amount, result) if result != 'pending' else 0
-
-            supabase_admin.table('bets').update({
-                'date': request.form.get('date', bet['date']),
-                'sport': request.form.get('sport', bet['sport']),
-                'matchup': request.form.get('matchup', bet['matchup']),
-                'bet_type': request.form.get('bet_type', bet['bet_type']),
-                'bet_description': request.form.get('bet_description', bet['bet_description']),
-                'odds': odds,
-                'amount': amount,
-                'sportsbook': request.form.get('sportsbook', bet['sportsbook']),
-                'result': result,
-                'profit': profit
-            }).eq('id', bet_id).eq('user_id', user['id']).execute()
-
+            update_bet_fields(user['id'], bet, request.form)
             return redirect(url_for('dashboard', bet_updated='true'))
 
         return render_template('edit_bet.html', bet=bet, user=user)
@@ -653,7 +1699,7 @@ def import_bets():
         # Verify user from token
         if user_token:
             try:
-                user_response = supabase.auth.get_user(user_token)
+                user_response = auth_clients.new().get_user(user_token)
                 user_id = user_response.user.id
             except:
                 return jsonify({'success': False, 'error': 'Invalid or expired token. Please log in again.'})
@@ -668,6 +1714,7 @@ def import_bets():
         remaining = limit - current_count
 
         if not can_add:
+            record_quota_hit(user_id, 'extension')
             return jsonify({
                 'success': False,
                 'error': f'Monthly limit reached ({limit} bets). Upgrade to Pro for unlimited bets!',
@@ -678,55 +1725,68 @@ def import_bets():
 
         imported_count = 0
 
-        for bet in bets:
-            # Check if we've hit the limit during import
-            if imported_count >= remaining:
-                break
-            # Check for duplicates (use admin client to bypass RLS)
-            existing = supabase_admin.table('bets').select('id').eq('user_id', user_id).eq('matchup', bet.get('matchup', '')).eq('bet_description', bet.get('bet_description', '')).eq('amount', bet.get('amount', 0)).execute()
-
-            if existing.data:
-                continue  # Skip duplicate
-
-            # Determine sportsbook from source
-            sportsbook = bet.get('source', '').title()
-            if sportsbook == 'Fanduel':
-                sportsbook = 'FanDuel'
-            elif sportsbook == 'Draftkings':
-                sportsbook = 'DraftKings'
-            elif sportsbook == 'Prizepicks':
-                sportsbook = 'PrizePicks'
-
-            # Get result and profit
-            result = bet.get('result', 'pending')
-            profit = 0
-            if result in ['win', 'loss']:
-                # Use scraped profit if provided (important for PrizePicks Flex plays with partial wins)
-                if 'profit' in bet and bet['profit'] != 0:
-                    profit = bet['profit']
-                else:
-                    # Fallback: calculate from odds
-                    profit = calculate_profit(
-                        bet.get('odds', -110),
-                        bet.get('amount', 0),
-                        result
-                    )
-
-            # Insert the bet (use admin client to bypass RLS)
-            supabase_admin.table('bets').insert({
-                'user_id': user_id,
-                'date': datetime.now().strftime('%Y-%m-%d'),
-                'sport': bet.get('sport', 'Other'),
-                'matchup': bet.get('matchup', 'Unknown'),
-                'bet_type': bet.get('bet_type', 'Other'),
-                'bet_description': bet.get('bet_description', 'Unknown'),
-                'odds': bet.get('odds', -110),
-                'amount': bet.get('amount', 0),
-                'result': result,
-                'profit': profit,
-                'sportsbook': sportsbook
-            }).execute()
-            imported_count += 1
+        try:
+            for bet in bets:
+                # Check if we've hit the limit during import
+                if imported_count >= remaining:
+                    break
+                # Check for duplicates (use admin client to bypass RLS)
+                existing = supabase_admin.table('bets').select('id').eq('user_id', user_id).eq('matchup', bet.get('matchup', '')).eq('bet_description', bet.get('bet_description', '')).eq('amount', bet.get('amount', 0)).execute()
+
+                if existing.data:
+                    continue  # Skip duplicate
+
+                # Determine sportsbook from source
+                sportsbook = bet.get('source', '').title()
+                if sportsbook == 'Fanduel':
+                    sportsbook = 'FanDuel'
+                elif sportsbook == 'Draftkings':
+                    sportsbook = 'DraftKings'
+                elif sportsbook == 'Prizepicks':
+                    sportsbook = 'PrizePicks'
+
+                # Get result and profit
+                result = bet.get('result', 'pending')
+                profit = 0
+                if result in ['win', 'loss']:
+                    # Use scraped profit if provided (important for PrizePicks Flex plays with partial wins)
+                    if 'profit' in bet and bet['profit'] != 0:
+                        profit = bet['profit']
+                    else:
+                        # Fallback: calculate from odds
+                        profit = calculate_profit(
+                            bet.get('odds', -110),
+                            bet.get('amount', 0),
+                            result
+                        )
+
+                # Insert the bet (use admin client to bypass RLS)
+                try:
+                    supabase_admin.table('bets').insert({
+                        'user_id': user_id,
+                        'date': datetime.now().strftime('%Y-%m-%d'),
+                        'sport': bet.get('sport', 'Other'),
+                        'matchup': bet.get('matchup', 'Unknown'),
+                        'bet_type': bet.get('bet_type', 'Other'),
+                        'bet_description': bet.get('bet_description', 'Unknown'),
+                        'odds': bet.get('odds', -110),
+                        'amount': bet.get('amount', 0),
+                        'result': result,
+                        'profit': profit,
+                        'sportsbook': sportsbook,
+                        'source': 'extension'
+                    }).execute()
+                except Exception as e:
+                    # Another sync inserted the same bet since our duplicate check
+                    if 'duplicate' in str(e).lower() or '23505' in str(e):
+                        continue
+                    raise
+                imported_count += 1
+        finally:
+            # Also after a failed insert, for whatever made it in before it
+            if imported_count:
+                invalidate_user_cache(user_id)
+                notify_bets_changed(user_id, 'bet-added', {'count': imported_count})
 
         # Calculate how many were skipped due to limit
         skipped_due_to_limit = max(0, len(bets) - imported_count - (len(bets) - remaining if remaining < len(bets) else 0))
@@ -737,7 +1797,8 @@ def import_bets():
             'imported': imported_count,
             'message': f'Successfully imported {imported_count} bets',
             'monthly_used': new_count,
-            'monthly_limit': limit
+            'monthly_limit': limit,
+            'handshake': build_handshake(user_id)  # so the extension's copy stays current
         }
 
         if imported_count < len(bets) and new_count >= limit:
@@ -755,18 +1816,170 @@ def auth_status():
         return jsonify({
             'logged_in': True,
             'user': session['user'],
-            'access_token': session['access_token']
+            'access_token': session['access_token'],
+            'event_id': latest_event_id(session['user']['id'])
         })
     return jsonify({'logged_in': False})
 
 @app.route('/api/stats', methods=['GET'])
 def api_stats():
-    """Get stats as JSON (for extension)"""
+    """Get stats as JSON (for extension; ?format=compact for a single array)"""
     if 'user' not in session:
         return jsonify({'error': 'Not logged in'})
 
     user = get_current_user()
-    return jsonify(get_stats(user['id']))
+    stats = get_stats(user['id'])
+    if wants_compact():
+        return jsonify(compact_stats(stats))
+    return jsonify(stats)
+
+@app.route('/api/bets/settle', methods=['POST'])
+@login_required
+def api_settle_bets():
+    """Settle many bets at once.
+
+    Body: {"bets": [{"id": 12, "result": "win"}, ...]} (or [[12, "win"], ...]).
+    Reads all the bets in one query, writes them back in one upsert and
+    returns the new stats so the dashboard doesn't need a reload."""
+    user = get_current_user()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('bets'):
+        return jsonify({'success': False, 'error': 'No bets provided'}), 400
+    if not isinstance(data['bets'], list):
+        return jsonify({'success': False, 'error': 'bets must be a list'}), 400
+
+    # Normalize to {bet_id: result}
+    valid_results = ['pending', 'win', 'loss', 'push']
+    results = {}
+    for item in data['bets']:
+        try:
+            if isinstance(item, dict):
+                bet_id, result = int(item.get('id')), item.get('result', '')
+            else:
+                bet_id, result = int(item[0]), item[1]
+        except (ValueError, TypeError, IndexError):
+            return jsonify({'success': False, 'error': 'Each bet needs an id and a result'}), 400
+        if result not in valid_results:
+            return jsonify({'success': False, 'error': f'Invalid result for bet {bet_id}'}), 400
+        results[bet_id] = result
+
+    try:
+        rows = settle_bets(user['id'], results)
+    except Exception as e:
+        print(f"Error settling bets: {e}")
+        return jsonify({'success': False, 'error': 'Could not settle bets. Please try again.'}), 500
+
+    settled_ids = [bet['id'] for bet in rows]
+    return jsonify({
+        'success': True,
+        'settled': settled_ids,
+        'not_found': [bet_id for bet_id in results if bet_id not in settled_ids],
+        'stats': get_stats(user['id'])
+    })
+
+# JSON versions of add/settle/edit/delete for the dashboard. Each returns the
+# changed bet plus fresh aggregates so the page can update in place.
+
+def bet_change_response(user_id, bet=None, **extra):
+    data = {
+        'success': True,
+        'bet': bet,
+        'stats': get_stats(user_id),
+        'category_stats': get_stats_by_category(user_id),
+        # Lets the page skip the live-update events for its own change
+        'event_id': latest_event_id(user_id)
+    }
+    data.update(extra)
+    return jsonify(data)
+
+@app.route('/api/bets', methods=['POST'])
+@login_required
+def api_create_bet():
+    """Create a bet from a JSON body"""
+    user = get_current_user()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return jsonify({'success': False, 'error': 'Invalid request body'}), 400
+
+    can_add, limit, current_count = can_add_bets(user['id'])
+    if not can_add:
+        record_quota_hit(user['id'], 'api')
+        return jsonify({
+            'success': False,
+            'error': f'Monthly limit reached ({limit} bets). Upgrade to Pro for unlimited bets!',
+            'limit_reached': True
+        }), 403
+
+    try:
+        bet, error = insert_bet(user['id'], data)
+    except Exception as e:
+        print(f"Error adding bet: {e}")
+        return jsonify({'success': False, 'error': 'Could not add bet. Please try again.'}), 500
+
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    return bet_change_response(user['id'], bet, monthly_used=current_count + 1, monthly_limit=limit), 201
+
+@app.route('/api/bets/<int:bet_id>', methods=['PATCH'])
+@login_required
+def api_update_bet(bet_id):
+    """Edit any fields of a bet"""
+    user = get_current_user()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return jsonify({'success': False, 'error': 'Invalid request body'}), 400
+    if 'result' in data and data['result'] not in ['pending', 'win', 'loss', 'push']:
+        return jsonify({'success': False, 'error': 'Invalid result'}), 400
+
+    try:
+        response = supabase_admin.table('bets').select('*').eq('id', bet_id).eq('user_id', user['id']).execute()
+        if not response.data:
+            return jsonify({'success': False, 'error': 'Bet not found'}), 404
+        bet = update_bet_fields(user['id'], response.data[0], data)
+    except (ValueError, TypeError):
+        return jsonify({'success': False, 'error': 'invalid_numbers'}), 400
+    except Exception as e:
+        print(f"Error editing bet: {e}")
+        return jsonify({'success': False, 'error': 'Could not update bet. Please try again.'}), 500
+
+    return bet_change_response(user['id'], bet)
+
+@app.route('/api/bets/<int:bet_id>/settle', methods=['POST'])
+@login_required
+def api_settle_bet(bet_id):
+    """Set one bet's result"""
+    user = get_current_user()
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Invalid request body'}), 400
+    result = data.get('result', '')
+    if result not in ['pending', 'win', 'loss', 'push']:
+        return jsonify({'success': False, 'error': 'Invalid result'}), 400
+
+    try:
+        rows = settle_bets(user['id'], {bet_id: result})
+    except Exception as e:
+        print(f"Error updating bet: {e}")
+        return jsonify({'success': False, 'error': 'Could not update bet. Please try again.'}), 500
+
+    if not rows:
+        return jsonify({'success': False, 'error': 'Bet not found'}), 404
+    return bet_change_response(user['id'], rows[0])
+
+@app.route('/api/bets/<int:bet_id>', methods=['DELETE'])
+@login_required
+def api_delete_bet(bet_id):
+    """Delete a bet"""
+    user = get_current_user()
+
+    try:
+        if not remove_bet(user['id'], bet_id):
+            return jsonify({'success': False, 'error': 'Bet not found'}), 404
+    except Exception as e:
+        print(f"Error deleting bet: {e}")
+        return jsonify({'success': False, 'error': 'Could not delete bet. Please try again.'}), 500
+
+    return bet_change_response(user['id'], None, deleted=bet_id)
 
 @app.route('/api/usage', methods=['POST'])
 def api_usage():
@@ -783,7 +1996,7 @@ def api_usage():
 
         # Verify user from token
         try:
-            user_response = supabase.auth.get_user(user_token)
+            user_response = auth_clients.new().get_user(user_token)
             user_id = user_response.user.id
         except:
             return jsonify({'success': False, 'error': 'Invalid or expired token'})
@@ -805,10 +2018,58 @@ def api_usage():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+def build_handshake(user_id):
+    """Tier, quota and sync cursors for the extension, in one response"""
+    def lookup():
+        tier = get_user_tier(user_id)
+        monthly_count = get_monthly_bet_count(user_id)
+        remaining = FREE_TIER_MONTHLY_LIMIT - monthly_count if tier == 'free' else 999999
+        response = supabase_admin.table('bets').select('created_at').eq('user_id', user_id).eq('source', 'extension').order('created_at', desc=True).limit(1).execute()
+        return {
+            'tier': tier,
+            'monthly_count': monthly_count,
+            'monthly_limit': FREE_TIER_MONTHLY_LIMIT,
+            'remaining': max(0, remaining),
+            'at_limit': remaining <= 0 and tier == 'free',
+            'last_import_at': response.data[0]['created_at'] if response.data else None
+        }
+
+    handshake = cached(user_id, 'handshake', lookup)
+    handshake = dict(handshake, success=True, valid=True, ttl=HANDSHAKE_TTL_SECONDS)
+    # Any bet change bumps the event id, so the extension can tell its copy is stale
+    handshake['cursors'] = {'event_id': latest_event_id(user_id), 'last_import_at': handshake.pop('last_import_at')}
+    return handshake
+
+@app.route('/api/extension/handshake', methods=['POST'])
+def extension_handshake():
+    """Everything the extension checks before syncing: is the token valid,
+    what tier is the user on, how many bets are left this month and where
+    the last sync got to. Replaces separate /api/auth/status and /api/usage
+    calls; the extension caches the result for `ttl` seconds."""
+    data = request.get_json(silent=True)
+    if not data or not data.get('access_token'):
+        return jsonify({'success': False, 'valid': False, 'error': 'No authentication token'})
+
+    try:
+        user_response = auth_clients.new().get_user(data['access_token'])
+        user_id = user_response.user.id
+    except Exception:
+        return jsonify({'success': False, 'valid': False, 'error': 'Invalid or expired token'})
+
+    try:
+        return jsonify(build_handshake(user_id))
+    except Exception as e:
+        print(f"Error building extension handshake: {e}")
+        return jsonify({'success': False, 'valid': True, 'error': str(e)})
+
 @app.route('/api/analytics')
 @login_required
 def api_analytics():
-    """Get analytics data for charts with date filtering"""
+    """Get analytics data for charts with date filtering.
+
+    ?points=N fits the time series to a chart N points wide (see
+    downsample_analytics); ?format=compact sends column arrays.
+    Archived bets count only where their whole month is in the range."""
     user = get_current_user()
 
     # Get date range from query params
@@ -816,17 +2077,81 @@ def api_analytics():
     start_date = request.args.get('start')
     end_date = request.args.get('end')
 
-    # Get all user bets
-    bets = get_user_bets(user['id'])
-    settled_bets = [b for b in bets if b['result'] != 'pending']
+    analytics = get_analytics(user['id'], days, start_date, end_date)
+    points = request.args.get('points', type=int)
+    if points:
+        bucket = request.args.get('bucket', 'auto')
+        method = request.args.get('method', 'lttb')
+        if bucket != 'auto' and bucket not in downsample.BUCKETS:
+            return jsonify({'error': f"bucket must be auto or one of {', '.join(downsample.BUCKETS)}"}), 400
+        if method not in downsample.METHODS:
+            return jsonify({'error': f"method must be one of {', '.join(downsample.METHODS)}"}), 400
+        points = max(ANALYTICS_MIN_POINTS, min(points, ANALYTICS_MAX_POINTS))
+        analytics = downsample_analytics(analytics, points, bucket, method)
+    if wants_compact():
+        return jsonify(compact_analytics(analytics))
+    return jsonify(analytics)
+
+def get_analytics(user_id, days=None, start_date=None, end_date=None):
+    return cached(user_id, f'analytics:{days}:{start_date}:{end_date}',
+                  lambda: build_analytics(user_id, days, start_date, end_date))
+
+def downsample_analytics(analytics, points, bucket='auto', method='lttb'):
+    """Fit the daily series from get_analytics() into `points` points.
+
+    dates/daily_profit/cumulative_profit become per bucket - day, week or
+    month, the finest that fits when bucket is 'auto' - and `bucket` says
+    which. `curve` is the daily cumulative profit thinned to at most
+    `points` by lttb or minmax (see downsample.py), for the line chart.
+    Runs on the cached daily series, so it's one pass over it per request."""
+    days = downsample.parse_days(analytics['dates'])
+    if bucket == 'auto':
+        bucket = downsample.choose_bucket(days, points)
+
+    cumulative = analytics['cumulative_profit']
+    if method == 'minmax':
+        kept = downsample.min_max(cumulative, points)
+    else:
+        kept = downsample.lttb([day.toordinal() for day in days], cumulative, points)
+
+    starts, profits, ends = downsample.bucket_series(days, analytics['daily_profit'], cumulative, bucket)
+    return dict(
+        analytics,
+        dates=[start.isoformat() for start in starts],
+        daily_profit=profits,
+        cumulative_profit=ends,
+        bucket=bucket,
+        curve={
+            'dates': [analytics['dates'][i] for i in kept],
+            'cumulative_profit': [cumulative[i] for i in kept],
+            'method': method,
+            'total_points': len(days)
+        }
+    )
 
-    # Filter by date range
+def build_analytics(user_id, days=None, start_date=None, end_date=None):
+    """Chart data (daily and cumulative profit, sport and bet type breakdowns)"""
+    # Get settled bets in the date range
     if days:
         cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-        settled_bets = [b for b in settled_bets if b['date'] >= cutoff]
+        settled_bets = get_settled_bets(user_id, ANALYTICS_COLUMNS, start_date=cutoff)
+    elif start_date and end_date:
+        settled_bets = get_settled_bets(user_id, ANALYTICS_COLUMNS, start_date=start_date, end_date=end_date)
+    else:
+        settled_bets = get_settled_bets(user_id, ANALYTICS_COLUMNS)
+
+    # Archived bets only exist as monthly totals, charted on the 1st
+    if days:
+        settled_bets += get_archived_summaries(user_id, start_date=cutoff)
     elif start_date and end_date:
-        settled_bets = [b for b in settled_bets if start_date <= b['date'] <= end_date]
+        settled_bets += get_archived_summaries(user_id, start_date, end_date)
+    else:
+        settled_bets += get_archived_summaries(user_id)
 
+    return calculate_analytics(settled_bets)
+
+def calculate_analytics(settled_bets):
+    """Turn settled bets (and archived monthly totals) into chart data"""
     # Sort by date
     settled_bets.sort(key=lambda x: x['date'])
 
@@ -838,9 +2163,9 @@ def api_analytics():
             daily_data[date] = {'profit': 0, 'wins': 0, 'losses': 0}
         daily_data[date]['profit'] += bet['profit']
         if bet['result'] == 'win':
-            daily_data[date]['wins'] += 1
+            daily_data[date]['wins'] += bet.get('count', 1)
         elif bet['result'] == 'loss':
-            daily_data[date]['losses'] += 1
+            daily_data[date]['losses'] += bet.get('count', 1)
 
     # Build arrays for charts
     dates = sorted(daily_data.keys())
@@ -860,11 +2185,11 @@ def api_analytics():
         if sport not in by_sport:
             by_sport[sport] = {'profit': 0, 'wins': 0, 'losses': 0, 'count': 0}
         by_sport[sport]['profit'] += bet['profit']
-        by_sport[sport]['count'] += 1
+        by_sport[sport]['count'] += bet.get('count', 1)
         if bet['result'] == 'win':
-            by_sport[sport]['wins'] += 1
+            by_sport[sport]['wins'] += bet.get('count', 1)
         elif bet['result'] == 'loss':
-            by_sport[sport]['losses'] += 1
+            by_sport[sport]['losses'] += bet.get('count', 1)
 
     # Round profits and calculate win rates
     for sport in by_sport:
@@ -879,11 +2204,11 @@ def api_analytics():
         if bt not in by_bet_type:
             by_bet_type[bt] = {'profit': 0, 'wins': 0, 'losses': 0, 'count': 0}
         by_bet_type[bt]['profit'] += bet['profit']
-        by_bet_type[bt]['count'] += 1
+        by_bet_type[bt]['count'] += bet.get('count', 1)
         if bet['result'] == 'win':
-            by_bet_type[bt]['wins'] += 1
+            by_bet_type[bt]['wins'] += bet.get('count', 1)
         elif bet['result'] == 'loss':
-            by_bet_type[bt]['losses'] += 1
+            by_bet_type[bt]['losses'] += bet.get('count', 1)
 
     # Round profits
     for bt in by_bet_type:
@@ -891,14 +2216,317 @@ def api_analytics():
         total = by_bet_type[bt]['wins'] + by_bet_type[bt]['losses']
         by_bet_type[bt]['win_rate'] = round(by_bet_type[bt]['wins'] / total * 100, 1) if total > 0 else 0
 
-    return jsonify({
+    return {
         'dates': dates,
         'daily_profit': daily_profit,
         'cumulative_profit': cumulative,
         'by_sport': by_sport,
         'by_bet_type': by_bet_type
+    }
+
+# Compact payloads (?format=compact) for clients that poll these often.
+# Numbers are sent as whole integers - money in cents, percentages in
+# tenths - and repeated names as indexes into one `names` list.
+COMPACT_VERSION = 1
+COMPACT_SCALE = {'money': 100, 'rate': 10}
+# Order of the values in a compact /api/stats response
+COMPACT_STATS_FIELDS = ['total_bets', 'wins', 'losses', 'pushes', 'win_rate', 'total_wagered', 'total_profit', 'roi']
+COMPACT_STATS_SCALE = {'win_rate': 'rate', 'total_wagered': 'money', 'total_profit': 'money', 'roi': 'rate'}
+
+def wants_compact():
+    return request.args.get('format') == 'compact'
+
+def to_fixed(value, scale):
+    return int(round(value * COMPACT_SCALE[scale]))
+
+def compact_stats(stats):
+    """get_stats() output as one array in COMPACT_STATS_FIELDS order"""
+    values = []
+    for field in COMPACT_STATS_FIELDS:
+        scale = COMPACT_STATS_SCALE.get(field)
+        values.append(to_fixed(stats[field], scale) if scale else stats[field])
+    return {'format': 'compact', 'version': COMPACT_VERSION, 'scale': COMPACT_SCALE, 'stats': values}
+
+def compact_analytics(analytics):
+    """build_analytics() output as column arrays.
+
+    days are offsets from `start`; cumulative profit is left out because
+    it's the running total of daily_profit. Each breakdown has one array
+    per field, with `name` holding indexes into `names`."""
+    names = []
+    name_ids = {}
+
+    def breakdown(groups):
+        columns = {'name': [], 'profit': [], 'count': [], 'wins': [], 'losses': [], 'win_rate': []}
+        for name, group in groups.items():
+            if name not in name_ids:
+                name_ids[name] = len(names)
+                names.append(name)
+            columns['name'].append(name_ids[name])
+            columns['profit'].append(to_fixed(group['profit'], 'money'))
+            columns['count'].append(group['count'])
+            columns['wins'].append(group['wins'])
+            columns['losses'].append(group['losses'])
+            columns['win_rate'].append(to_fixed(group['win_rate'], 'rate'))
+        return columns
+
+    dates = [datetime.strptime(day[:10], '%Y-%m-%d') for day in analytics['dates']]
+    compact = {
+        'format': 'compact',
+        'version': COMPACT_VERSION,
+        'scale': COMPACT_SCALE,
+        'start': analytics['dates'][0][:10] if dates else None,
+        'days': [(day - dates[0]).days for day in dates],
+        'daily_profit': [to_fixed(profit, 'money') for profit in analytics['daily_profit']],
+        'by_sport': breakdown(analytics['by_sport']),
+        'by_bet_type': breakdown(analytics['by_bet_type']),
+        'names': names
+    }
+    if 'curve' in analytics:
+        # Thinned points aren't a running total of anything we send, so
+        # the curve carries its own values; days count from the same start
+        curve = analytics['curve']
+        compact['bucket'] = analytics['bucket']
+        compact['curve'] = {
+            'days': [(datetime.strptime(day[:10], '%Y-%m-%d') - dates[0]).days for day in curve['dates']],
+            'cumulative_profit': [to_fixed(profit, 'money') for profit in curve['cumulative_profit']],
+            'method': curve['method'],
+            'total_points': curve['total_points']
+        }
+    return compact
+
+# ==============================================
+# BET SEARCH
+# ==============================================
+# Text search over matchup and description plus filters, served by the
+# search_bets() function in migrations/0006_bet_search.sql, or by the local
+# cache and an in-memory trigram index when LOCAL_CACHE_PATH is set.
+
+_search_indexes = OrderedDict()
+_search_indexes_lock = threading.Lock()
+
+def parse_search_filters(args):
+    """Filters from the query string; raises ValueError with a message for the user"""
+    filters = {name: args.get(name) or None for name in ('sport', 'bet_type', 'sportsbook')}
+
+    result = args.get('result') or None
+    if result and result not in ['pending', 'win', 'loss', 'push', 'settled']:
+        raise ValueError('result must be pending, win, loss, push or settled')
+    filters['result'] = result
+
+    for name, convert in (('min_odds', int), ('max_odds', int), ('min_amount', float), ('max_amount', float)):
+        value = args.get(name)
+        try:
+            filters[name] = convert(value) if value else None
+        except ValueError:
+            raise ValueError(f'{name} must be a number')
+
+    for name in ('start_date', 'end_date'):
+        value = args.get(name)
+        try:
+            filters[name] = datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d') if value else None
+        except ValueError:
+            raise ValueError(f'{name} must be a date like 2025-01-31')
+    return filters
+
+def get_search_index(user_id):
+    """The user's trigram index, brought up to date with the local cache.
+    New bets are added to it; a reload of the user's rows rebuilds it."""
+    loaded_at, cursor = bet_cache.load_state(user_id)
+    with _search_indexes_lock:
+        index = _search_indexes.get(user_id)
+        if index is None or index.loaded_at != loaded_at:
+            index = TrigramIndex(loaded_at)
+            index.add(bet_cache.get_search_text(user_id))
+        elif index.cursor != cursor:
+            index.add(bet_cache.get_search_text(user_id, since=index.cursor))
+        _search_indexes[user_id] = index
+        _search_indexes.move_to_end(user_id)
+        while len(_search_indexes) > SEARCH_INDEX_MAX_USERS:
+            _search_indexes.popitem(last=False)
+    return index
+
+def search_local_cache(user_id, terms, filters, limit, offset):
+    ids = None
+    if terms:
+        ids = get_search_index(user_id).match(terms)
+        if not ids:
+            return [], {}
+
+    return bet_cache.search(user_id, ids=ids, limit=limit, offset=offset, **filters)
+
+def search_bets(user_id, terms, filters, limit, offset):
+    """One page of matching bets, newest first, and per-result totals
+    ({result: {count, wagered, profit}}) for every match"""
+    if bet_cache:
+        try:
+            refresh_local_cache(user_id)
+            return search_local_cache(user_id, terms, filters, limit, offset)
+        except Exception as e:
+            print(f"Local cache error, searching Supabase: {e}")
+
+    params = {'p_user_id': user_id, 'p_terms': [escape_like(term) for term in terms],
+              'p_limit': limit, 'p_offset': offset}
+    params.update({f'p_{name}': value for name, value in filters.items()})
+    found = supabase_admin.rpc('search_bets', params).execute().data
+    return found['bets'], found['by_result']
+
+@app.route('/api/bets/search')
+@login_required
+def api_search_bets():
+    """Search the user's bets.
+
+    Query args: q (words that must all appear in the matchup or description),
+    sport, bet_type, sportsbook, result (a result or 'settled'), min_odds,
+    max_odds, min_amount, max_amount, start_date, end_date, page, per_page.
+    Returns one page of bets, newest first, with totals for every match."""
+    started = time.time()
+    user = get_current_user()
+    try:
+        filters = parse_search_filters(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'page and per_page must be whole numbers'}), 400
+
+    terms = search_terms(request.args.get('q'))
+    try:
+        bets, by_result = search_bets(user['id'], terms, filters, per_page, (page - 1) * per_page)
+    except Exception as e:
+        print(f"Error searching bets: {e}")
+        return jsonify({'success': False, 'error': 'Search failed. Please try again.'}), 500
+
+    # Same numbers as the dashboard stat cards, for just the matching bets
+    pending = by_result.pop('pending', {'count': 0, 'wagered': 0})
+    totals = calculate_stats(by_result)
+    totals['pending'] = pending['count']
+    totals['pending_amount'] = round(float(pending['wagered']), 2)
+    total = totals['total_bets'] + totals['pending']
+
+    columns = SEARCH_COLUMNS.split(',')
+    return jsonify({
+        'success': True,
+        'bets': [{column: bet.get(column) for column in columns} for bet in bets],
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page,
+        'totals': totals,
+        'took_ms': round((time.time() - started) * 1000, 1)
     })
 
+# ==============================================
+# BANKROLL SIMULATION
+# ==============================================
+# Monte Carlo paths from the user's settled bets (see simulate.py). The
+# number crunching runs in a small pool of processes per worker, split into
+# one share of the paths per process, so it neither holds the GIL for the
+# worker's other requests nor waits behind them.
+
+_simulation_pool = None
+_simulation_pool_pid = None
+_simulation_pool_lock = threading.Lock()
+
+def get_simulation_pool():
+    global _simulation_pool, _simulation_pool_pid
+    with _simulation_pool_lock:
+        if _simulation_pool is None or _simulation_pool_pid != os.getpid():
+            # spawn, not fork: a forked copy of a gevent/threaded worker can
+            # inherit locks held by other threads
+            _simulation_pool = ProcessPoolExecutor(max_workers=SIMULATION_PROCESSES,
+                                                   mp_context=multiprocessing.get_context('spawn'))
+            _simulation_pool_pid = os.getpid()
+        return _simulation_pool
+
+def reset_simulation_pool():
+    global _simulation_pool
+    with _simulation_pool_lock:
+        _simulation_pool = None
+
+def parse_simulation_params(args, record):
+    """Settings from the query string; raises ValueError with a message for the user"""
+    staking = args.get('staking', 'flat')
+    if staking not in simulate.STAKING:
+        raise ValueError(f"staking must be one of {', '.join(simulate.STAKING)}")
+    method = args.get('method', 'grouped')
+    if method not in simulate.METHODS:
+        raise ValueError(f"method must be one of {', '.join(simulate.METHODS)}")
+
+    # Defaults follow the user's own betting: their typical stake, and a
+    # bankroll of 50 of them
+    typical_stake = float(simulate.np.median(record['stakes'])) or 10.0
+    params = {'staking': staking, 'method': method}
+    for name, convert, default, low, high in (
+        ('paths', int, SIMULATION_PATHS, 100, SIMULATION_MAX_PATHS),
+        ('bets', int, SIMULATION_BETS, 10, SIMULATION_MAX_BETS),
+        ('bankroll', float, typical_stake * 50, 1, 10_000_000),
+        ('stake', float, typical_stake, 0.01, 1_000_000),
+        ('fraction', float, 0.02, 0.001, 0.5),
+        ('kelly_fraction', float, 0.5, 0.01, 1),
+        ('ruin', float, 0.1, 0, 0.99),
+    ):
+        value = args.get(name)
+        try:
+            params[name] = convert(value) if value else default
+        except ValueError:
+            raise ValueError(f'{name} must be a number')
+        if not low <= params[name] <= high:
+            raise ValueError(f'{name} must be between {low} and {high}')
+    if params['paths'] * params['bets'] > SIMULATION_MAX_CELLS:
+        raise ValueError(f'paths x bets must be at most {SIMULATION_MAX_CELLS:,}')
+    params['bankroll'] = round(params['bankroll'], 2)
+    return params
+
+def run_simulation(record, params):
+    """Run the paths across the pool and summarise them"""
+    shares = min(SIMULATION_PROCESSES, params['paths'] // 1000) or 1
+    seeds = simulate.np.random.SeedSequence().spawn(shares)
+    sizes = [params['paths'] // shares + (i < params['paths'] % shares) for i in range(shares)]
+    pool = get_simulation_pool()
+    futures = [pool.submit(simulate.run_paths, record, params, size, seed) for size, seed in zip(sizes, seeds)]
+    try:
+        results = [future.result(timeout=SIMULATION_TIMEOUT_SECONDS) for future in futures]
+    except BrokenProcessPool:
+        reset_simulation_pool()  # a process died (out of memory?); start fresh next time
+        raise
+    return simulate.summarise(record, params, results)
+
+@app.route('/api/simulate')
+@login_required
+def api_simulate():
+    """Simulate the user's bankroll going forward from their settled bets.
+
+    ?staking=flat|percent|kelly, ?method=grouped|bootstrap, ?paths, ?bets
+    (how many bets each path places), ?bankroll, ?stake (flat), ?fraction
+    (percent), ?kelly_fraction (kelly), ?ruin (share of the bankroll that
+    counts as ruined). Returns percentile bands of the bankroll, the final
+    bankroll, max drawdown and risk of ruin."""
+    user = get_current_user()
+    if not simulate.available():
+        return jsonify({'error': 'Simulation needs numpy installed on the server'}), 503
+
+    record = simulate.prepare(get_settled_bets(user['id'], SIMULATION_COLUMNS))
+    if record is None or len(record['b']) < SIMULATION_MIN_BETS:
+        return jsonify({'error': f'Simulation needs at least {SIMULATION_MIN_BETS} settled bets with odds'}), 400
+    try:
+        params = parse_simulation_params(request.args, record)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    started = time.time()
+    key = 'simulation:' + ':'.join(f'{name}={params[name]}' for name in sorted(params))
+    try:
+        result = cached(user['id'], key, lambda: run_simulation(record, params))
+    except FutureTimeoutError:
+        return jsonify({'error': 'Simulation took too long - try fewer paths or bets'}), 503
+    except Exception as e:
+        print(f"Simulation error: {e}")
+        return jsonify({'error': 'Could not run the simulation'}), 500
+    return jsonify(dict(result, took_ms=round((time.time() - started) * 1000)))
+
 # ==============================================
 # STRIPE PAYMENT ROUTES
 # ==============================================
@@ -956,10 +2584,13 @@ def create_checkout_session():
         else:
             checkout_params['customer_email'] = user['email']
 
-        checkout_session = stripe.checkout.Session.create(**checkout_params)
+        checkout_session = stripe_remote.call(lambda: stripe.checkout.Session.create(**checkout_params))
 
         return redirect(checkout_session.url)
 
+    except RemoteUnavailable as e:
+        print(f"Stripe checkout error: {e}")
+        return jsonify({'error': 'Payments are temporarily unavailable. Please try again in a few minutes.'}), 503
     except Exception as e:
         print(f"Stripe checkout error: {e}")
         return jsonify({'error': str(e)}), 500
@@ -998,24 +2629,111 @@ def stripe_webhook():
         print(f"Invalid signature: {e}")
         return jsonify({'error': 'Invalid signature'}), 400
 
-    # Handle the event
+    # Record the event before acknowledging. The event id is the primary key,
+    # so a redelivery of something we've already stored is just acknowledged.
+    event = json.loads(payload)
+    subscription_key = get_event_subscription_key(event)
+    try:
+        supabase_admin.table('stripe_events').insert({
+            'id': event['id'],
+            'type': event['type'],
+            'subscription_id': subscription_key,
+            'stripe_created': event.get('created'),
+            'payload': event,
+            'status': 'pending',
+            'attempts': 0
+        }).execute()
+    except Exception as e:
+        if 'duplicate' in str(e).lower() or '23505' in str(e):
+            return jsonify({'status': 'duplicate'})
+        # Couldn't store it - let Stripe retry the delivery
+        print(f"Error storing Stripe event {event['id']}: {e}")
+        return jsonify({'error': 'Could not record event'}), 500
+
+    enqueue_job(process_stripe_events, subscription_key)
+
+    return jsonify({'status': 'queued'})
+
+def get_event_subscription_key(event):
+    """Key used to apply events in order (subscription id when there is one)"""
+    obj = event['data']['object']
+    if event['type'].startswith('customer.subscription.'):
+        return obj.get('id')
+    return obj.get('subscription') or obj.get('customer') or event['id']
+
+def apply_stripe_event(event):
+    """Run the handler for one Stripe event. Raises if the handler fails."""
     if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        handle_checkout_completed(session)
+        handle_checkout_completed(event['data']['object'])
 
     elif event['type'] == 'customer.subscription.updated':
-        subscription = event['data']['object']
-        handle_subscription_updated(subscription)
+        handle_subscription_updated(event['data']['object'])
 
     elif event['type'] == 'customer.subscription.deleted':
-        subscription = event['data']['object']
-        handle_subscription_deleted(subscription)
+        handle_subscription_deleted(event['data']['object'])
 
     elif event['type'] == 'invoice.payment_failed':
-        invoice = event['data']['object']
-        handle_payment_failed(invoice)
+        handle_payment_failed(event['data']['object'])
+
+def process_stripe_events(subscription_key):
+    """Apply pending events for one subscription, oldest first (background job).
 
-    return jsonify({'status': 'success'})
+    Stops at the first failure so later events never overtake an earlier one,
+    and schedules a retry with backoff until MAX_WEBHOOK_ATTEMPTS is reached.
+    If another worker is applying an earlier event it is left to carry on with
+    the rest: it looks again for new events once its own are done."""
+    while True:
+        response = supabase_admin.table('stripe_events').select('*').eq('subscription_id', subscription_key).in_('status', ['pending', 'processing']).order('stripe_created').execute()
+        if not response.data:
+            return
+
+        for record in response.data:
+            if record['status'] == 'processing':
+                return
+            # Claim the event so another worker can't apply it too
+            claimed = supabase_admin.table('stripe_events').update({
+                'status': 'processing',
+                'claimed_at': datetime.now(timezone.utc).isoformat()
+            }).eq('id', record['id']).eq('status', 'pending').execute()
+            if not claimed.data:
+                return
+
+            try:
+                apply_stripe_event(record['payload'])
+            except Exception as e:
+                attempts = record['attempts'] + 1
+                status = 'failed' if attempts >= MAX_WEBHOOK_ATTEMPTS else 'pending'
+                print(f"Stripe event {record['id']} failed (attempt {attempts}): {e}")
+                supabase_admin.table('stripe_events').update({
+                    'status': status,
+                    'attempts': attempts,
+                    'last_error': str(e)[:500]
+                }).eq('id', record['id']).execute()
+                if status == 'pending':
+                    enqueue_job_later(2 ** attempts, process_stripe_events, subscription_key)
+                return
+
+            supabase_admin.table('stripe_events').update({
+                'status': 'processed',
+                'attempts': record['attempts'] + 1,
+                'processed_at': datetime.now().isoformat()
+            }).eq('id', record['id']).execute()
+
+def recover_stripe_events():
+    """Re-queue events left pending or mid-processing by a restarted worker.
+    A processing event is only handed back once its claim has expired, so one
+    a live worker is still applying isn't applied twice."""
+    try:
+        cutoff = (datetime.now(timezone.utc) - timedelta(minutes=STRIPE_CLAIM_LEASE_MINUTES)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        # Events claimed before claimed_at existed have none; treat them as expired
+        supabase_admin.table('stripe_events').update({'status': 'pending'}).eq('status', 'processing').or_(f'claimed_at.is.null,claimed_at.lt.{cutoff}').execute()
+        response = supabase_admin.table('stripe_events').select('subscription_id').eq('status', 'pending').execute()
+        for key in sorted({row['subscription_id'] for row in response.data}):
+            enqueue_job(process_stripe_events, key)
+    except Exception as e:
+        print(f"Error recovering Stripe events: {e}")
+
+recovery_jobs.append(recover_stripe_events)
 
 def handle_checkout_completed(session):
     """Handle successful checkout - create/update subscription record"""
@@ -1029,30 +2747,28 @@ def handle_checkout_completed(session):
 
     print(f"Checkout completed for user {user_id}")
 
-    try:
-        # Check if subscription record exists
-        existing = supabase_admin.table('subscriptions').select('id').eq('user_id', user_id).execute()
-
-        subscription_data = {
-            'user_id': user_id,
-            'stripe_customer_id': customer_id,
-            'stripe_subscription_id': subscription_id,
-            'status': 'active',
-            'updated_at': datetime.now().isoformat()
-        }
+    # Check if subscription record exists
+    existing = supabase_admin.table('subscriptions').select('id').eq('user_id', user_id).execute()
 
-        if existing.data:
-            # Update existing record
-            supabase_admin.table('subscriptions').update(subscription_data).eq('user_id', user_id).execute()
-        else:
-            # Create new record
-            subscription_data['created_at'] = datetime.now().isoformat()
-            supabase_admin.table('subscriptions').insert(subscription_data).execute()
+    subscription_data = {
+        'user_id': user_id,
+        'stripe_customer_id': customer_id,
+        'stripe_subscription_id': subscription_id,
+        'status': 'active',
+        'updated_at': datetime.now().isoformat()
+    }
 
-        print(f"Subscription activated for user {user_id}")
+    if existing.data:
+        # Update existing record
+        supabase_admin.table('subscriptions').update(subscription_data).eq('user_id', user_id).execute()
+    else:
+        # Create new record
+        subscription_data['created_at'] = datetime.now().isoformat()
+        supabase_admin.table('subscriptions').insert(subscription_data).execute()
 
-    except Exception as e:
-        print(f"Error saving subscription: {e}")
+    invalidate_user_cache(user_id)
+
+    print(f"Subscription activated for user {user_id}")
 
 def handle_subscription_updated(subscription):
     """Handle subscription status changes"""
@@ -1062,22 +2778,19 @@ def handle_subscription_updated(subscription):
 
     print(f"Subscription {subscription_id} updated to status: {status}")
 
-    try:
-        # Map Stripe status to our status
-        if status in ['active', 'trialing']:
-            our_status = 'active'
-        elif status in ['past_due', 'unpaid']:
-            our_status = 'past_due'
-        else:
-            our_status = 'inactive'
+    # Map Stripe status to our status
+    if status in ['active', 'trialing']:
+        our_status = 'active'
+    elif status in ['past_due', 'unpaid']:
+        our_status = 'past_due'
+    else:
+        our_status = 'inactive'
 
-        supabase_admin.table('subscriptions').update({
-            'status': our_status,
-            'updated_at': datetime.now().isoformat()
-        }).eq('stripe_subscription_id', subscription_id).execute()
-
-    except Exception as e:
-        print(f"Error updating subscription: {e}")
+    response = supabase_admin.table('subscriptions').update({
+        'status': our_status,
+        'updated_at': datetime.now().isoformat()
+    }).eq('stripe_subscription_id', subscription_id).execute()
+    invalidate_subscription_users(response.data)
 
 def handle_subscription_deleted(subscription):
     """Handle subscription cancellation"""
@@ -1085,14 +2798,11 @@ def handle_subscription_deleted(subscription):
 
     print(f"Subscription {subscription_id} deleted/cancelled")
 
-    try:
-        supabase_admin.table('subscriptions').update({
-            'status': 'cancelled',
-            'updated_at': datetime.now().isoformat()
-        }).eq('stripe_subscription_id', subscription_id).execute()
-
-    except Exception as e:
-        print(f"Error cancelling subscription: {e}")
+    response = supabase_admin.table('subscriptions').update({
+        'status': 'cancelled',
+        'updated_at': datetime.now().isoformat()
+    }).eq('stripe_subscription_id', subscription_id).execute()
+    invalidate_subscription_users(response.data)
 
 def handle_payment_failed(invoice):
     """Handle failed payment"""
@@ -1101,14 +2811,17 @@ def handle_payment_failed(invoice):
 
     print(f"Payment failed for subscription {subscription_id}")
 
-    try:
-        supabase_admin.table('subscriptions').update({
-            'status': 'past_due',
-            'updated_at': datetime.now().isoformat()
-        }).eq('stripe_subscription_id', subscription_id).execute()
+    response = supabase_admin.table('subscriptions').update({
+        'status': 'past_due',
+        'updated_at': datetime.now().isoformat()
+    }).eq('stripe_subscription_id', subscription_id).execute()
+    invalidate_subscription_users(response.data)
 
-    except Exception as e:
-        print(f"Error updating subscription on payment failure: {e}")
+def invalidate_subscription_users(rows):
+    """Drop cached tier info for the users on updated subscription rows"""
+    for row in rows or []:
+        if row.get('user_id'):
+            invalidate_user_cache(row['user_id'])
 
 @app.route('/manage-subscription')
 @login_required
@@ -1129,13 +2842,16 @@ def manage_subscription():
         customer_id = existing.data[0]['stripe_customer_id']
 
         # Create portal session
-        portal_session = stripe.billing_portal.Session.create(
+        portal_session = stripe_remote.call(lambda: stripe.billing_portal.Session.create(
             customer=customer_id,
             return_url=request.host_url
-        )
+        ))
 
         return redirect(portal_session.url)
 
+    except RemoteUnavailable as e:
+        print(f"Portal error: {e}")
+        return jsonify({'error': 'Payments are temporarily unavailable. Please try again in a few minutes.'}), 503
     except Exception as e:
         print(f"Portal error: {e}")
         return redirect(url_for('pricing'))
@@ -1158,57 +2874,184 @@ def delete_account():
                                  error='Please type "delete my account" to confirm.')
 
         try:
-            # 1. Cancel Stripe subscription if exists
-            try:
-                sub_response = supabase_admin.table('subscriptions').select('stripe_subscription_id, stripe_customer_id').eq('user_id', user['id']).execute()
-                if sub_response.data and sub_response.data[0].get('stripe_subscription_id'):
-                    subscription_id = sub_response.data[0]['stripe_subscription_id']
-                    if STRIPE_SECRET_KEY:
-                        try:
-                            stripe.Subscription.delete(subscription_id)
-                            print(f"Cancelled Stripe subscription {subscription_id}")
-                        except Exception as e:
-                            print(f"Error cancelling Stripe subscription: {e}")
-            except Exception as e:
-                print(f"Error fetching subscription: {e}")
+            # Queue the deletion; the background job does the slow parts
+            supabase_admin.table('account_deletions').upsert({
+                'user_id': user['id'],
+                'email': user['email'],
+                'status': 'queued',
+                'attempts': 0,
+                'requested_at': datetime.now().isoformat()
+            }, on_conflict='user_id').execute()
+        except Exception as e:
+            print(f"Error queueing account deletion: {e}")
+            return render_template('delete_account.html', user=user,
+                                 error='An error occurred. Please try again or contact support.')
 
-            # 2. Delete all user's bets
-            try:
-                supabase_admin.table('bets').delete().eq('user_id', user['id']).execute()
-                print(f"Deleted bets for user {user['id']}")
-            except Exception as e:
-                print(f"Error deleting bets: {e}")
+        enqueue_job(run_account_deletion, user['id'])
 
-            # 3. Delete subscription record
-            try:
-                supabase_admin.table('subscriptions').delete().eq('user_id', user['id']).execute()
-                print(f"Deleted subscription record for user {user['id']}")
-            except Exception as e:
-                print(f"Error deleting subscription record: {e}")
+        session.clear()
+        return redirect(url_for('account_deleted'))
 
-            # 4. Delete the auth user (requires service role key)
-            try:
-                supabase_admin.auth.admin.delete_user(user['id'])
-                print(f"Deleted auth user {user['id']}")
-            except Exception as e:
-                print(f"Error deleting auth user: {e}")
+    return render_template('delete_account.html', user=user)
 
-            # 5. Clear session and redirect
-            session.clear()
-            return redirect(url_for('account_deleted'))
+def run_account_deletion(user_id):
+    """Delete a user's data step by step (background job).
+
+    Each step is recorded on the account_deletions row as it finishes, so a
+    job that dies part way through picks up at the first unfinished step.
+    The job is claimed first (queued -> running); if another worker got
+    there first, this one does nothing."""
+    claimed = supabase_admin.table('account_deletions').update({
+        'status': 'running',
+        'claimed_at': datetime.now(timezone.utc).isoformat()
+    }).eq('user_id', user_id).eq('status', 'queued').execute()
+    if not claimed.data:
+        return
+    job = claimed.data[0]
 
-        except Exception as e:
-            print(f"Error during account deletion: {e}")
-            return render_template('delete_account.html', user=user,
-                                 error='An error occurred. Please try again or contact support.')
+    def mark(**fields):
+        # Every step (and every chunk of bets) renews the claim while the job is still running
+        fields.setdefault('claimed_at', datetime.now(timezone.utc).isoformat())
+        supabase_admin.table('account_deletions').update(fields).eq('user_id', user_id).execute()
 
-    return render_template('delete_account.html', user=user)
+    try:
+
+        # 1. Cancel Stripe subscription if exists
+        if not job.get('stripe_cancelled'):
+            sub_response = supabase_admin.table('subscriptions').select('stripe_subscription_id').eq('user_id', user_id).execute()
+            if sub_response.data and sub_response.data[0].get('stripe_subscription_id') and STRIPE_SECRET_KEY:
+                subscription_id = sub_response.data[0]['stripe_subscription_id']
+                try:
+                    stripe_remote.call(lambda: stripe.Subscription.delete(subscription_id))
+                    print(f"Cancelled Stripe subscription {subscription_id}")
+                except stripe.error.InvalidRequestError as e:
+                    # Already cancelled or gone on Stripe's side
+                    print(f"Stripe subscription {subscription_id} not cancelled: {e}")
+            mark(stripe_cancelled=True)
+
+        # 2. Delete the user's bets in bounded chunks
+        if not job.get('bets_deleted'):
+            while True:
+                chunk = supabase_admin.table('bets').select('id').eq('user_id', user_id).limit(ACCOUNT_DELETE_CHUNK_SIZE).execute()
+                if not chunk.data:
+                    break
+                bet_ids = [row['id'] for row in chunk.data]
+                supabase_admin.table('bets').delete().eq('user_id', user_id).in_('id', bet_ids).execute()
+                mark()  # a big account can take longer than one lease
+            if ARCHIVE_DIR:
+                supabase_admin.table('bet_month_summaries').delete().eq('user_id', user_id).execute()
+                delete_user_archive(ARCHIVE_DIR, user_id)
+            mark(bets_deleted=True)
+            invalidate_user_cache(user_id)
+            print(f"Deleted bets for user {user_id}")
+
+        # 3. Delete subscription record
+        if not job.get('subscription_deleted'):
+            supabase_admin.table('subscriptions').delete().eq('user_id', user_id).execute()
+            mark(subscription_deleted=True)
+            print(f"Deleted subscription record for user {user_id}")
+
+        # 4. Delete the auth user (requires service role key)
+        if not job.get('auth_deleted'):
+            supabase_admin.auth.admin.delete_user(user_id)
+            mark(auth_deleted=True)
+            print(f"Deleted auth user {user_id}")
+
+        mark(status='done', completed_at=datetime.now().isoformat())
+
+    except Exception as e:
+        attempts = (job.get('attempts') or 0) + 1
+        status = 'failed' if attempts >= MAX_ACCOUNT_DELETE_ATTEMPTS else 'queued'
+        print(f"Account deletion for {user_id} failed (attempt {attempts}): {e}")
+        mark(status=status, attempts=attempts, last_error=str(e)[:500])
+        if status == 'queued':
+            enqueue_job_later(2 ** attempts, run_account_deletion, user_id)
+
+def recover_account_deletions():
+    """Resume deletions that were queued, or running on a worker that stopped.
+    A running job is only handed back once its claim has expired."""
+    try:
+        cutoff = (datetime.now(timezone.utc) - timedelta(minutes=ACCOUNT_DELETE_LEASE_MINUTES)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        supabase_admin.table('account_deletions').update({'status': 'queued'}).eq('status', 'running').or_(f'claimed_at.is.null,claimed_at.lt.{cutoff}').execute()
+        response = supabase_admin.table('account_deletions').select('user_id').eq('status', 'queued').execute()
+        for row in response.data:
+            enqueue_job(run_account_deletion, row['user_id'])
+    except Exception as e:
+        print(f"Error recovering account deletions: {e}")
+
+recovery_jobs.append(recover_account_deletions)
 
 @app.route('/account-deleted')
 def account_deleted():
     """Confirmation page after account deletion"""
     return render_template('account_deleted.html')
 
+# ==============================================
+# ADMIN REPORTING
+# ==============================================
+# Totals across all users, read from the daily summary tables that
+# `python rollups.py` builds each night - never from bets directly.
+
+@app.route('/api/admin/rollups')
+@admin_required
+def admin_rollups():
+    """Daily usage, sportsbook volume and subscription totals.
+    ?days=30 (max 366) picks how far back to go.
+
+    conversion_rate is subscriptions started per 100 sign-ups over the same
+    days (per day and for the whole period); None when nobody signed up."""
+    days = max(1, min(request.args.get('days', 30, type=int), 366))
+    start = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+
+    try:
+        usage = supabase_admin.table('daily_usage').select('*').gte('day', start).order('day').execute().data
+        books = supabase_admin.table('daily_sportsbook_bets').select('*').gte('day', start).order('day').execute().data
+        checkpoint = supabase_admin.table('rollup_checkpoints').select('cursor,updated_at').eq('name', 'daily').execute().data
+    except Exception as e:
+        print(f"Error loading rollups: {e}")
+        return jsonify({'error': 'Could not load rollups'}), 500
+
+    def conversion_rate(new_paid, signups):
+        return round(new_paid / signups * 100, 1) if signups else None
+
+    for day in usage:
+        day['conversion_rate'] = conversion_rate(day['new_paid'], day.get('signups', 0))
+    totals = {
+        name: sum(day.get(name, 0) for day in usage)
+        for name in ('new_bets', 'extension_bets', 'quota_hits', 'signups', 'new_paid', 'cancelled')
+    }
+    totals['conversion_rate'] = conversion_rate(totals['new_paid'], totals['signups'])
+    paid_days = [day['paid_users'] for day in usage if day.get('paid_users') is not None]
+    totals['paid_users'] = paid_days[-1] if paid_days else None
+
+    sportsbooks = {}
+    for row in books:
+        sportsbooks[row['sportsbook']] = sportsbooks.get(row['sportsbook'], 0) + row['bets']
+
+    return jsonify({
+        'days': usage,
+        'sportsbooks': dict(sorted(sportsbooks.items(), key=lambda item: -item[1])),
+        'sportsbooks_by_day': books,
+        'totals': totals,
+        'last_run': checkpoint[0]['updated_at'] if checkpoint else None
+    })
+
+@app.route('/api/admin/metrics')
+@admin_required
+def admin_metrics():
+    """Counters for the worker that answers (each gunicorn worker keeps its own)"""
+    coalescing = flights.metrics()
+    for counts in coalescing.values():
+        calls = counts['issued'] + counts['coalesced']
+        counts['coalesced_pct'] = round(counts['coalesced'] / calls * 100, 1) if calls else 0
+    return jsonify({
+        'pid': os.getpid(),
+        'singleflight': coalescing,
+        'prefetch': dict(prefetch_counts, pending=len(_prefetching)),
+        'remotes': {remote.name: remote.metrics() for remote in (supabase_remote, auth_remote, stripe_remote)},
+        'stale_served': dict(fallback_counts)
+    })
+
 # ==============================================
 # ERROR HANDLERS
 # ==============================================
@@ -1223,12 +3066,28 @@ def internal_server_error(e):
     """Handle 500 errors"""
     return render_template('500.html'), 500
 
+@app.errorhandler(RemoteUnavailable)
+def remote_unavailable(e):
+    """Supabase couldn't be reached and there was no stale copy to serve"""
+    app.logger.warning("Remote unavailable on %s: %s", request.path, e)
+    if request.path.startswith('/api/'):
+        return jsonify({'error': 'Service temporarily unavailable. Please try again in a few minutes.'}), 503
+    return render_template('500.html'), 503
+
 @app.route('/export-data')
 @login_required
 def export_data():
-    """Export all user's betting data as CSV"""
+    """Export all user's betting data as CSV (or ?format=ndjson|parquet|arrow)"""
     user = get_current_user()
-    bets = get_user_bets(user['id'])
+    fmt = request.args.get('format', 'csv')
+    if fmt in bet_files.FORMATS:
+        return export_bet_file(user['id'], fmt)
+
+    bets = get_user_bets(user['id'], EXPORT_COLUMNS)
+    if ARCHIVE_DIR:
+        # Old settled bets are in cold storage - put them back in
+        archived = read_archived_bets(ARCHIVE_DIR, user['id'])
+        bets += sorted(archived, key=lambda b: b.get('created_at') or '', reverse=True)
 
     # Create CSV in memory
     output = io.StringIO()
@@ -1266,6 +3125,38 @@ def export_data():
         headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
+EXPORT_PAGE_SIZE = 1000
+
+def iter_export_pages(user_id):
+    """A user's bets EXPORT_PAGE_SIZE rows at a time, then their archived months"""
+    last_id = 0
+    while True:
+        page = supabase_admin.table('bets').select('id,' + EXPORT_COLUMNS).eq('user_id', user_id) \
+            .gt('id', last_id).order('id').limit(EXPORT_PAGE_SIZE).execute().data
+        if page:
+            yield page
+        if len(page) < EXPORT_PAGE_SIZE:
+            break
+        last_id = page[-1]['id']
+
+    if ARCHIVE_DIR:
+        for month in archived_months(ARCHIVE_DIR, user_id):
+            yield read_month(ARCHIVE_DIR, user_id, month)
+
+def export_bet_file(user_id, fmt):
+    """Stream an export as it's written, one record batch per page"""
+    if not bet_files.available(fmt):
+        return jsonify({'success': False, 'error': f'{fmt.title()} export needs pyarrow installed on the server'}), 501
+
+    extension, mimetype = bet_files.FORMATS[fmt]
+    filename = f"locktracker_export_{datetime.now().strftime('%Y%m%d')}.{extension}"
+    chunks = bet_files.export_chunks(iter_export_pages(user_id), fmt)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
 if __name__ == '__main__':
     print("=" * 50)
     print("LOCKTRACKER - Starting up!")
@@ -1274,4 +3165,4 @@ if __name__ == '__main__':
     print("\nPress Ctrl+C to stop the server\n")
     # Use debug=True only in development
     debug_mode = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
-    app.run(debug=debug_mode, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
+    create_app().run(debug=debug_mode, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
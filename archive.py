@@ -0,0 +1,191 @@
+"""
+LockTracker - Cold storage for old settled bets
+Settled bets older than ARCHIVE_HORIZON_DAYS never change, so this moves
+them out of the bets table: each user-month goes to a gzipped NDJSON file,
+
+    ARCHIVE_DIR/<user_id>/<YYYY-MM>.ndjson.gz
+
+and is replaced in the database by a few bet_month_summaries rows (one per
+sport, bet type and result - see migrations/0005_bet_archive.sql). Stats and
+analytics add the summaries to the hot rows; CSV export reads the files back.
+Rewriting a user's summaries also tells every worker's local bet cache to
+reload them (migrations/0010_bet_month_summary_versions.sql).
+
+Each month is written to its file and verified before its rows are deleted,
+and its summaries are rebuilt from the file afterwards. If a run dies in
+between, the next run rebuilds any month whose file has no summaries.
+ARCHIVE_DIR must be persistent storage (e.g. a mounted volume), not a
+container's scratch disk.
+
+    ARCHIVE_DIR=/data/archive python archive.py          # compact everyone
+    ARCHIVE_DIR=/data/archive python archive.py <user_id>
+"""
+
+import gzip
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+PAGE_SIZE = 1000
+DELETE_CHUNK_SIZE = 500
+
+# ---------- archive files ----------
+
+def month_path(archive_dir, user_id, month):
+    return os.path.join(archive_dir, str(user_id), f'{month}.ndjson.gz')
+
+def read_month(archive_dir, user_id, month):
+    path = month_path(archive_dir, user_id, month)
+    if not os.path.exists(path):
+        return []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def write_month(archive_dir, user_id, month, rows):
+    """Add rows to a month's file (replacing any with the same id).
+    Written to a temp file and renamed, so a crash never leaves half a file."""
+    merged = {row['id']: row for row in read_month(archive_dir, user_id, month)}
+    merged.update({row['id']: row for row in rows})
+
+    path = month_path(archive_dir, user_id, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+            for row in sorted(merged.values(), key=lambda r: r['id']):
+                f.write((json.dumps(row) + '\n').encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+    # Read it back before anyone deletes the originals
+    saved = {row['id'] for row in read_month(archive_dir, user_id, month)}
+    if not saved.issuperset(merged):
+        raise IOError(f'Archive {path} is missing rows after writing')
+
+def archived_months(archive_dir, user_id):
+    folder = os.path.join(archive_dir, str(user_id))
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name[:7] for name in os.listdir(folder) if name.endswith('.ndjson.gz'))
+
+def read_archived_bets(archive_dir, user_id):
+    """Every archived bet for a user, oldest month first"""
+    bets = []
+    for month in archived_months(archive_dir, user_id):
+        bets.extend(read_month(archive_dir, user_id, month))
+    return bets
+
+def delete_user_archive(archive_dir, user_id):
+    for month in archived_months(archive_dir, user_id):
+        os.remove(month_path(archive_dir, user_id, month))
+    folder = os.path.join(archive_dir, str(user_id))
+    if os.path.isdir(folder):
+        os.rmdir(folder)
+
+# ---------- summaries ----------
+
+def summarize(user_id, month, rows):
+    """Per sport / bet type / result totals, grouped on the raw values like
+    the live category stats (a missing value is stored as '', as the
+    columns are part of the key)"""
+    groups = {}
+    for row in rows:
+        key = (row.get('sport') or '', row.get('bet_type') or '', row['result'])
+        group = groups.setdefault(key, {'bet_count': 0, 'wagered': 0, 'profit': 0})
+        group['bet_count'] += 1
+        group['wagered'] += row.get('amount') or 0
+        group['profit'] += row.get('profit') or 0
+    return [
+        {'user_id': user_id, 'month': f'{month}-01', 'sport': sport, 'bet_type': bet_type, 'result': result,
+         'bet_count': g['bet_count'], 'wagered': round(g['wagered'], 2), 'profit': round(g['profit'], 2)}
+        for (sport, bet_type, result), g in groups.items()
+    ]
+
+def rebuild_summaries(db, archive_dir, user_id, month):
+    """Replace a month's summary rows with totals from its archive file"""
+    rows = summarize(user_id, month, read_month(archive_dir, user_id, month))
+    db.table('bet_month_summaries').delete().eq('user_id', user_id).eq('month', f'{month}-01').execute()
+    if rows:
+        db.table('bet_month_summaries').insert(rows).execute()
+
+def repair_summaries(db, archive_dir, user_id):
+    """Rebuild summaries for archived months that have none (interrupted run)"""
+    response = db.table('bet_month_summaries').select('month').eq('user_id', user_id).execute()
+    summarized = {row['month'][:7] for row in response.data}
+    missing = [month for month in archived_months(archive_dir, user_id) if month not in summarized]
+    for month in missing:
+        rebuild_summaries(db, archive_dir, user_id, month)
+    return missing
+
+# ---------- compaction ----------
+
+def archive_cutoff(horizon_days, today=None):
+    """First day of the month holding (today - horizon): only whole months move"""
+    day = (today or date.today()) - timedelta(days=horizon_days)
+    return day.replace(day=1).isoformat()
+
+def fetch_old_bets(db, cutoff, columns='*', user_id=None):
+    rows = []
+    while True:
+        query = db.table('bets').select(columns).neq('result', 'pending').lt('date', cutoff)
+        if user_id:
+            query = query.eq('user_id', user_id)
+        page = query.order('id').range(len(rows), len(rows) + PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+
+def compact_user(db, archive_dir, user_id, cutoff):
+    """Archive a user's settled bets dated before `cutoff`; returns how many moved"""
+    repair_summaries(db, archive_dir, user_id)
+
+    rows = fetch_old_bets(db, cutoff, user_id=user_id)
+    if not rows:
+        return 0
+
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row['date'][:7], []).append(row)
+
+    for month, month_rows in sorted(by_month.items()):
+        write_month(archive_dir, user_id, month, month_rows)
+
+    ids = [row['id'] for row in rows]
+    for i in range(0, len(ids), DELETE_CHUNK_SIZE):
+        db.table('bets').delete().eq('user_id', user_id).in_('id', ids[i:i + DELETE_CHUNK_SIZE]).execute()
+
+    for month in by_month:
+        rebuild_summaries(db, archive_dir, user_id, month)
+    return len(rows)
+
+def run_compaction(db, archive_dir, horizon_days, user_ids=None, on_user_done=None):
+    """Compact every user with bets past the horizon (or just `user_ids`)"""
+    cutoff = archive_cutoff(horizon_days)
+    if user_ids is None:
+        user_ids = {row['user_id'] for row in fetch_old_bets(db, cutoff, columns='id,user_id')}
+        # Users whose last run was interrupted may have nothing left to move
+        if os.path.isdir(archive_dir):
+            user_ids.update(os.listdir(archive_dir))
+
+    total = 0
+    for user_id in sorted(user_ids):
+        moved = compact_user(db, archive_dir, user_id, cutoff)
+        if on_user_done:
+            on_user_done(user_id)
+        if moved:
+            print(f"{user_id}: archived {moved} bets from before {cutoff}")
+        total += moved
+    return total
+
+if __name__ == '__main__':
+    import app
+
+    if not app.ARCHIVE_DIR:
+        sys.exit('Set ARCHIVE_DIR to a persistent directory first')
+    only = sys.argv[1:] or None
+    with app.supabase_remote.deadline(app.BATCH_DEADLINE_SECONDS, app.BATCH_TIMEOUT_SECONDS):
+        moved = run_compaction(app.supabase_admin, app.ARCHIVE_DIR, app.ARCHIVE_HORIZON_DAYS,
+                               user_ids=only, on_user_done=app.invalidate_user_cache)
+    print(f"Archived {moved} bets")
@@ -0,0 +1,300 @@
+"""
+LockTracker - Bulk bet files
+Export and import in NDJSON, Parquet and Arrow IPC, for people who analyse
+their history in pandas/polars rather than a spreadsheet.
+
+Columns and types follow the bets table (migrations/0000_baseline.sql):
+odds is int32, amount and profit float64, date a date and created_at a UTC
+timestamp. Exports are written a page of bets at a time as record batches, so
+memory stays around one page no matter how long the history is. Imports are
+read in batches too, checked column-at-a-time with pyarrow.compute and handed
+back as lists of rows ready for one insert each. A value that can't be read
+as its column's type rejects only its own row, not the batch.
+
+pyarrow is optional: without it NDJSON still works (row by row) and the
+Parquet/Arrow formats report that they're unavailable.
+"""
+
+import json
+from datetime import date, datetime, timezone
+
+try:
+    import pyarrow as pa  # optional - only needed for Parquet/Arrow
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FORMATS = {
+    # format: (file extension, mimetype)
+    'ndjson': ('ndjson', 'application/x-ndjson'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('arrow', 'application/vnd.apache.arrow.stream'),
+}
+IMPORT_EXTENSIONS = {'.ndjson': 'ndjson', '.jsonl': 'ndjson', '.parquet': 'parquet', '.arrow': 'arrow', '.arrows': 'arrow'}
+COLUMNS = ['date', 'sport', 'matchup', 'bet_type', 'bet_description', 'odds', 'amount',
+           'result', 'profit', 'sportsbook', 'created_at']
+RESULTS = ['pending', 'win', 'loss', 'push']
+IMPORT_BATCH_SIZE = 1000
+
+# What a missing value becomes on import - the same defaults as CSV import
+IMPORT_DEFAULTS = {
+    'sport': 'Other',
+    'matchup': 'Unknown',
+    'bet_type': 'Other',
+    'bet_description': '',
+    'odds': -110,
+    'amount': 0,
+    'result': 'pending',
+    'sportsbook': '',
+}
+
+def available(fmt):
+    return fmt == 'ndjson' or (fmt in FORMATS and pa is not None)
+
+def bet_schema():
+    return pa.schema([
+        ('date', pa.date32()),
+        ('sport', pa.string()),
+        ('matchup', pa.string()),
+        ('bet_type', pa.string()),
+        ('bet_description', pa.string()),
+        ('odds', pa.int32()),
+        ('amount', pa.float64()),
+        ('result', pa.string()),
+        ('profit', pa.float64()),
+        ('sportsbook', pa.string()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+    ])
+
+# ---------- export ----------
+
+def parse_date(value):
+    return date.fromisoformat(value[:10]) if value else None
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    stamp = datetime.fromisoformat(value)
+    return stamp if stamp.tzinfo else stamp.replace(tzinfo=timezone.utc)
+
+def rows_to_batch(rows, schema):
+    """One page of bet rows (as the API returns them) as a typed record batch"""
+    columns = {name: [row.get(name) for row in rows] for name in COLUMNS}
+    columns['date'] = [parse_date(value) for value in columns['date']]
+    columns['created_at'] = [parse_timestamp(value) for value in columns['created_at']]
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+def ndjson_chunks(pages):
+    for rows in pages:
+        yield ''.join(json.dumps({name: row.get(name) for name in COLUMNS}) + '\n' for row in rows)
+
+class ChunkSink:
+    """Write-only file that hands back whatever was written since the last take()"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def arrow_chunks(pages, fmt):
+    """Parquet (one row group per page) or Arrow IPC stream bytes, as written"""
+    schema = bet_schema()
+    sink = ChunkSink()
+    stream = pa.PythonFile(sink, mode='w')
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(stream, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_stream(stream, schema)
+
+    for rows in pages:
+        if rows:
+            writer.write_batch(rows_to_batch(rows, schema))
+            yield sink.take()
+    writer.close()
+    yield sink.take()
+
+def export_chunks(pages, fmt):
+    return ndjson_chunks(pages) if fmt == 'ndjson' else arrow_chunks(pages, fmt)
+
+# ---------- import ----------
+
+def read_ndjson_rows(file):
+    """Parsed NDJSON lines, IMPORT_BATCH_SIZE rows per list"""
+    rows = []
+    for line in file:
+        line = line.strip()
+        if line:
+            rows.append(json.loads(line))
+        if len(rows) == IMPORT_BATCH_SIZE:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+def read_batches(file, fmt):
+    """Record batches from an uploaded file (pyarrow required)"""
+    if fmt == 'parquet':
+        yield from pq.ParquetFile(file).iter_batches(batch_size=IMPORT_BATCH_SIZE)
+    elif fmt == 'arrow':
+        data = file.read()
+        try:
+            reader = pa.ipc.open_stream(data)
+        except pa.ArrowInvalid:
+            reader = pa.ipc.open_file(data)  # the random-access variant (.arrow / Feather v2)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+            return
+        yield from reader
+    else:
+        for rows in read_ndjson_rows(file):
+            # Let each column find its own type, then cast it like a file column
+            names = {name for row in rows for name in row}
+            yield pa.table({name: ndjson_array([row.get(name) for row in rows]) for name in names})
+
+def ndjson_array(values):
+    """An NDJSON column as an array; one with mixed types (say a number
+    column with a stray string) is kept as JSON text for the cast to check"""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([value if value is None or isinstance(value, str) else json.dumps(value)
+                         for value in values], type=pa.string())
+
+def try_cast(values, arrow_type):
+    """pc.cast, but a value that doesn't convert becomes null instead of
+    failing the whole column"""
+    try:
+        return pc.cast(values, arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+        pass
+    cast = []
+    for value in values:
+        try:
+            cast.append(value.cast(arrow_type).as_py())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            cast.append(None)
+    return pa.array(cast, type=arrow_type)
+
+def column(table, name, arrow_type, default):
+    """(the column cast to `arrow_type` with missing values set to `default`,
+    mask of rows whose value couldn't be cast)"""
+    if name not in table.column_names:
+        return pa.array([default] * table.num_rows, type=arrow_type), pa.array([False] * table.num_rows)
+    values = table.column(name)
+    if pa.types.is_string(arrow_type) and not pa.types.is_string(values.type):
+        values = try_cast(values, pa.string())
+    cast = try_cast(values, arrow_type)
+    bad = pc.and_(pc.is_null(cast), pc.is_valid(values))
+    if default is not None:
+        cast = pc.fill_null(cast, pa.scalar(default, type=arrow_type))
+    return cast, bad
+
+def validate_table(table, today):
+    """Check and complete one batch column-at-a-time.
+    Returns (rows ready to insert without user_id, number of rejected rows)."""
+    if isinstance(table, pa.RecordBatch):
+        table = pa.Table.from_batches([table])
+
+    strings = {name: column(table, name, pa.string(), IMPORT_DEFAULTS.get(name, today))
+               for name in ('date', 'sport', 'matchup', 'bet_type', 'bet_description', 'result', 'sportsbook')}
+    date_text = pc.utf8_slice_codeunits(strings['date'][0], 0, 10)
+    dates = try_cast(date_text, pa.date32())
+    odds, bad_odds = column(table, 'odds', pa.int32(), IMPORT_DEFAULTS['odds'])
+    amount, bad_amount = column(table, 'amount', pa.float64(), IMPORT_DEFAULTS['amount'])
+
+    result = pc.utf8_lower(strings['result'][0])
+    result = pc.if_else(pc.is_in(result, value_set=pa.array(RESULTS)), result, 'pending')
+
+    # Rows with a value of the wrong type (odds "abc", date 2024-13-45) are
+    # rejected on their own; the nulls they leave are filled so the sums
+    # below still work
+    valid = pc.and_(pc.invert(bad_odds), pc.invert(bad_amount))
+    valid = pc.and_(valid, pc.is_valid(dates))
+    for _, bad in strings.values():
+        valid = pc.and_(valid, pc.invert(bad))
+    odds = pc.fill_null(odds, IMPORT_DEFAULTS['odds'])
+    amount = pc.fill_null(amount, 0.0)
+
+    # Odds between -100 and +100 aren't American odds (and 0 would divide by zero)
+    valid = pc.and_(valid, pc.and_(pc.greater_equal(pc.abs(odds), 100), pc.greater_equal(amount, 0)))
+
+    # Same formula as calculate_profit, on whole columns
+    odds_f = pc.cast(odds, pa.float64())
+    win = pc.if_else(pc.greater(odds_f, 0),
+                     pc.multiply(amount, pc.divide(odds_f, 100.0)),
+                     pc.multiply(amount, pc.divide(100.0, pc.abs(odds_f))))
+    profit = pc.if_else(pc.equal(result, 'win'), win,
+                        pc.if_else(pc.equal(result, 'loss'), pc.negate(amount), 0.0))
+
+    checked = pa.table({
+        'date': dates,
+        'sport': strings['sport'][0],
+        'matchup': strings['matchup'][0],
+        'bet_type': strings['bet_type'][0],
+        'bet_description': strings['bet_description'][0],
+        'odds': odds,
+        'amount': pc.round(amount, 2),
+        'result': result,
+        'profit': pc.round(profit, 2),
+        'sportsbook': strings['sportsbook'][0],
+    }).filter(valid)
+
+    rows = checked.to_pylist()
+    for row in rows:
+        row['date'] = row['date'].isoformat()
+    return rows, table.num_rows - len(rows)
+
+def validate_rows(rows, today, calculate_profit):
+    """validate_table for NDJSON when pyarrow isn't installed"""
+    good = []
+    for raw in rows:
+        try:
+            row = {name: raw.get(name) if raw.get(name) is not None else default
+                   for name, default in IMPORT_DEFAULTS.items()}
+            row['date'] = str(raw.get('date') or today)[:10]
+            date.fromisoformat(row['date'])
+            row['odds'] = int(row['odds'])
+            row['amount'] = round(float(row['amount']), 2)
+            row['result'] = str(row['result']).lower()
+            if row['result'] not in RESULTS:
+                row['result'] = 'pending'
+            if abs(row['odds']) < 100 or row['amount'] < 0:
+                continue
+            row['profit'] = round(calculate_profit(row['odds'], row['amount'], row['result']), 2)
+            good.append(row)
+        except (TypeError, ValueError):
+            continue
+    return good, len(rows) - len(good)
+
+def read_import(file, fmt, today, calculate_profit):
+    """(rows, rejected count) for each batch of an uploaded file"""
+    if pa is None:
+        for rows in read_ndjson_rows(file):
+            yield validate_rows(rows, today, calculate_profit)
+        return
+    for batch in read_batches(file, fmt):
+        yield validate_table(batch, today)
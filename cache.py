@@ -0,0 +1,311 @@
+"""
+LockTracker - Cache backends
+One small interface over three stores, picked with the CACHE_URL setting:
+
+    memory://                  in-process LRU (default; per gunicorn worker)
+    file:///path/to/cache.db   SQLite file shared by every worker on one host
+    redis://host:6379/0        any Redis-protocol server, shared across hosts
+
+Keys for a user live in a namespace whose version number is part of the key,
+so invalidate_user() is a single increment no matter how many keys the user
+has. get_or_set() lets only one caller rebuild a missing value at a time.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+class Cache:
+    """Shared logic; backends implement get/set/add/delete/incr on raw strings"""
+
+    # How long one caller may hold the rebuild lock for a key
+    LOCK_SECONDS = 10
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    # ---------- user namespaces ----------
+
+    def user_key(self, user_id, name):
+        """Key for `name` in the user's current namespace"""
+        version = self.get_raw(f'ns:{user_id}') or '0'
+        return f'u:{user_id}:{version}:{name}'
+
+    def invalidate_user(self, user_id):
+        """Orphan every key in the user's namespace"""
+        self.incr(f'ns:{user_id}')
+
+    # ---------- values ----------
+
+    def get(self, key):
+        raw = self.get_raw(key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.set_raw(key, json.dumps(value), ttl)
+
+    def get_or_set(self, key, compute, ttl):
+        """Return the cached value, or compute and store it.
+
+        Callers in this process wait on a per-key lock; callers in other
+        processes wait on a lock key in the store. Either way only one of
+        them runs `compute` while the rest pick up its result."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._local_lock(key):
+            value = self.get(key)
+            if value is not None:
+                return value
+
+            lock_key = f'lock:{key}'
+            deadline = time.time() + self.LOCK_SECONDS
+            while not self.add_raw(lock_key, '1', self.LOCK_SECONDS):
+                time.sleep(0.05)
+                value = self.get(key)
+                if value is not None:
+                    return value
+                if time.time() > deadline:
+                    break  # lock holder is stuck - compute it ourselves
+
+            try:
+                value = compute()
+                self.set(key, value, ttl)
+            finally:
+                self.delete(lock_key)
+            return value
+
+    def _local_lock(self, key):
+        with self._locks_lock:
+            if key not in self._locks:
+                if len(self._locks) > 10000:
+                    self._locks.clear()
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': type(self).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total * 100, 1) if total else 0
+        }
+
+class MemoryCache(Cache):
+    """In-process LRU with per-entry TTL.
+
+    Counters (the ns: namespace versions) are kept apart from the LRU and
+    never evicted: losing one would bring a user's pre-invalidation
+    entries back into view."""
+
+    def __init__(self, max_entries=5000):
+        super().__init__()
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get_raw(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires and expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set_raw(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def add_raw(self, key, value, ttl):
+        with self._lock:
+            item = self._data.get(key)
+            if item and (not item[1] or item[1] >= time.time()):
+                return False
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._counters.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._counters.get(key, '0')) + 1
+            self._counters[key] = str(value)
+            return value
+
+class FileCache(Cache):
+    """SQLite-backed cache shared by all processes on one host"""
+
+    def __init__(self, path, max_entries=50000):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_expires_idx ON cache (expires)')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_raw(self, key):
+        row = self._conn().execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] and row[1] < time.time()):
+            return None
+        return row[0]
+
+    def set_raw(self, key, value, ttl):
+        conn = self._conn()
+        conn.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                     (key, value, time.time() + ttl if ttl else None))
+        self._writes += 1
+        if self._writes % 500 == 0:
+            self._prune(conn)
+
+    def add_raw(self, key, value, ttl):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if self.get_raw(key) is not None:
+                return False
+            conn.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                         (key, value, time.time() + ttl if ttl else None))
+            return True
+        finally:
+            conn.execute('COMMIT')
+
+    def delete(self, key):
+        self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def incr(self, key):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            value = int(self.get_raw(key) or 0) + 1
+            conn.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, NULL)', (key, str(value)))
+            return value
+        finally:
+            conn.execute('COMMIT')
+
+    def _prune(self, conn):
+        """Drop expired entries, then the soonest-expiring ones over the cap"""
+        conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires < ?', (time.time(),))
+        conn.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache WHERE expires IS NOT NULL '
+                     'ORDER BY expires LIMIT MAX(0, (SELECT COUNT(*) FROM cache) - ?))', (self.max_entries,))
+
+class RedisCache(Cache):
+    """Minimal client for the Redis protocol (RESP) - GET/SET/DEL/INCR only"""
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=2.0):
+        super().__init__()
+        self.host, self.port, self.db, self.password, self.timeout = host, port, db, password, timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._local.sock = sock
+        self._local.file = sock.makefile('rb')
+        self._local.pid = os.getpid()
+        if self.password:
+            self._call('AUTH', self.password)
+        if self.db:
+            self._call('SELECT', self.db)
+
+    def _call(self, *args):
+        if getattr(self._local, 'sock', None) is None or self._local.pid != os.getpid():
+            self._connect()
+        command = f'*{len(args)}\r\n'.encode()
+        for arg in args:
+            data = str(arg).encode()
+            command += b'$%d\r\n%s\r\n' % (len(data), data)
+        try:
+            self._local.sock.sendall(command)
+            return self._read_reply()
+        except (OSError, ConnectionError):
+            self._local.sock = None
+            raise
+
+    def _read_reply(self):
+        line = self._local.file.readline()
+        if not line:
+            raise ConnectionError('Redis connection closed')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RuntimeError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length == -1:
+                return None
+            data = self._local.file.read(length + 2)[:-2]
+            return data.decode()
+        if kind == b'*':
+            return [self._read_reply() for _ in range(int(rest))]
+        raise RuntimeError(f'Unexpected Redis reply: {line!r}')
+
+    def get_raw(self, key):
+        return self._call('GET', key)
+
+    def set_raw(self, key, value, ttl):
+        if ttl:
+            self._call('SET', key, value, 'PX', int(ttl * 1000))
+        else:
+            self._call('SET', key, value)
+
+    def add_raw(self, key, value, ttl):
+        return self._call('SET', key, value, 'NX', 'PX', int(ttl * 1000)) == 'OK'
+
+    def delete(self, key):
+        self._call('DEL', key)
+
+    def incr(self, key):
+        return self._call('INCR', key)
+
+def make_cache(url=None):
+    """Build a cache from a CACHE_URL (see module docstring)"""
+    if not url or url.startswith('memory://'):
+        return MemoryCache()
+    parsed = urlparse(url)
+    if parsed.scheme == 'file':
+        return FileCache(parsed.path)
+    if parsed.scheme == 'redis':
+        db = int(parsed.path.lstrip('/') or 0)
+        return RedisCache(parsed.hostname or 'localhost', parsed.port or 6379, db, parsed.password)
+    raise ValueError(f'Unsupported CACHE_URL: {url}')
@@ -0,0 +1,99 @@
+"""
+LockTracker - Chart downsampling
+An all-time history can have thousands of betting days, far more points
+than a chart is pixels wide. These thin a daily series out while keeping
+the shape a reader sees:
+
+- lttb(): Largest-Triangle-Three-Buckets. From each run of points it keeps
+  the one making the largest triangle with its neighbours, i.e. the turns.
+- min_max(): keeps the lowest and highest point of each run, so every peak
+  and drawdown survives exactly.
+- bucket_series(): rolls daily profit up into weeks or months.
+
+The selectors return indexes into the series; the first and last points are
+always kept.
+"""
+
+from datetime import date, timedelta
+
+METHODS = ['lttb', 'minmax']
+BUCKETS = ['day', 'week', 'month']
+
+def lttb(xs, ys, threshold):
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    threshold = max(threshold, 3)
+
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # The point to beat is judged against the average of the next run
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[start:end]) / (end - start)
+        avg_y = sum(ys[start:end]) / (end - start)
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = None, -1
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+def min_max(ys, threshold):
+    n = len(ys)
+    if threshold >= n:
+        return list(range(n))
+    threshold = max(threshold, 4)
+
+    runs = (threshold - 2) // 2
+    every = (n - 2) / runs
+    kept = [0]
+    for i in range(runs):
+        run = range(int(i * every) + 1, int((i + 1) * every) + 1)
+        low = min(run, key=ys.__getitem__)
+        high = max(run, key=ys.__getitem__)
+        kept.extend(sorted({low, high}))
+    kept.append(n - 1)
+    return kept
+
+def bucket_start(day, bucket):
+    """First day of the week (Monday) or month holding `day`"""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def bucket_count(days, bucket):
+    return len({bucket_start(day, bucket) for day in days})
+
+def choose_bucket(days, points):
+    """The finest of day/week/month that fits in `points` bars"""
+    for bucket in BUCKETS[:-1]:
+        if bucket_count(days, bucket) <= points:
+            return bucket
+    return BUCKETS[-1]
+
+def bucket_series(days, daily_profit, cumulative, bucket):
+    """(starts, profit per bucket, cumulative at each bucket's end)"""
+    starts, profits, ends = [], [], []
+    for day, profit, total in zip(days, daily_profit, cumulative):
+        start = bucket_start(day, bucket)
+        if starts and starts[-1] == start:
+            profits[-1] += profit
+            ends[-1] = total
+        else:
+            starts.append(start)
+            profits.append(profit)
+            ends.append(total)
+    return starts, [round(profit, 2) for profit in profits], ends
+
+def parse_days(dates):
+    return [date.fromisoformat(day[:10]) for day in dates]
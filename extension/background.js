@@ -4,6 +4,8 @@ const APP_URL = 'https://web-production-efd3.up.railway.app';
 
 // Track which tabs have already been auto-synced this session to avoid duplicates
 const syncedTabs = new Set();
+// Running count of bets auto-synced per tab (content scripts upload in batches)
+const syncedCounts = new Map();
 
 // Listen for messages from popup or content scripts
 chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
@@ -18,7 +20,7 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
     chrome.storage.local.set({
       access_token: message.access_token,
       user: message.user
-    }).then(() => {
+    }).then(() => dropStaleHandshake(message.event_id)).then(() => {
       console.log('LockTracker: Auth token stored');
       sendResponse({ success: true });
     });
@@ -27,7 +29,7 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
 
   if (message.action === 'clearAuth') {
     // User logged out
-    chrome.storage.local.remove(['access_token', 'user']).then(() => {
+    chrome.storage.local.remove(['access_token', 'user', 'handshake']).then(() => {
       console.log('LockTracker: Auth token cleared');
       sendResponse({ success: true });
     });
@@ -40,6 +42,18 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
     return true;
   }
 
+  if (message.action === 'getHandshake') {
+    // Tier / quota info, from cache unless it's expired or stale
+    getHandshake(message.force).then(sendResponse);
+    return true;
+  }
+
+  if (message.action === 'storeHandshake') {
+    // Popup got a fresh handshake back from /api/import
+    saveHandshake(message.handshake).then(() => sendResponse({ success: true }));
+    return true;
+  }
+
   return true;
 });
 
@@ -64,15 +78,9 @@ async function handlePageLoaded(tab, site) {
 
   // Check if user is Pro
   try {
-    const usageResponse = await fetch(`${APP_URL}/api/usage`, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ access_token: auth.access_token })
-    });
-
-    const usage = await usageResponse.json();
+    const usage = await getHandshake();
 
-    if (!usage.success) {
+    if (!usage || !usage.success) {
       console.log('LockTracker: Could not verify user status');
       return { autoSync: false, reason: 'auth_error' };
     }
@@ -92,6 +100,68 @@ async function handlePageLoaded(tab, site) {
   }
 }
 
+// ==============================================
+// HANDSHAKE CACHE
+// One /api/extension/handshake call answers "is the token valid, what tier,
+// how many bets left". The answer is kept in chrome.storage until its TTL
+// runs out, the token changes, or the web app reports a newer event id.
+// ==============================================
+
+async function getHandshake(force = false) {
+  const stored = await chrome.storage.local.get(['access_token', 'handshake']);
+  if (!stored.access_token) {
+    return null;
+  }
+
+  const cached = stored.handshake;
+  if (!force && cached && cached.access_token === stored.access_token && cached.expires_at > Date.now()) {
+    return cached.data;
+  }
+
+  try {
+    const response = await fetch(`${APP_URL}/api/extension/handshake`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ access_token: stored.access_token })
+    });
+    const data = await response.json();
+
+    if (data.success) {
+      await saveHandshake(data, stored.access_token);
+    } else {
+      await chrome.storage.local.remove('handshake');
+    }
+    return data;
+  } catch (error) {
+    console.error('LockTracker: Handshake failed:', error);
+    return null;
+  }
+}
+
+async function saveHandshake(data, accessToken) {
+  if (!data || !data.success) return;
+  if (!accessToken) {
+    accessToken = (await chrome.storage.local.get('access_token')).access_token;
+  }
+  await chrome.storage.local.set({
+    handshake: {
+      access_token: accessToken,
+      data: data,
+      expires_at: Date.now() + (data.ttl || 60) * 1000
+    }
+  });
+}
+
+// The web app's auth status carries the user's latest event id; if bets
+// changed since the handshake was cached, its quota numbers are out of date
+async function dropStaleHandshake(eventId) {
+  if (eventId === undefined) return;
+  const { handshake } = await chrome.storage.local.get('handshake');
+  if (handshake && handshake.data.cursors && handshake.data.cursors.event_id !== eventId) {
+    await chrome.storage.local.remove('handshake');
+  }
+}
+
 // Perform the actual sync (called by content script after scraping)
 chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
   if (message.action === 'autoSyncBets') {
@@ -123,17 +193,29 @@ async function performAutoSync(bets, tab) {
       })
     });
 
+    // Server trouble is worth another try later; other failures aren't
+    if (response.status >= 500) {
+      return { success: false, retryable: true, error: `Server error ${response.status}` };
+    }
+
     const result = await response.json();
 
+    if (result.handshake) {
+      await saveHandshake(result.handshake);
+    }
+
     if (result.success && result.imported > 0) {
       // Mark this tab as synced
       const tabKey = `${tab.id}-${tab.url}`;
       syncedTabs.add(tabKey);
+      const total = (syncedCounts.get(tabKey) || 0) + result.imported;
+      syncedCounts.set(tabKey, total);
 
-      // Show notification
+      // Show notification (one per tab, updated as more batches land)
       showNotification(
         'Bets Synced!',
-        `${result.imported} bet${result.imported > 1 ? 's' : ''} synced to LockTracker`
+        `${total} bet${total > 1 ? 's' : ''} synced to LockTracker`,
+        `sync-${tab.id}`
       );
 
       return { success: true, imported: result.imported };
@@ -148,13 +230,13 @@ async function performAutoSync(bets, tab) {
 
   } catch (error) {
     console.error('LockTracker: Auto-sync error:', error);
-    return { success: false, error: error.message };
+    return { success: false, retryable: true, error: error.message };
   }
 }
 
-// Show a notification
-function showNotification(title, message) {
-  chrome.notifications.create({
+// Show a notification (reusing an id replaces the earlier one)
+function showNotification(title, message, id = '') {
+  chrome.notifications.create(id, {
     type: 'basic',
     iconUrl: 'icons/icon128.png',
     title: title,
@@ -169,6 +251,7 @@ chrome.tabs.onRemoved.addListener((tabId) => {
   for (const key of syncedTabs) {
     if (key.startsWith(`${tabId}-`)) {
       syncedTabs.delete(key);
+      syncedCounts.delete(key);
     }
   }
 });
@@ -180,6 +263,7 @@ chrome.tabs.onUpdated.addListener((tabId, changeInfo) => {
     for (const key of syncedTabs) {
       if (key.startsWith(`${tabId}-`)) {
         syncedTabs.delete(key);
+        syncedCounts.delete(key);
       }
     }
   }
@@ -18,50 +18,25 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
   return true;
 });
 
-// Main scraping function
-function scrapeBets() {
-  console.log('LockTracker: Scraping DraftKings bets...');
-  const bets = [];
-
-  try {
-    // DraftKings bet history structure - includes mock page selectors and real site patterns
-    const betContainers = document.querySelectorAll('[class*="bet-card"], [class*="BetCard"], [class*="settled"], .history-item, .bet-slip-card, [class*="wager-item"], [class*="bet-history"]');
-
-    console.log(`LockTracker: Found ${betContainers.length} potential bet containers`);
-
-    betContainers.forEach((container, index) => {
-      try {
-        const bet = extractBetFromContainer(container);
-        if (bet) {
-          bets.push(bet);
-          console.log(`LockTracker: Extracted bet ${index + 1}:`, bet);
-        }
-      } catch (e) {
-        console.error(`LockTracker: Error extracting bet ${index + 1}:`, e);
-      }
-    });
-
-    // Alternative: Look for bet history table rows
-    if (bets.length === 0) {
-      const tableRows = document.querySelectorAll('table tbody tr, [class*="history"] [class*="row"]');
-      console.log(`LockTracker: Trying table rows, found ${tableRows.length}`);
-
-      tableRows.forEach((row, index) => {
-        try {
-          const bet = extractBetFromRow(row);
-          if (bet) {
-            bets.push(bet);
-          }
-        } catch (e) {
-          console.error(`LockTracker: Error extracting from row ${index + 1}:`, e);
-        }
-      });
-    }
-
-  } catch (error) {
-    console.error('LockTracker: Scraping error:', error);
+// Watches the page and parses each bet card once (see content-scraper.js)
+const scraper = createBetScraper('DraftKings bet', [
+  {
+    // Bet cards - includes mock page selectors and real site patterns
+    selector: '[class*="bet-card"], [class*="BetCard"], [class*="settled"], .history-item, .bet-slip-card, [class*="wager-item"], [class*="bet-history"]',
+    extract: extractBetFromContainer
+  },
+  {
+    // Alternative: bet history table rows
+    selector: 'table tbody tr, [class*="history"] [class*="row"]',
+    extract: extractBetFromRow
   }
+]);
+scraper.start();
 
+// Main scraping function - only cards added since the last call get parsed
+function scrapeBets() {
+  console.log('LockTracker: Scraping DraftKings bets...');
+  const bets = scraper.scrape();
   console.log(`LockTracker: Total bets scraped: ${bets.length}`);
   scrapedBets = bets;
   return bets;
@@ -293,17 +268,16 @@ async function onPageReady() {
 
     if (response && response.autoSync) {
       console.log('LockTracker: Pro user - starting auto-sync');
-      // Scrape bets and send to background for syncing
+      // Upload what's on the page now, then anything that loads later
+      // (infinite scroll) in batches as the scraper finds it
+      const uploader = createBetUploader();
       const bets = scrapeBets();
       if (bets.length > 0) {
-        const syncResult = await chrome.runtime.sendMessage({
-          action: 'autoSyncBets',
-          bets: bets
-        });
-        console.log('LockTracker: Auto-sync result:', syncResult);
+        uploader.add(bets);
       } else {
-        console.log('LockTracker: No bets found to auto-sync');
+        console.log('LockTracker: No bets found to auto-sync yet');
       }
+      scraper.onNewBets(newBets => uploader.add(newBets));
     } else {
       console.log('LockTracker: Auto-sync not triggered:', response?.reason || 'unknown');
     }
@@ -20,7 +20,8 @@ async function captureAuth() {
       chrome.runtime.sendMessage({
         action: 'storeAuth',
         access_token: data.access_token,
-        user: data.user
+        user: data.user,
+        event_id: data.event_id
       }, (response) => {
         if (chrome.runtime.lastError) {
           console.log('LockTracker: Could not send auth to background:', chrome.runtime.lastError);
@@ -18,51 +18,26 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
   return true;
 });
 
-// Main scraping function
-function scrapeBets() {
-  console.log('LockTracker: Scraping PrizePicks entries...');
-  const bets = [];
-
-  try {
-    // PrizePicks entry cards - found via testing on real site
+// Watches the page and parses each bet card once (see content-scraper.js)
+const scraper = createBetScraper('PrizePicks entry', [
+  {
+    // Entry cards - found via testing on real site
     // Cards have class containing "border-soFresh-130"
-    const entryContainers = document.querySelectorAll('[class*="border-soFresh-130"]');
-
-    console.log(`LockTracker: Found ${entryContainers.length} PrizePicks entry cards`);
-
-    entryContainers.forEach((container, index) => {
-      try {
-        const bet = extractEntryFromCard(container);
-        if (bet) {
-          bets.push(bet);
-          console.log(`LockTracker: Extracted entry ${index + 1}:`, bet);
-        }
-      } catch (e) {
-        console.error(`LockTracker: Error extracting entry ${index + 1}:`, e);
-      }
-    });
-
-    // Fallback: try alternative selectors if main one didn't work
-    if (bets.length === 0) {
-      console.log('LockTracker: Trying fallback selectors...');
-      const fallbackContainers = document.querySelectorAll('[class*="soFresh"], [class*="lineup"], [class*="entry"]');
-
-      fallbackContainers.forEach((container, index) => {
-        try {
-          const bet = extractEntryFromCard(container);
-          if (bet) {
-            bets.push(bet);
-          }
-        } catch (e) {
-          console.error(`LockTracker: Fallback error ${index + 1}:`, e);
-        }
-      });
-    }
-
-  } catch (error) {
-    console.error('LockTracker: Scraping error:', error);
+    selector: '[class*="border-soFresh-130"]',
+    extract: extractEntryFromCard
+  },
+  {
+    // Fallback: alternative selectors if the main one doesn't match
+    selector: '[class*="soFresh"], [class*="lineup"], [class*="entry"]',
+    extract: extractEntryFromCard
   }
+]);
+scraper.start();
 
+// Main scraping function - only cards added since the last call get parsed
+function scrapeBets() {
+  console.log('LockTracker: Scraping PrizePicks entries...');
+  const bets = scraper.scrape();
   console.log(`LockTracker: Total entries scraped: ${bets.length}`);
   scrapedBets = bets;
   return bets;
@@ -244,17 +219,16 @@ async function onPageReady() {
 
     if (response && response.autoSync) {
       console.log('LockTracker: Pro user - starting auto-sync');
-      // Scrape bets and send to background for syncing
+      // Upload what's on the page now, then anything that loads later
+      // (infinite scroll) in batches as the scraper finds it
+      const uploader = createBetUploader();
       const bets = scrapeBets();
       if (bets.length > 0) {
-        const syncResult = await chrome.runtime.sendMessage({
-          action: 'autoSyncBets',
-          bets: bets
-        });
-        console.log('LockTracker: Auto-sync result:', syncResult);
+        uploader.add(bets);
       } else {
-        console.log('LockTracker: No bets found to auto-sync');
+        console.log('LockTracker: No bets found to auto-sync yet');
       }
+      scraper.onNewBets(newBets => uploader.add(newBets));
     } else {
       console.log('LockTracker: Auto-sync not triggered:', response?.reason || 'unknown');
     }
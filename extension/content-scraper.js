@@ -0,0 +1,181 @@
+// LockTracker - Shared incremental scraper
+// Loaded before each sportsbook content script. Rather than re-reading the
+// whole bet history on every sync, it watches the page for newly inserted
+// bet cards, parses each card once, and keeps a fingerprint of every bet seen
+// in this tab so re-rendered cards (infinite scroll, React re-mounts) are
+// never counted twice.
+
+const SCRAPE_DEBOUNCE_MS = 300;  // wait for the page to stop changing
+const SCRAPE_CHUNK_SIZE = 200;   // cards parsed per task, keeps the tab responsive
+const UPLOAD_BATCH_SIZE = 50;    // bets per /api/import call during auto-sync
+
+// strategies: [{ selector, extract }] in order of preference. Like the old
+// full-page scans, a later strategy (e.g. table rows) is only used while the
+// earlier ones haven't matched anything on the page.
+function createBetScraper(label, strategies) {
+  const parsedCards = new WeakSet();          // DOM nodes already handled
+  const fingerprints = new Set();             // bets already found in this tab
+  const queues = strategies.map(() => []);    // cards waiting to be parsed
+  const matched = strategies.map(() => 0);    // cards each strategy has matched
+  const bets = [];
+  const listeners = [];
+  let pendingRoots = [];
+  let debounceTimer = null;
+
+  // Same fields /api/import compares to spot duplicates
+  function fingerprint(bet) {
+    return [bet.matchup, bet.bet_description, bet.amount].join('|');
+  }
+
+  function collectCards(root) {
+    if (root.nodeType !== Node.ELEMENT_NODE || !root.isConnected) return;
+    strategies.forEach((strategy, i) => {
+      if (root.matches(strategy.selector)) queues[i].push(root);
+      root.querySelectorAll(strategy.selector).forEach(card => queues[i].push(card));
+    });
+  }
+
+  function activeStrategy() {
+    const index = strategies.findIndex((s, i) => matched[i] > 0 || queues[i].length > 0);
+    // Lower-priority matches are never used once a better strategy has cards
+    for (let i = index + 1; index >= 0 && i < queues.length; i++) {
+      queues[i] = [];
+    }
+    return index;
+  }
+
+  // Parse up to `limit` queued cards and return the new bets among them
+  function parseCards(limit) {
+    const index = activeStrategy();
+    if (index < 0) return [];
+
+    const batch = queues[index].splice(0, limit);
+    const found = [];
+    for (const card of batch) {
+      if (parsedCards.has(card) || !card.isConnected) continue;
+      parsedCards.add(card);
+      matched[index]++;
+      try {
+        const bet = strategies[index].extract(card);
+        if (!bet) continue;
+        const key = fingerprint(bet);
+        if (fingerprints.has(key)) continue;
+        fingerprints.add(key);
+        bets.push(bet);
+        found.push(bet);
+      } catch (e) {
+        console.error(`LockTracker: Error extracting ${label}:`, e);
+      }
+    }
+    return found;
+  }
+
+  function hasQueuedCards() {
+    return queues.some(queue => queue.length > 0);
+  }
+
+  function notify(found) {
+    if (found.length === 0) return;
+    console.log(`LockTracker: ${found.length} new ${label}s (${bets.length} total)`);
+    listeners.forEach(listener => listener(found));
+  }
+
+  // Runs once the page has been quiet for SCRAPE_DEBOUNCE_MS, then parses in
+  // chunks so a long history doesn't freeze the tab
+  function processPending() {
+    debounceTimer = null;
+    const roots = pendingRoots;
+    pendingRoots = [];
+    roots.forEach(collectCards);
+
+    notify(parseCards(SCRAPE_CHUNK_SIZE));
+    if (hasQueuedCards() && debounceTimer === null) {
+      debounceTimer = setTimeout(processPending, 0);
+    }
+  }
+
+  function schedule(delay) {
+    clearTimeout(debounceTimer);
+    debounceTimer = setTimeout(processPending, delay);
+  }
+
+  const observer = new MutationObserver((mutations) => {
+    for (const mutation of mutations) {
+      for (const node of mutation.addedNodes) {
+        if (node.nodeType === Node.ELEMENT_NODE) pendingRoots.push(node);
+      }
+    }
+    if (pendingRoots.length) schedule(SCRAPE_DEBOUNCE_MS);
+  });
+
+  return {
+    // Scan what's already on the page, then watch for new cards
+    start() {
+      pendingRoots.push(document.body);
+      schedule(0);
+      observer.observe(document.body, { childList: true, subtree: true });
+    },
+
+    // Parse anything still queued right now; returns every bet seen so far
+    scrape() {
+      const started = performance.now();
+      clearTimeout(debounceTimer);
+      debounceTimer = null;
+      const roots = pendingRoots;
+      pendingRoots = [];
+      roots.forEach(collectCards);
+      notify(parseCards(Infinity));
+      console.log(`LockTracker: Scrape took ${Math.round(performance.now() - started)}ms`);
+      return bets.slice();
+    },
+
+    // Called with each batch of newly found bets
+    onNewBets(listener) {
+      listeners.push(listener);
+    }
+  };
+}
+
+// Sends bets to the background worker for /api/import, UPLOAD_BATCH_SIZE at
+// a time, one request in flight
+function createBetUploader() {
+  const queue = [];
+  let sending = false;
+
+  async function flush() {
+    if (sending) return;
+    sending = true;
+    let batch = [];
+    try {
+      while (queue.length > 0) {
+        batch = queue.splice(0, UPLOAD_BATCH_SIZE);
+        const result = await chrome.runtime.sendMessage({
+          action: 'autoSyncBets',
+          bets: batch
+        });
+        console.log('LockTracker: Auto-sync result:', result);
+        if (!result || !result.success) {
+          if (!result || result.retryable) {
+            // Network or server trouble: leave it queued for the next new bets
+            queue.unshift(...batch);
+            break;
+          }
+          // Not logged in, quota reached, bad data: sending again won't help
+          console.warn('LockTracker: Dropped bets that could not be synced:', result.reason || result.error);
+        }
+      }
+    } catch (e) {
+      console.log('LockTracker: Could not communicate with background:', e);
+      queue.unshift(...batch);
+    } finally {
+      sending = false;
+    }
+  }
+
+  return {
+    add(bets) {
+      for (const bet of bets) queue.push(bet);
+      flush();
+    }
+  };
+}
@@ -50,7 +50,8 @@ async function checkUserAuth() {
       chrome.runtime.sendMessage({
         action: 'storeAuth',
         access_token: data.access_token,
-        user: data.user
+        user: data.user,
+        event_id: data.event_id
       });
       return true;
     }
@@ -76,24 +77,15 @@ async function checkUserAuth() {
   return false;
 }
 
-// Get user's usage info
+// Get user's usage info (cached handshake from the background worker)
 async function getUserUsage() {
   if (!userAuth || !userAuth.access_token) {
     return null;
   }
 
   try {
-    const response = await fetch(`${APP_URL}/api/usage`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
-        access_token: userAuth.access_token
-      })
-    });
-    const data = await response.json();
-    if (data.success) {
+    const data = await chrome.runtime.sendMessage({ action: 'getHandshake' });
+    if (data && data.success) {
       remainingBets = data.remaining;
       userTier = data.tier;
       return data;
@@ -128,7 +120,7 @@ async function injectContentScript(tabId, scriptFile) {
   try {
     await chrome.scripting.executeScript({
       target: { tabId: tabId },
-      files: [scriptFile]
+      files: ['content-scraper.js', scriptFile]
     });
     console.log('Injected content script:', scriptFile);
     return true;
@@ -487,7 +479,12 @@ async function sendBetsToApp(bets) {
       })
     });
 
-    return await response.json();
+    const result = await response.json();
+    if (result.handshake) {
+      // Import changed the quota - keep the cached handshake in step
+      chrome.runtime.sendMessage({ action: 'storeHandshake', handshake: result.handshake });
+    }
+    return result;
   } catch (error) {
     console.error('Failed to send bets to app:', error);
     return { success: false, error: 'Could not connect to LockTracker. Is it running?' };
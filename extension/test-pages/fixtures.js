@@ -0,0 +1,44 @@
+// LockTracker - Large fixtures for the mock sportsbook pages
+// Open a mock page with ?fixture=2000 to pad it out to 2000 bet cards by
+// cloning the hand-written ones, or add &scroll=1 to have them arrive 100 at
+// a time as you scroll, like the real sites' infinite scroll. Each clone gets
+// a numbered name so the extension treats it as a different bet.
+
+const FIXTURE_PAGE_SIZE = 100;
+
+function generateFixtures(cardSelector, nameSelector) {
+  const params = new URLSearchParams(location.search);
+  const total = parseInt(params.get('fixture'), 10);
+  if (!total) return;
+
+  const templates = Array.from(document.querySelectorAll(cardSelector));
+  if (templates.length === 0) return;
+  const parent = templates[0].parentNode;
+  let made = templates.length;
+
+  function appendCards(count) {
+    const fragment = document.createDocumentFragment();
+    for (let i = 0; i < count && made < total; i++, made++) {
+      const card = templates[made % templates.length].cloneNode(true);
+      const name = card.querySelector(nameSelector);
+      if (name) {
+        name.textContent += ` #${made + 1}`;
+      }
+      fragment.appendChild(card);
+    }
+    parent.appendChild(fragment);
+    console.log(`Fixture: ${made} of ${total} cards on the page`);
+  }
+
+  if (params.get('scroll')) {
+    appendCards(FIXTURE_PAGE_SIZE);
+    window.addEventListener('scroll', () => {
+      const nearBottom = window.innerHeight + window.scrollY >= document.body.offsetHeight - 200;
+      if (nearBottom && made < total) {
+        appendCards(FIXTURE_PAGE_SIZE);
+      }
+    });
+  } else {
+    appendCards(total);
+  }
+}
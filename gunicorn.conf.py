@@ -0,0 +1,34 @@
+"""
+Gunicorn settings for LockTracker.
+The app is loaded once in the master (preload) and each worker builds its own
+Supabase clients and job thread after forking.
+
+Workers are gevent-based when gevent is installed, so the dashboard's
+Server-Sent Events streams (/api/events) each cost a greenlet instead of
+tying up a whole sync worker. WORKER_CLASS=gthread (with WORKER_THREADS)
+runs threaded workers instead; auth calls never share session state, so
+any worker class is safe (see AuthClients in app.py).
+"""
+
+import os
+
+worker_class = os.environ.get('WORKER_CLASS', 'gevent')
+if worker_class == 'gevent':
+    try:
+        from gevent import monkey
+        # Patch before the app is preloaded so its threads and locks cooperate
+        monkey.patch_all()
+        worker_connections = int(os.environ.get('WORKER_CONNECTIONS', '1000'))
+    except ImportError:
+        worker_class = 'sync'
+elif worker_class == 'gthread':
+    # Only set for gthread: threads > 1 would turn sync workers into gthread ones
+    threads = int(os.environ.get('WORKER_THREADS', '4'))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+preload_app = True
+
+def post_fork(server, worker):
+    import app
+    app.init_worker()
@@ -0,0 +1,247 @@
+"""
+LockTracker - Local bet cache
+A read-through SQLite copy of active users' bets, so the dashboard, analytics
+and export don't have to pull a user's whole history from Supabase each time.
+
+The database runs in WAL mode, so every gunicorn worker on a host can share
+one file: readers never block, and a write path on any worker invalidates the
+user for all of them. Each invalidation bumps the user's generation; a sync
+that started before one throws its (possibly stale) rows away. Each row keeps the fields stats are computed from as
+real columns (for indexed SQL) plus the full Supabase row as JSON, so reads
+return exactly what Supabase would.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bets (
+    id          INTEGER PRIMARY KEY,
+    user_id     TEXT NOT NULL,
+    date        TEXT,
+    sport       TEXT,
+    bet_type    TEXT,
+    sportsbook  TEXT,
+    result      TEXT,
+    odds        INTEGER,
+    amount      REAL,
+    profit      REAL,
+    created_at  TEXT,
+    row         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bets_user_created_idx ON bets (user_id, created_at);
+CREATE INDEX IF NOT EXISTS bets_user_result_date_idx ON bets (user_id, result, date);
+
+CREATE TABLE IF NOT EXISTS cached_users (
+    user_id     TEXT PRIMARY KEY,
+    cursor      TEXT,     -- newest created_at we've copied
+    synced_at   REAL,     -- when we last checked Supabase for new rows
+    last_used   REAL,     -- for LRU eviction
+    loaded_at   REAL,     -- when the rows were last replaced by a full load
+    archive_version TEXT  -- newest bet_month_summaries row when loaded
+);
+
+CREATE TABLE IF NOT EXISTS generations (
+    user_id     TEXT PRIMARY KEY,
+    generation  INTEGER NOT NULL   -- bumped by every invalidate()
+);
+"""
+
+class LocalBetCache:
+    """SQLite mirror of bets for the most recently used users"""
+
+    def __init__(self, path, max_users=200):
+        self.path = path
+        self.max_users = max_users
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(cached_users)')}
+            if 'loaded_at' not in columns:  # cache files made before search existed
+                conn.execute('ALTER TABLE cached_users ADD COLUMN loaded_at REAL')
+            if 'archive_version' not in columns:  # ...or before archiving
+                conn.execute('ALTER TABLE cached_users ADD COLUMN archive_version TEXT')
+
+    def _conn(self):
+        # One connection per thread, and never one inherited through a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ---------- sync state ----------
+
+    def sync_state(self, user_id):
+        """(cursor, synced_at, archive_version) for a cached user, or None if not cached"""
+        row = self._conn().execute('SELECT cursor, synced_at, archive_version FROM cached_users WHERE user_id = ?', (user_id,)).fetchone()
+        return (row['cursor'], row['synced_at'], row['archive_version']) if row else None
+
+    def generation(self, user_id):
+        """Read before fetching from Supabase and hand to load()/add()"""
+        return self._generation(self._conn(), user_id)
+
+    def _generation(self, conn, user_id):
+        row = conn.execute('SELECT generation FROM generations WHERE user_id = ?', (user_id,)).fetchone()
+        return row['generation'] if row else 0
+
+    def load(self, user_id, rows, archive_version=None, generation=None):
+        """Replace everything cached for a user with a full fetch.
+        archive_version: the user's archive state the rows were fetched
+        against (see refresh_local_cache in app.py). Returns False, storing
+        nothing, if the user was invalidated since `generation`."""
+        with self._conn() as conn:
+            if not self._still_current(conn, user_id, generation):
+                return False
+            conn.execute('DELETE FROM bets WHERE user_id = ?', (user_id,))
+            self._insert(conn, rows)
+            self._mark_synced(conn, user_id, rows, None, loaded=True)
+            conn.execute('UPDATE cached_users SET archive_version = ? WHERE user_id = ?', (archive_version, user_id))
+        self._evict()
+        return True
+
+    def add(self, user_id, rows, generation=None):
+        """Add rows created since the user's cursor. Returns False, storing
+        nothing, if the user was invalidated since `generation`."""
+        with self._conn() as conn:
+            if not self._still_current(conn, user_id, generation):
+                return False
+            self._insert(conn, rows)
+            cursor = self.sync_state(user_id)
+            self._mark_synced(conn, user_id, rows, cursor[0] if cursor else None)
+        return True
+
+    def _still_current(self, conn, user_id, generation):
+        # Take the write lock first, so no invalidate() lands between the check and the write
+        conn.execute('BEGIN IMMEDIATE')
+        return generation is None or self._generation(conn, user_id) == generation
+
+    def touch(self, user_id):
+        with self._conn() as conn:
+            conn.execute('UPDATE cached_users SET last_used = ? WHERE user_id = ?', (time.time(), user_id))
+
+    def invalidate(self, user_id):
+        """Drop a user's rows; the next read reloads them"""
+        with self._conn() as conn:
+            conn.execute('DELETE FROM bets WHERE user_id = ?', (user_id,))
+            conn.execute('DELETE FROM cached_users WHERE user_id = ?', (user_id,))
+            conn.execute('INSERT INTO generations (user_id, generation) VALUES (?, 1) '
+                         'ON CONFLICT(user_id) DO UPDATE SET generation = generation + 1', (user_id,))
+
+    def _insert(self, conn, rows):
+        conn.executemany(
+            'INSERT OR REPLACE INTO bets (id, user_id, date, sport, bet_type, sportsbook, result, odds, amount, profit, created_at, row) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(r['id'], r['user_id'], r.get('date'), r.get('sport'), r.get('bet_type'), r.get('sportsbook'),
+              r.get('result'), r.get('odds'), r.get('amount'), r.get('profit'), r.get('created_at'),
+              json.dumps(r)) for r in rows]
+        )
+
+    def _mark_synced(self, conn, user_id, rows, cursor, loaded=False):
+        for r in rows:
+            if r.get('created_at') and (cursor is None or r['created_at'] > cursor):
+                cursor = r['created_at']
+        now = time.time()
+        conn.execute(
+            'INSERT INTO cached_users (user_id, cursor, synced_at, last_used, loaded_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(user_id) DO UPDATE SET cursor = excluded.cursor, synced_at = excluded.synced_at, last_used = excluded.last_used, '
+            'loaded_at = COALESCE(excluded.loaded_at, cached_users.loaded_at)',
+            (user_id, cursor, now, now, now if loaded else None)
+        )
+
+    def _evict(self):
+        """Keep at most max_users users resident, dropping the least recently used"""
+        conn = self._conn()
+        stale = conn.execute(
+            'SELECT user_id FROM cached_users ORDER BY last_used DESC LIMIT -1 OFFSET ?', (self.max_users,)
+        ).fetchall()
+        for row in stale:
+            self.invalidate(row['user_id'])
+
+    # ---------- reads ----------
+
+    def get_bets(self, user_id, status=None, start_date=None, end_date=None, columns=None):
+        """A user's bets, newest first, in the same shape Supabase returns.
+
+        status: 'pending', 'settled' or a single result; columns: list of
+        keys to keep (all when None)."""
+        sql = 'SELECT row FROM bets WHERE user_id = ?'
+        params = [user_id]
+        if status == 'settled':
+            sql += " AND result != 'pending'"
+        elif status:
+            sql += ' AND result = ?'
+            params.append(status)
+        if start_date:
+            sql += ' AND date >= ?'
+            params.append(start_date)
+        if end_date:
+            sql += ' AND date <= ?'
+            params.append(end_date)
+        sql += ' ORDER BY created_at DESC'
+        rows = [json.loads(r['row']) for r in self._conn().execute(sql, params)]
+        if columns:
+            rows = [{c: row.get(c) for c in columns} for row in rows]
+        return rows
+
+    def load_state(self, user_id):
+        """(loaded_at, cursor) for a cached user: rows only change without
+        loaded_at changing by being added after cursor"""
+        row = self._conn().execute('SELECT loaded_at, cursor FROM cached_users WHERE user_id = ?', (user_id,)).fetchone()
+        return (row['loaded_at'], row['cursor']) if row else None
+
+    def get_search_text(self, user_id, since=None):
+        """(id, matchup, bet_description, created_at) for a user's bets, or just
+        those created after `since`"""
+        sql = ("SELECT id, json_extract(row, '$.matchup') AS matchup, "
+               "json_extract(row, '$.bet_description') AS bet_description, created_at FROM bets WHERE user_id = ?")
+        params = [user_id]
+        if since:
+            sql += ' AND created_at > ?'
+            params.append(since)
+        return [tuple(r) for r in self._conn().execute(sql, params)]
+
+    def search(self, user_id, ids=None, limit=50, offset=0, sport=None, bet_type=None, sportsbook=None,
+               result=None, min_odds=None, max_odds=None, min_amount=None, max_amount=None,
+               start_date=None, end_date=None):
+        """One page of bets matching the filters, newest first, and per-result
+        totals ({result: {count, wagered, profit}}) for all of them.
+        ids: only consider these bets; result: a result or 'settled'."""
+        where = 'user_id = ?'
+        params = [user_id]
+        if ids is not None:
+            # One parameter however many ids there are
+            where += ' AND id IN (SELECT value FROM json_each(?))'
+            params.append(json.dumps(list(ids)))
+        for column, op, value in (('sport', '=', sport), ('bet_type', '=', bet_type), ('sportsbook', '=', sportsbook),
+                                  ('odds', '>=', min_odds), ('odds', '<=', max_odds),
+                                  ('amount', '>=', min_amount), ('amount', '<=', max_amount),
+                                  ('date', '>=', start_date), ('date', '<=', end_date)):
+            if value is not None:
+                where += f' AND {column} {op} ?'
+                params.append(value)
+        if result == 'settled':
+            where += " AND result != 'pending'"
+        elif result:
+            where += ' AND result = ?'
+            params.append(result)
+
+        conn = self._conn()
+        totals = conn.execute(
+            'SELECT result, COUNT(*) AS count, TOTAL(amount) AS wagered, TOTAL(profit) AS profit '
+            f'FROM bets WHERE {where} GROUP BY result', params)
+        by_result = {r['result']: {'count': r['count'], 'wagered': r['wagered'], 'profit': r['profit']} for r in totals}
+        page = conn.execute(f'SELECT row FROM bets WHERE {where} ORDER BY created_at DESC LIMIT ? OFFSET ?',
+                            [*params, limit, offset])
+        return [json.loads(r['row']) for r in page], by_result
+
+    def query(self, sql, params=()):
+        """Run a read-only aggregate query, returning rows as dicts"""
+        return [dict(r) for r in self._conn().execute(sql, params)]
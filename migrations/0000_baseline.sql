@@ -0,0 +1,33 @@
+-- Tables that existed before this folder did, as created in the Supabase
+-- dashboard. IF NOT EXISTS makes this a no-op on the live database; it's here
+-- so a fresh database can be built from migrations alone.
+
+CREATE TABLE IF NOT EXISTS bets (
+    id              BIGSERIAL PRIMARY KEY,
+    user_id         UUID NOT NULL REFERENCES auth.users (id) ON DELETE CASCADE,
+    date            DATE,
+    sport           TEXT,
+    matchup         TEXT,
+    bet_type        TEXT,
+    bet_description TEXT,
+    odds            INTEGER,
+    amount          NUMERIC(10, 2),
+    result          TEXT NOT NULL DEFAULT 'pending',  -- pending | win | loss | push
+    profit          NUMERIC(10, 2) NOT NULL DEFAULT 0,
+    sportsbook      TEXT,
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id                     BIGSERIAL PRIMARY KEY,
+    user_id                UUID NOT NULL REFERENCES auth.users (id) ON DELETE CASCADE,
+    stripe_customer_id     TEXT,
+    stripe_subscription_id TEXT,
+    status                 TEXT NOT NULL DEFAULT 'inactive',  -- active | past_due | cancelled | inactive
+    created_at             TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at             TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Users only see their own rows; the server uses the service role
+ALTER TABLE bets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE subscriptions ENABLE ROW LEVEL SECURITY;
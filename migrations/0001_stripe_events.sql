@@ -0,0 +1,23 @@
+-- Stripe webhook events we've received.
+-- The webhook stores each verified event here before acknowledging it, so the
+-- primary key on the Stripe event id is what makes redeliveries a no-op.
+-- A background worker applies pending events in order per subscription.
+
+CREATE TABLE IF NOT EXISTS stripe_events (
+    id              TEXT PRIMARY KEY,            -- Stripe event id (evt_...)
+    type            TEXT NOT NULL,
+    subscription_id TEXT,                        -- ordering key (subscription, customer or event id)
+    stripe_created  BIGINT,                      -- event.created from Stripe (unix seconds)
+    payload         JSONB NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'pending',  -- pending | processing | processed | failed
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    processed_at    TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS stripe_events_subscription_status_idx
+    ON stripe_events (subscription_id, status, stripe_created);
+
+-- Only the server (service role) touches this table
+ALTER TABLE stripe_events ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,23 @@
+-- Account deletion jobs.
+-- delete_account() inserts a row and returns immediately; a background job
+-- works through the steps below and flips each flag as it finishes, so a job
+-- interrupted by a deploy or crash resumes at the first unfinished step.
+
+CREATE TABLE IF NOT EXISTS account_deletions (
+    user_id              UUID PRIMARY KEY,
+    email                TEXT,
+    status               TEXT NOT NULL DEFAULT 'queued',  -- queued | running | done | failed
+    stripe_cancelled     BOOLEAN NOT NULL DEFAULT FALSE,
+    bets_deleted         BOOLEAN NOT NULL DEFAULT FALSE,
+    subscription_deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    auth_deleted         BOOLEAN NOT NULL DEFAULT FALSE,
+    attempts             INTEGER NOT NULL DEFAULT 0,
+    last_error           TEXT,
+    requested_at         TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    completed_at         TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS account_deletions_status_idx
+    ON account_deletions (status);
+
+ALTER TABLE account_deletions ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,44 @@
+-- Indexes for the ways app.py reads bets and subscriptions.
+-- Every bets query starts with user_id, so every index does too.
+
+-- Bet lists and the local cache sync: user_id, ORDER BY created_at DESC.
+-- Also serves the monthly quota count (created_at >= first of month).
+CREATE INDEX IF NOT EXISTS bets_user_created_idx
+    ON bets (user_id, created_at DESC);
+
+-- Pending bets: the dashboard list and status='pending' queries
+CREATE INDEX IF NOT EXISTS bets_user_pending_idx
+    ON bets (user_id, created_at DESC)
+    WHERE result = 'pending';
+
+-- Settled bets by date range: stats, category breakdowns and analytics
+CREATE INDEX IF NOT EXISTS bets_user_settled_date_idx
+    ON bets (user_id, date, result)
+    WHERE result <> 'pending';
+
+-- Extension import duplicate probe (user_id, matchup, bet_description, amount).
+-- Matchup alone narrows a user's bets to a handful of rows, so the other two
+-- columns are checked on those rows instead of bloating the index with them.
+CREATE INDEX IF NOT EXISTS bets_user_matchup_idx
+    ON bets (user_id, matchup);
+
+-- Where a bet came from ('extension' for scraped imports, NULL otherwise)
+ALTER TABLE bets ADD COLUMN IF NOT EXISTS source TEXT;
+
+-- Fingerprint of the fields the import probe compares, kept up to date by
+-- Postgres. The unique index only covers extension imports: people can log
+-- the same bet twice by hand, but two syncs racing each other can't.
+ALTER TABLE bets ADD COLUMN IF NOT EXISTS dedup_hash TEXT
+    GENERATED ALWAYS AS (md5(concat_ws('|', matchup, bet_description, amount::text))) STORED;
+
+CREATE UNIQUE INDEX IF NOT EXISTS bets_extension_dedup_idx
+    ON bets (user_id, dedup_hash)
+    WHERE source = 'extension';
+
+-- Subscriptions: tier lookups (user_id, status = 'active') and
+-- webhook updates by stripe_subscription_id
+CREATE INDEX IF NOT EXISTS subscriptions_user_status_idx
+    ON subscriptions (user_id, status);
+
+CREATE INDEX IF NOT EXISTS subscriptions_stripe_subscription_idx
+    ON subscriptions (stripe_subscription_id);
@@ -0,0 +1,51 @@
+-- Operator reporting: one row per day (plus one per day and sportsbook),
+-- built by `python rollups.py` from bets, subscriptions and quota_hits.
+-- Each run only rebuilds the days since its checkpoint.
+
+-- Every time someone is turned away by the free tier limit
+CREATE TABLE IF NOT EXISTS quota_hits (
+    id          BIGSERIAL PRIMARY KEY,
+    user_id     UUID NOT NULL,
+    source      TEXT NOT NULL,               -- web | api | extension
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS quota_hits_created_idx ON quota_hits (created_at);
+
+CREATE TABLE IF NOT EXISTS daily_usage (
+    day              DATE PRIMARY KEY,
+    active_users     INTEGER NOT NULL DEFAULT 0,  -- users who added a bet
+    new_bets         INTEGER NOT NULL DEFAULT 0,
+    extension_bets   INTEGER NOT NULL DEFAULT 0,  -- synced by the extension
+    quota_hits       INTEGER NOT NULL DEFAULT 0,
+    quota_hit_users  INTEGER NOT NULL DEFAULT 0,
+    new_paid         INTEGER NOT NULL DEFAULT 0,  -- subscriptions started
+    cancelled        INTEGER NOT NULL DEFAULT 0,  -- subscriptions cancelled
+    paid_users       INTEGER,                     -- active subscriptions when the day was last rolled up
+    updated_at       TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS daily_sportsbook_bets (
+    day         DATE NOT NULL,
+    sportsbook  TEXT NOT NULL,
+    bets        INTEGER NOT NULL DEFAULT 0,
+    users       INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, sportsbook)
+);
+
+-- Where each rollup got to
+CREATE TABLE IF NOT EXISTS rollup_checkpoints (
+    name        TEXT PRIMARY KEY,
+    cursor      TIMESTAMPTZ NOT NULL,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- The rollup reads whole days of bets and subscriptions across all users
+CREATE INDEX IF NOT EXISTS bets_created_idx ON bets (created_at);
+CREATE INDEX IF NOT EXISTS subscriptions_created_idx ON subscriptions (created_at);
+CREATE INDEX IF NOT EXISTS subscriptions_updated_idx ON subscriptions (updated_at);
+
+ALTER TABLE quota_hits ENABLE ROW LEVEL SECURITY;
+ALTER TABLE daily_usage ENABLE ROW LEVEL SECURITY;
+ALTER TABLE daily_sportsbook_bets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE rollup_checkpoints ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,23 @@
+-- Monthly totals for bets moved to cold storage by archive.py.
+-- One row per user, month, sport, bet type and result: enough for the
+-- dashboard stats, category breakdowns and analytics to include archived
+-- bets without reading them. The raw rows live in ARCHIVE_DIR.
+
+CREATE TABLE IF NOT EXISTS bet_month_summaries (
+    user_id     UUID NOT NULL REFERENCES auth.users (id) ON DELETE CASCADE,
+    month       DATE NOT NULL,                 -- first day of the month
+    sport       TEXT NOT NULL,
+    bet_type    TEXT NOT NULL,
+    result      TEXT NOT NULL,                 -- win | loss | push
+    bet_count   INTEGER NOT NULL,
+    wagered     NUMERIC(12, 2) NOT NULL,
+    profit      NUMERIC(12, 2) NOT NULL,
+    PRIMARY KEY (user_id, month, sport, bet_type, result)
+);
+
+-- The compaction job looks for old settled bets across all users
+CREATE INDEX IF NOT EXISTS bets_settled_date_idx
+    ON bets (date)
+    WHERE result <> 'pending';
+
+ALTER TABLE bet_month_summaries ENABLE ROW LEVEL SECURITY;
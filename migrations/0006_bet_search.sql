@@ -0,0 +1,98 @@
+-- Text search over matchup and bet description, plus filters, for
+-- /api/bets/search. Search terms are matched as substrings ("celt" finds
+-- "Celtics"), which a trigram index answers without scanning the user's bets.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;  -- lets user_id share the GIN index
+
+-- Lower-cased text the search runs over, kept up to date by Postgres
+ALTER TABLE bets ADD COLUMN IF NOT EXISTS search_text TEXT
+    GENERATED ALWAYS AS (lower(concat_ws(' ', matchup, bet_description))) STORED;
+
+CREATE INDEX IF NOT EXISTS bets_user_search_trgm_idx
+    ON bets USING GIN (user_id, search_text gin_trgm_ops);
+
+-- Exact-match filters that aren't already covered by 0003_bet_indexes.sql
+CREATE INDEX IF NOT EXISTS bets_user_sportsbook_idx
+    ON bets (user_id, sportsbook);
+
+-- One page of matching bets (newest first) plus per-result totals for every
+-- match, in one round trip:
+--
+--   {"bets": [...], "by_result": {"win": {"count": 3, "wagered": 30, "profit": 27.3}, ...}}
+--
+-- p_terms are lower-cased substrings that must all appear, with LIKE
+-- wildcards already escaped by the caller. p_result is a result or
+-- 'settled'. NULL filters are left out of the query entirely, and each call
+-- is planned with its own values, so the planner can pick the trigram index
+-- for a rare term and the date or pending index otherwise.
+--
+-- SECURITY INVOKER (the default): called with a user's key, row level
+-- security still limits it to that user's bets.
+CREATE OR REPLACE FUNCTION search_bets(
+    p_user_id    UUID,
+    p_terms      TEXT[]  DEFAULT '{}',
+    p_sport      TEXT    DEFAULT NULL,
+    p_bet_type   TEXT    DEFAULT NULL,
+    p_sportsbook TEXT    DEFAULT NULL,
+    p_result     TEXT    DEFAULT NULL,
+    p_min_odds   INTEGER DEFAULT NULL,
+    p_max_odds   INTEGER DEFAULT NULL,
+    p_min_amount NUMERIC DEFAULT NULL,
+    p_max_amount NUMERIC DEFAULT NULL,
+    p_start_date DATE    DEFAULT NULL,
+    p_end_date   DATE    DEFAULT NULL,
+    p_limit      INTEGER DEFAULT 50,
+    p_offset     INTEGER DEFAULT 0
+) RETURNS JSONB
+LANGUAGE plpgsql STABLE AS $$
+DECLARE
+    conditions TEXT := 'user_id = $1';
+    term TEXT;
+    found JSONB;
+BEGIN
+    -- Literal patterns (not parameters) so the trigram index can be used
+    FOREACH term IN ARRAY COALESCE(p_terms, '{}') LOOP
+        conditions := conditions || format(' AND search_text LIKE %L', '%' || term || '%');
+    END LOOP;
+
+    IF p_sport IS NOT NULL THEN conditions := conditions || ' AND sport = $2'; END IF;
+    IF p_bet_type IS NOT NULL THEN conditions := conditions || ' AND bet_type = $3'; END IF;
+    IF p_sportsbook IS NOT NULL THEN conditions := conditions || ' AND sportsbook = $4'; END IF;
+    IF p_result = 'settled' THEN
+        conditions := conditions || ' AND result <> ''pending''';
+    ELSIF p_result IS NOT NULL THEN
+        conditions := conditions || ' AND result = $5';
+    END IF;
+    IF p_min_odds IS NOT NULL THEN conditions := conditions || ' AND odds >= $6'; END IF;
+    IF p_max_odds IS NOT NULL THEN conditions := conditions || ' AND odds <= $7'; END IF;
+    IF p_min_amount IS NOT NULL THEN conditions := conditions || ' AND amount >= $8'; END IF;
+    IF p_max_amount IS NOT NULL THEN conditions := conditions || ' AND amount <= $9'; END IF;
+    IF p_start_date IS NOT NULL THEN conditions := conditions || ' AND date >= $10'; END IF;
+    IF p_end_date IS NOT NULL THEN conditions := conditions || ' AND date <= $11'; END IF;
+
+    EXECUTE format($query$
+        WITH matches AS (
+            SELECT * FROM bets WHERE %s
+        )
+        SELECT jsonb_build_object(
+            'bets', COALESCE((
+                SELECT jsonb_agg(to_jsonb(page) - 'search_text' - 'dedup_hash' ORDER BY page.created_at DESC)
+                FROM (SELECT * FROM matches ORDER BY created_at DESC LIMIT $12 OFFSET $13) page
+            ), '[]'::jsonb),
+            'by_result', COALESCE((
+                SELECT jsonb_object_agg(result, jsonb_build_object('count', count, 'wagered', wagered, 'profit', profit))
+                FROM (
+                    SELECT result, COUNT(*) AS count, COALESCE(SUM(amount), 0) AS wagered, COALESCE(SUM(profit), 0) AS profit
+                    FROM matches GROUP BY result
+                ) totals
+            ), '{}'::jsonb)
+        )
+    $query$, conditions)
+    INTO found
+    USING p_user_id, p_sport, p_bet_type, p_sportsbook, p_result, p_min_odds, p_max_odds,
+          p_min_amount, p_max_amount, p_start_date, p_end_date, p_limit, p_offset;
+
+    RETURN found;
+END;
+$$;
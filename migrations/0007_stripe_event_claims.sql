@@ -0,0 +1,5 @@
+-- When a worker claimed an event for processing. Recovery only hands back
+-- events whose claim is older than the lease, not events that simply waited
+-- a long time in the queue before being claimed.
+
+ALTER TABLE stripe_events ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ;
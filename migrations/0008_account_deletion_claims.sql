@@ -0,0 +1,5 @@
+-- When a worker claimed a deletion job, renewed as each step finishes.
+-- Recovery only takes over a running job once this lease has expired, so
+-- a job a live worker is still running isn't started a second time.
+
+ALTER TABLE account_deletions ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ;
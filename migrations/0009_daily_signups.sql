@@ -0,0 +1,18 @@
+-- Sign-ups per day, so /api/admin/rollups can report paid conversion
+-- (subscriptions started / accounts created over the same period).
+-- Days rolled up before this migration show 0 until rebuilt:
+--     python rollups.py --since <first day>
+
+ALTER TABLE daily_usage ADD COLUMN IF NOT EXISTS signups INTEGER NOT NULL DEFAULT 0;
+
+-- auth.users isn't exposed through the API, so the rollup counts a day's
+-- new accounts through this function. SECURITY DEFINER lets it read
+-- auth.users; only the service role may call it.
+CREATE OR REPLACE FUNCTION count_signups(p_start TIMESTAMPTZ, p_end TIMESTAMPTZ)
+RETURNS INTEGER
+LANGUAGE sql STABLE SECURITY DEFINER SET search_path = '' AS $$
+    SELECT COUNT(*)::INTEGER FROM auth.users WHERE created_at >= p_start AND created_at < p_end;
+$$;
+
+REVOKE ALL ON FUNCTION count_signups(TIMESTAMPTZ, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION count_signups(TIMESTAMPTZ, TIMESTAMPTZ) TO service_role;
@@ -0,0 +1,10 @@
+-- When each summary row was written. archive.py rewrites a month's rows
+-- after moving its bets, so the newest created_at for a user changes on
+-- every compaction that touches them; workers compare it with what their
+-- local bet cache (LOCAL_CACHE_PATH) was loaded against and reload the
+-- user when it differs, instead of counting moved bets twice.
+
+ALTER TABLE bet_month_summaries ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS bet_month_summaries_user_created_idx
+    ON bet_month_summaries (user_id, created_at DESC);
@@ -0,0 +1,257 @@
+"""
+LockTracker - Remote call guards
+Every call to Supabase (database and auth) and Stripe goes through a Remote,
+which gives it:
+
+- a deadline: the whole call, retries included, has to finish in time, and
+  each attempt's network timeouts are cut down to what is left of it.
+  deadline() raises both for a block of slow work (batch scripts)
+- retries for reads only (GET/HEAD), after a jittered pause, and only while
+  the retry budget allows - retries can add at most RETRY_RATIO extra calls
+  on top of normal traffic, so a struggling service isn't hit twice as hard
+- a circuit breaker: after FAILURE_THRESHOLD calls in a row fail, calls fail
+  at once with CircuitOpenError for RESET_SECONDS, then a single trial call
+  decides whether to close it again
+
+Only the service being unreachable counts as a failure (timeouts, dropped
+connections, 502/503/504). Errors the service answers with - a bad
+password, a constraint violation - are passed through untouched.
+
+    supabase_remote = Remote('supabase', deadline=8)
+    client = httpx.Client(transport=GuardedTransport(supabase_remote, httpx.HTTPTransport()))
+
+State is per process; metrics() is served at /api/admin/metrics.
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Statuses a proxy or Supabase returns when the service behind it is down
+UNAVAILABLE_STATUSES = {502, 503, 504}
+
+class RemoteUnavailable(Exception):
+    """A remote service couldn't be reached in time, after any retries"""
+
+class CircuitOpenError(RemoteUnavailable):
+    """The service has been failing, so the call wasn't attempted"""
+
+class UnavailableResponse(Exception):
+    """A 502/503/504 answer, raised so it counts as a failure"""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class RetryBudget:
+    """Token bucket: every call adds `ratio` of a token, every retry spends one"""
+
+    def __init__(self, ratio, burst):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+class CircuitBreaker:
+    """closed -> open after `threshold` failures in a row -> half open after
+    `reset_seconds`, when one trial call closes or reopens it"""
+
+    def __init__(self, threshold, reset_seconds):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0
+        self.times_opened = 0
+        self._trial_started = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            if self.state == 'open' and now - self.opened_at >= self.reset_seconds:
+                self.state = 'half_open'
+            # One trial at a time; a trial that never reported back
+            # (killed greenlet) stops blocking after reset_seconds
+            if self.state == 'half_open' and now - self._trial_started >= self.reset_seconds:
+                self._trial_started = now
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_started = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self._trial_started = 0
+
+class Remote:
+    """Deadline, retries and circuit breaker for one remote service"""
+
+    FAILURE_THRESHOLD = 5
+    RESET_SECONDS = 30
+    RETRY_RATIO = 0.1        # retries per call, averaged
+    RETRY_BURST = 10         # retries allowed back to back
+    BACKOFF_SECONDS = 0.05   # first retry waits up to this, doubling each time
+    MAX_BACKOFF_SECONDS = 1
+
+    def __init__(self, name, deadline, retries=2, is_failure=None):
+        self.name = name
+        self.deadline_seconds = deadline
+        self.retries = retries
+        self.is_failure = is_failure or (lambda e: isinstance(e, (ConnectionError, TimeoutError, UnavailableResponse)))
+        self.breaker = CircuitBreaker(self.FAILURE_THRESHOLD, self.RESET_SECONDS)
+        self.budget = RetryBudget(self.RETRY_RATIO, self.RETRY_BURST)
+        self.counts = {'calls': 0, 'failed': 0, 'retries': 0, 'retries_denied': 0, 'rejected': 0}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    @contextmanager
+    def deadline(self, seconds, attempt_timeout=None):
+        """Give calls made inside the block longer (or shorter) than usual.
+        Each attempt may then take up to `attempt_timeout` (default: the
+        whole deadline) instead of the client's own timeout."""
+        previous = (getattr(self._local, 'seconds', None), getattr(self._local, 'attempt_timeout', None))
+        self._local.seconds = seconds
+        self._local.attempt_timeout = attempt_timeout or seconds
+        try:
+            yield
+        finally:
+            self._local.seconds, self._local.attempt_timeout = previous
+
+    def attempt_timeout(self):
+        """Per-attempt timeout set by deadline(), or None outside one"""
+        return getattr(self._local, 'attempt_timeout', None)
+
+    def new_deadline(self):
+        """time.monotonic() by which a call starting now must be done"""
+        return time.monotonic() + (getattr(self._local, 'seconds', None) or self.deadline_seconds)
+
+    def call(self, fn, idempotent=False, deadline=None):
+        """fn() through the breaker, retried on failure if idempotent.
+        Raises CircuitOpenError without calling fn while the breaker is open,
+        and RemoteUnavailable once fn has failed for the last time."""
+        if not self.breaker.allow():
+            self._count('rejected')
+            raise CircuitOpenError(f"{self.name} is unavailable, not calling it for now")
+
+        self._count('calls')
+        self.budget.deposit()
+        deadline = deadline or self.new_deadline()
+        attempt = 0
+        while True:
+            try:
+                result = fn()
+            except Exception as e:
+                if not self.is_failure(e):
+                    self.breaker.success()  # it answered, just not with what we wanted
+                    raise
+                attempt += 1
+                if idempotent and attempt <= self.retries:
+                    # Full jitter, so callers that failed together don't retry together
+                    pause = random.uniform(0, min(self.MAX_BACKOFF_SECONDS, self.BACKOFF_SECONDS * 2 ** attempt))
+                    if time.monotonic() + pause < deadline:
+                        if self.budget.withdraw():
+                            self._count('retries')
+                            time.sleep(pause)
+                            continue
+                        self._count('retries_denied')
+                self._count('failed')
+                self.breaker.failure()
+                raise RemoteUnavailable(f"{self.name} unavailable: {e}") from e
+            self.breaker.success()
+            return result
+
+    def metrics(self):
+        with self._lock:
+            counts = dict(self.counts)
+        counts.update({
+            'state': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'times_opened': self.breaker.times_opened,
+            'retry_tokens': round(self.budget.tokens, 1)
+        })
+        return counts
+
+class GuardedTransport:
+    """httpx transport that sends each request through a Remote.
+
+    GET and HEAD requests are retried; anything that writes is sent once.
+    The response body is read inside the guard, so a body that stalls
+    halfway also counts against the deadline. Inside Remote.deadline() the
+    read, write and pool timeouts come from it rather than the client;
+    connecting keeps the client's timeout."""
+
+    def __init__(self, remote, transport):
+        self.remote = remote
+        self._transport = transport
+
+    def handle_request(self, request):
+        deadline = self.remote.new_deadline()
+        timeouts = dict(request.extensions.get('timeout', {}))
+        lifted = self.remote.attempt_timeout()
+        if lifted:
+            timeouts.update({kind: lifted for kind in ('read', 'write', 'pool')})
+
+        def attempt():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{self.remote.name} deadline passed")
+            request.extensions['timeout'] = {
+                kind: remaining if seconds is None else min(seconds, remaining)
+                for kind, seconds in timeouts.items()
+            } or {'connect': remaining, 'read': remaining, 'write': remaining, 'pool': remaining}
+            response = self._transport.handle_request(request)
+            if response.status_code in UNAVAILABLE_STATUSES:
+                response.close()
+                raise UnavailableResponse(response.status_code)
+            try:
+                response.read()
+            except BaseException:
+                response.close()
+                raise
+            return response
+
+        return self.remote.call(attempt, idempotent=request.method in ('GET', 'HEAD'), deadline=deadline)
+
+    def close(self):
+        self._transport.close()
+
+    def __enter__(self):
+        self._transport.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        self._transport.__exit__(*args)
+
+def http_failure(e):
+    """is_failure for Remotes behind a GuardedTransport"""
+    import httpx
+    return isinstance(e, (httpx.TransportError, UnavailableResponse, TimeoutError))
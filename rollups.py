@@ -0,0 +1,131 @@
+"""
+LockTracker - Nightly rollups
+Builds the daily_usage and daily_sportsbook_bets tables (see
+migrations/0004_daily_rollups.sql and 0009_daily_signups.sql) that /api/admin/rollups serves, so
+reporting never has to scan bets or subscriptions directly.
+
+Each run rebuilds only the days from its checkpoint up to today, so a nightly
+run reads about a day of data. Whole days are rebuilt from the source rows
+rather than added to, which makes a run safe to repeat: if one dies half way,
+the next redoes those days. Days are UTC, like the database timestamps.
+
+    python rollups.py                      # from the checkpoint (first run: from the first bet)
+    python rollups.py --since 2025-01-01   # rebuild from a date
+
+Run it once a night, e.g. as a Railway cron service.
+"""
+
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+CHECKPOINT_NAME = 'daily'
+PAGE_SIZE = 1000
+
+def fetch_day(db, table, columns, column, day, **equals):
+    """Every row of `table` whose `column` timestamp falls on `day`"""
+    start = day.isoformat()
+    end = (day + timedelta(days=1)).isoformat()
+    rows = []
+    while True:
+        query = db.table(table).select(columns).gte(column, start).lt(column, end)
+        for name, value in equals.items():
+            query = query.eq(name, value)
+        page = query.order('id').range(len(rows), len(rows) + PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+
+def count_paid_users(db):
+    response = db.table('subscriptions').select('id', count='exact').eq('status', 'active').limit(1).execute()
+    return response.count or 0
+
+def count_signups(db, day):
+    """Accounts created on `day` (see count_signups() in migrations/0009_daily_signups.sql)"""
+    response = db.rpc('count_signups', {
+        'p_start': day.isoformat(),
+        'p_end': (day + timedelta(days=1)).isoformat()
+    }).execute()
+    return response.data or 0
+
+def rollup_day(db, day, paid_users=None):
+    """Rebuild the summary rows for one day"""
+    bets = fetch_day(db, 'bets', 'id,user_id,sportsbook,source', 'created_at', day)
+    hits = fetch_day(db, 'quota_hits', 'id,user_id', 'created_at', day)
+    started = fetch_day(db, 'subscriptions', 'id', 'created_at', day)
+    cancelled = fetch_day(db, 'subscriptions', 'id', 'updated_at', day, status='cancelled')
+
+    usage = {
+        'day': day.isoformat(),
+        'active_users': len({bet['user_id'] for bet in bets}),
+        'new_bets': len(bets),
+        'extension_bets': sum(1 for bet in bets if bet.get('source') == 'extension'),
+        'quota_hits': len(hits),
+        'quota_hit_users': len({hit['user_id'] for hit in hits}),
+        'signups': count_signups(db, day),
+        'new_paid': len(started),
+        'cancelled': len(cancelled),
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    }
+    if paid_users is not None:
+        usage['paid_users'] = paid_users
+    db.table('daily_usage').upsert(usage, on_conflict='day').execute()
+
+    books = {}
+    for bet in bets:
+        book = books.setdefault(bet.get('sportsbook') or 'Unknown', {'bets': 0, 'users': set()})
+        book['bets'] += 1
+        book['users'].add(bet['user_id'])
+    db.table('daily_sportsbook_bets').delete().eq('day', day.isoformat()).execute()
+    if books:
+        db.table('daily_sportsbook_bets').insert([
+            {'day': day.isoformat(), 'sportsbook': name, 'bets': book['bets'], 'users': len(book['users'])}
+            for name, book in books.items()
+        ]).execute()
+    return usage
+
+def load_checkpoint(db):
+    response = db.table('rollup_checkpoints').select('cursor').eq('name', CHECKPOINT_NAME).execute()
+    return date.fromisoformat(response.data[0]['cursor'][:10]) if response.data else None
+
+def save_checkpoint(db, cursor):
+    db.table('rollup_checkpoints').upsert({
+        'name': CHECKPOINT_NAME,
+        'cursor': cursor.isoformat(),
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    }, on_conflict='name').execute()
+
+def run_rollup(db, since=None):
+    """Rebuild every day from `since` (default: the checkpoint) to today.
+    Returns the number of days rebuilt."""
+    today = datetime.now(timezone.utc).date()
+    if since is None:
+        since = load_checkpoint(db)
+    if since is None:
+        first = db.table('bets').select('created_at').order('created_at').limit(1).execute()
+        if not first.data:
+            print("No bets yet - nothing to roll up")
+            return 0
+        since = date.fromisoformat(first.data[0]['created_at'][:10])
+
+    # Subscriptions are only counted as of now, so only recent days get the figure
+    paid_users = count_paid_users(db)
+
+    day = since
+    while day <= today:
+        usage = rollup_day(db, day, paid_users if day >= today - timedelta(days=1) else None)
+        print(f"{day}: {usage['new_bets']} bets, {usage['active_users']} active users, {usage['quota_hits']} quota hits")
+        # Checkpoint after each day, so a failed run resumes where it stopped
+        save_checkpoint(db, datetime.combine(day, datetime.min.time(), timezone.utc))
+        day += timedelta(days=1)
+    return (today - since).days + 1
+
+if __name__ == '__main__':
+    from app import BATCH_DEADLINE_SECONDS, BATCH_TIMEOUT_SECONDS, supabase_admin, supabase_remote
+
+    since = None
+    if '--since' in sys.argv:
+        since = date.fromisoformat(sys.argv[sys.argv.index('--since') + 1])
+    # A day's rollup reads a lot of rows; give each call longer than a request gets
+    with supabase_remote.deadline(BATCH_DEADLINE_SECONDS, BATCH_TIMEOUT_SECONDS):
+        days = run_rollup(supabase_admin, since)
+    print(f"Rolled up {days} day(s)")
@@ -0,0 +1,84 @@
+"""
+LockTracker - Measure /api/analytics and /api/stats payloads
+Builds chart data from a made-up bet history and compares the default
+response shape with ?format=compact, encoded by Flask's standard JSON
+provider and by the orjson one (when orjson is installed): bytes on the
+wire, gzipped bytes and encode time. The compact payload is also measured
+thinned to CHART_POINTS with ?points= (see downsample_analytics).
+
+    python scripts/bench_payloads.py [bets] [days]     # default 5000 bets over 365 days
+"""
+
+import gzip
+import os
+import random
+import sys
+import timeit
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask.json.provider import DefaultJSONProvider
+
+import app
+
+SPORTS = ['NBA', 'NFL', 'MLB', 'NHL', 'NCAAB', 'NCAAF', 'Soccer', 'Tennis', 'UFC', 'Golf']
+BET_TYPES = ['Spread', 'Moneyline', 'Total', 'Player Prop', 'Parlay', 'Teaser']
+CHART_POINTS = 300  # ?points= the dashboard sends for a ~900px chart
+
+def fake_bets(count, days):
+    random.seed(1)
+    first = date.today() - timedelta(days=days)
+    bets = []
+    for _ in range(count):
+        result = random.choice(['win', 'loss', 'loss', 'win', 'push'])
+        amount = random.choice([5, 10, 20, 25, 50, 100])
+        odds = random.choice([-110, -120, -150, 120, 150, 250])
+        bets.append({
+            'date': (first + timedelta(days=random.randrange(days))).isoformat(),
+            'sport': random.choice(SPORTS),
+            'bet_type': random.choice(BET_TYPES),
+            'result': result,
+            'profit': round(app.calculate_profit(odds, amount, result), 2)
+        })
+    return bets
+
+def measure(payload, provider, repeat=200):
+    """(bytes, gzipped bytes, milliseconds per encode) as jsonify would send it"""
+    body = provider.dumps(payload, separators=(',', ':')).encode()
+    seconds = timeit.timeit(lambda: provider.dumps(payload, separators=(',', ':')), number=repeat) / repeat
+    return len(body), len(gzip.compress(body, compresslevel=6)), seconds * 1000
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+
+    analytics = app.calculate_analytics(fake_bets(count, days))
+    thinned = app.downsample_analytics(analytics, CHART_POINTS)
+    stats = app.calculate_stats({
+        'win': {'count': 1234, 'wagered': 30210.5, 'profit': 25320.75},
+        'loss': {'count': 1100, 'wagered': 28011.0, 'profit': -28011.0},
+        'push': {'count': 42, 'wagered': 990.0, 'profit': 0},
+    })
+    payloads = [
+        ('analytics', analytics),
+        ('analytics compact', app.compact_analytics(analytics)),
+        (f'compact {CHART_POINTS} pts', app.compact_analytics(thinned)),
+        ('stats', stats),
+        ('stats compact', app.compact_stats(stats)),
+    ]
+    providers = [('json', DefaultJSONProvider(app.app))]
+    if app.orjson:
+        providers.append(('orjson', app.FastJSONProvider(app.app)))
+    else:
+        print("orjson isn't installed - only the standard provider is measured")
+
+    print(f"{count} bets over {days} days ({len(analytics['dates'])} chart days)\n")
+    print(f"{'payload':<20}{'encoder':<10}{'bytes':>10}{'gzipped':>10}{'encode ms':>12}")
+    for name, payload in payloads:
+        for encoder, provider in providers:
+            size, gzipped, ms = measure(payload, provider)
+            print(f"{name:<20}{encoder:<10}{size:>10}{gzipped:>10}{ms:>12.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+LockTracker - Show query plans for the app's bet and subscription queries
+Runs EXPLAIN (ANALYZE, BUFFERS) for the SQL that PostgREST generates from
+app.py's queries, so you can check each one uses the indexes in
+migrations/0003_bet_indexes.sql rather than a sequential scan.
+
+    DATABASE_URL=postgresql://... python scripts/explain_queries.py [user_id]
+
+Without a user_id it uses whoever has the most bets. ANALYZE runs the
+queries for real, but they're all reads.
+"""
+
+import os
+import sys
+import uuid
+
+from migrate import psql
+
+QUERIES = [
+    ('Bet list / local cache load (get_user_bets)',
+     "SELECT * FROM bets WHERE user_id = {user} ORDER BY created_at DESC"),
+    ('Pending bets',
+     "SELECT id, sport, matchup, odds, amount FROM bets WHERE user_id = {user} AND result = 'pending' "
+     "ORDER BY created_at DESC"),
+    ('Settled bets for stats',
+     "SELECT result, amount, profit FROM bets WHERE user_id = {user} AND result <> 'pending' "
+     "ORDER BY created_at DESC"),
+    ('Settled bets in a date range (analytics)',
+     "SELECT date, sport, bet_type, result, profit FROM bets WHERE user_id = {user} AND result <> 'pending' "
+     "AND date >= CURRENT_DATE - 30 AND date <= CURRENT_DATE ORDER BY created_at DESC"),
+    ('Monthly quota count (get_monthly_bet_count)',
+     "SELECT count(*) FROM bets WHERE user_id = {user} AND created_at >= date_trunc('month', NOW())"),
+    ('Local cache incremental sync',
+     "SELECT * FROM bets WHERE user_id = {user} AND created_at > NOW() - interval '1 day'"),
+    ('Extension import duplicate probe',
+     "SELECT id FROM bets WHERE user_id = {user} AND matchup = 'Lakers vs Celtics' "
+     "AND bet_description = 'Lakers -3.5' AND amount = 10"),
+    ('Bet search by text (search_bets, 0006_bet_search.sql)',
+     "SELECT * FROM bets WHERE user_id = {user} AND search_text LIKE '%celtics%' "
+     "ORDER BY created_at DESC LIMIT 50"),
+    ('Bet search by sportsbook and odds',
+     "SELECT * FROM bets WHERE user_id = {user} AND sportsbook = 'DraftKings' AND odds >= 150 "
+     "ORDER BY created_at DESC LIMIT 50"),
+    ('Tier lookup (get_user_tier)',
+     "SELECT * FROM subscriptions WHERE user_id = {user} AND status = 'active'"),
+    ('Webhook update target',
+     "SELECT id FROM subscriptions WHERE stripe_subscription_id = 'sub_example'"),
+]
+
+def main():
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        sys.exit('Set DATABASE_URL to the Postgres connection string')
+
+    if len(sys.argv) > 1:
+        user_id = sys.argv[1]
+    else:
+        user_id = psql(database_url, '-c',
+                       'SELECT user_id FROM bets GROUP BY user_id ORDER BY count(*) DESC LIMIT 1').strip()
+        if not user_id:
+            sys.exit('No bets in the database - pass a user_id')
+    user = f"'{uuid.UUID(user_id)}'"  # validated, so safe to inline
+
+    for title, sql in QUERIES:
+        print(f'=== {title}')
+        print(psql(database_url, '-c', f'EXPLAIN (ANALYZE, BUFFERS) {sql.format(user=user)}'))
+
+if __name__ == '__main__':
+    try:
+        main()
+    except RuntimeError as e:
+        sys.exit(f'psql failed: {e}')
@@ -0,0 +1,65 @@
+"""
+LockTracker - Apply database migrations
+Runs every migrations/*.sql file that hasn't been applied yet, in filename
+order, each in its own transaction, and records it in schema_migrations.
+
+Needs psql and the database connection string (Supabase dashboard ->
+Project Settings -> Database -> Connection string):
+
+    DATABASE_URL=postgresql://... python scripts/migrate.py
+    python scripts/migrate.py --status     # list applied / pending files
+"""
+
+import os
+import subprocess
+import sys
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+def psql(database_url, *args):
+    """Run psql, stopping at the first error; returns stdout"""
+    result = subprocess.run(
+        ['psql', database_url, '-v', 'ON_ERROR_STOP=1', '-X', '-q', '-A', '-t', *args],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return result.stdout
+
+def applied_migrations(database_url):
+    psql(database_url, '-c',
+         'CREATE TABLE IF NOT EXISTS schema_migrations ('
+         'name TEXT PRIMARY KEY, applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW())')
+    return set(psql(database_url, '-c', 'SELECT name FROM schema_migrations').split())
+
+def main():
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        sys.exit('Set DATABASE_URL to the Postgres connection string')
+
+    applied = applied_migrations(database_url)
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith('.sql'))
+
+    if '--status' in sys.argv:
+        for name in files:
+            print(f"{'applied' if name in applied else 'pending'}  {name}")
+        return
+
+    pending = [name for name in files if name not in applied]
+    if not pending:
+        print('Database is up to date')
+        return
+
+    for name in pending:
+        print(f'Applying {name}...')
+        # -1 wraps the file and its bookkeeping row in one transaction
+        psql(database_url, '-1',
+             '-f', os.path.join(MIGRATIONS_DIR, name),
+             '-c', f"INSERT INTO schema_migrations (name) VALUES ('{name}')")
+    print(f'Applied {len(pending)} migration(s)')
+
+if __name__ == '__main__':
+    try:
+        main()
+    except RuntimeError as e:
+        sys.exit(f'Migration failed: {e}')
@@ -0,0 +1,142 @@
+"""
+LockTracker - Concurrent login/logout stress test
+Runs many logins and logouts at once through the real Flask routes and
+checks that no request ever ends up with another user's session.
+
+The auth server is a small fake of Supabase Auth running in this process.
+It answers each login after a random delay, so requests overlap and finish
+out of order. Each login gets its own token, and the script checks:
+
+- every session holds the user and token issued for its own email
+- every logout revokes exactly the token of the user logging out
+
+    python scripts/stress_auth.py [threads] [rounds]    # default 32 threads x 25 rounds
+
+Exits non-zero if any session crossed.
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+class FakeAuth(BaseHTTPRequestHandler):
+    """Just enough of /auth/v1 for login, logout and get_user"""
+    protocol_version = 'HTTP/1.1'  # keep-alive, so the shared connection pool is exercised
+    tokens = {}        # access token -> email
+    revoked = []       # (token, email) in the order logouts arrived
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body=None):
+        data = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def user(self, email):
+        return {'id': str(uuid.uuid5(uuid.NAMESPACE_DNS, email)), 'aud': 'authenticated', 'role': 'authenticated',
+                'email': email, 'email_confirmed_at': '2025-01-01T00:00:00Z', 'app_metadata': {},
+                'user_metadata': {}, 'created_at': '2025-01-01T00:00:00Z'}
+
+    def bearer(self):
+        return self.headers.get('Authorization', '').removeprefix('Bearer ')
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        time.sleep(random.uniform(0, 0.02))  # let requests overtake each other
+        if self.path.startswith('/auth/v1/token'):
+            token = f"token-{uuid.uuid4()}"
+            with self.lock:
+                self.tokens[token] = body['email']
+            self.reply(200, {'access_token': token, 'token_type': 'bearer', 'expires_in': 3600,
+                             'expires_at': int(time.time()) + 3600, 'refresh_token': uuid.uuid4().hex,
+                             'user': self.user(body['email'])})
+        elif self.path.startswith('/auth/v1/logout'):
+            token = self.bearer()
+            with self.lock:
+                self.revoked.append((token, self.tokens.get(token)))
+            self.reply(204)
+        else:
+            self.reply(404, {'msg': 'not found'})
+
+    def do_GET(self):
+        email = self.tokens.get(self.bearer())
+        if self.path.startswith('/auth/v1/user') and email:
+            self.reply(200, self.user(email))
+        else:
+            self.reply(401, {'msg': 'invalid token'})
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+    ThreadingHTTPServer.request_queue_size = 128  # the default of 5 resets connections under load
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeAuth)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['SUPABASE_URL'] = f'http://127.0.0.1:{server.server_port}'
+    os.environ['SUPABASE_KEY'] = 'anon-key'
+    os.environ.setdefault('SUPABASE_SERVICE_KEY', 'service-key')
+
+    import app
+    failures = []
+    failures_lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def fail(message):
+        with failures_lock:
+            failures.append(message)
+
+    def run(worker):
+        client = app.app.test_client()
+        email = f'user{worker}@example.com'
+        start.wait()  # every thread logs in at the same moment
+        for _ in range(rounds):
+            response = client.post('/login', data={'email': email, 'password': 'secret'})
+            if response.status_code != 302:
+                fail(f'{email}: login returned {response.status_code}')
+                return
+            with client.session_transaction() as sess:
+                user, token = sess.get('user', {}), sess.get('access_token')
+            if user.get('email') != email or FakeAuth.tokens.get(token) != email:
+                fail(f"{email}: session holds {user.get('email')} with a token for {FakeAuth.tokens.get(token)}")
+            client.get('/logout')
+
+    started = time.time()
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - started
+
+    for token, email in FakeAuth.revoked:
+        if email is None:
+            fail(f'logout revoked an unknown token {token}')
+    logins = threads * rounds
+    if len(FakeAuth.revoked) != logins:
+        fail(f'{len(FakeAuth.revoked)} logouts reached the auth server for {logins} logins')
+    if len({token for token, _ in FakeAuth.revoked}) != len(FakeAuth.revoked):
+        fail('a token was revoked twice - some logout ended another session')
+
+    server.shutdown()
+    print(f"{logins} logins and logouts on {threads} threads in {elapsed:.1f}s")
+    if failures:
+        print(f"FAILED: {len(failures)} crossed sessions")
+        for message in failures[:10]:
+            print(f"  {message}")
+        sys.exit(1)
+    print("OK: every session and logout belonged to its own user")
+
+if __name__ == '__main__':
+    main()
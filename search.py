@@ -0,0 +1,62 @@
+"""
+LockTracker - Bet search
+Search terms are matched as substrings of a bet's matchup and description,
+the same way in both places /api/bets/search can run:
+
+- Supabase: the search_bets() function and trigram index in
+  migrations/0006_bet_search.sql
+- the local cache: a TrigramIndex per user, kept in memory by each worker.
+  A term's trigrams narrow the user's bets to a few candidates, which are
+  then checked for the whole term.
+"""
+
+MAX_TERMS = 5
+
+def search_terms(query):
+    """Lower-cased terms from a search box string"""
+    return (query or '').lower().split()[:MAX_TERMS]
+
+def escape_like(term):
+    """A term as a literal inside a LIKE pattern"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_text(matchup, bet_description):
+    """The text a bet is searched by - same as the search_text column"""
+    return ' '.join(part for part in (matchup, bet_description) if part is not None).lower()
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TrigramIndex:
+    """Inverted index from trigram to bet ids for one user's bets"""
+
+    def __init__(self, loaded_at):
+        self.loaded_at = loaded_at  # the local cache load this index was built from
+        self.cursor = None          # newest created_at indexed
+        self.texts = {}
+        self.postings = {}
+
+    def add(self, rows):
+        """Index (id, matchup, bet_description, created_at) rows"""
+        for bet_id, matchup, bet_description, created_at in rows:
+            text = search_text(matchup, bet_description)
+            self.texts[bet_id] = text
+            for gram in trigrams(text):
+                self.postings.setdefault(gram, set()).add(bet_id)
+            if created_at and (self.cursor is None or created_at > self.cursor):
+                self.cursor = created_at
+
+    def match(self, terms):
+        """Ids of bets containing every term"""
+        candidates = None
+        # Rarest trigrams first, so the intersection shrinks fastest
+        grams = sorted({gram for term in terms for gram in trigrams(term)},
+                       key=lambda gram: len(self.postings.get(gram, ())))
+        for gram in grams:
+            postings = self.postings.get(gram, set())
+            candidates = set(postings) if candidates is None else candidates & postings
+            if not candidates:
+                return set()
+        if candidates is None:  # only terms shorter than three letters
+            candidates = self.texts.keys()
+        return {bet_id for bet_id in candidates if all(term in self.texts[bet_id] for term in terms)}
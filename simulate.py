@@ -0,0 +1,194 @@
+"""
+LockTracker - Bankroll simulation
+What a betting record implies going forward: thousands of bankroll paths are
+played out bet by bet from the user's settled bets and summed up as
+percentile bands, drawdowns and risk of ruin.
+
+Each simulated bet copies one of the user's past bets picked at random, so
+the mix of sports and odds matches their history. Its outcome is either:
+
+- 'bootstrap': that past bet's own result, or
+- 'grouped' (default): drawn from the win and push rates of the user's bets
+  in the same sport and odds bucket, pulled toward the odds' implied
+  probability by PRIOR_BETS pretend bets, so a 3-0 group isn't a sure thing
+
+Staking:
+
+- flat: the same stake every bet
+- percent: a fixed fraction of the current bankroll
+- kelly: the Kelly fraction for the bet's estimated edge times
+  kelly_fraction, at most MAX_KELLY; bets without an edge are skipped
+
+A path is ruined once its bankroll falls below `ruin` times the starting
+bankroll (or, staking flat, below one stake), and stops betting there. Paths are simulated as NumPy arrays
+(paths x bets), a block of about BLOCK_CELLS at a time, so memory stays flat
+however many paths are asked for. run_paths() is what the app sends to its
+process pool; summarise() merges the pieces.
+
+numpy is optional: without it available() is False.
+"""
+
+try:
+    import numpy as np  # optional - only needed for simulations
+except ImportError:
+    np = None
+
+STAKING = ['flat', 'percent', 'kelly']
+METHODS = ['grouped', 'bootstrap']
+RESULTS = {'win', 'loss', 'push'}
+
+# Upper edges of the odds buckets, as profit per 1 staked:
+# -200 or shorter, to -105, to +150, to +300, longer
+ODDS_BUCKET_EDGES = [0.5, 0.95, 1.5, 3.0]
+ODDS_BUCKET_NAMES = ['-200 or shorter', '-199 to -105', '-104 to +150', '+151 to +300', 'over +300']
+PRIOR_BETS = 20
+MAX_KELLY = 0.25
+BLOCK_CELLS = 1_000_000
+BAND_POINTS = 100
+PERCENTILES = [5, 25, 50, 75, 95]
+
+def available():
+    return np is not None
+
+def payout(odds):
+    """Profit per 1 staked on a win at American odds"""
+    return odds / 100 if odds > 0 else 100 / abs(odds)
+
+def prepare(bets):
+    """Arrays describing a record, from settled bets with odds, amount,
+    result and sport. Bets without usable odds are left out."""
+    rows = [bet for bet in bets if bet.get('odds') and bet.get('result') in RESULTS]
+    if not rows:
+        return None
+
+    b = np.array([payout(bet['odds']) for bet in rows])
+    result = np.array([bet['result'] for bet in rows])
+    won, pushed = result == 'win', result == 'push'
+    returns = np.where(won, b, np.where(pushed, 0.0, -1.0))
+
+    sports = sorted({bet['sport'] or '' for bet in rows})
+    sport_ids = np.array([sports.index(bet['sport'] or '') for bet in rows])
+    buckets = np.searchsorted(ODDS_BUCKET_EDGES, b)
+    groups, group_ids = np.unique(sport_ids * len(ODDS_BUCKET_NAMES) + buckets, return_inverse=True)
+
+    count = np.bincount(group_ids)
+    wins = np.bincount(group_ids, weights=won)
+    pushes = np.bincount(group_ids, weights=pushed)
+    implied = np.bincount(group_ids, weights=1 / (1 + b)) / count
+    # Win probability of a bet that doesn't push, shrunk toward the odds
+    decided_win = (wins + PRIOR_BETS * implied) / (count - pushes + PRIOR_BETS)
+    push_rate = pushes / count
+
+    p = decided_win[group_ids] * (1 - push_rate[group_ids])
+    q = (1 - decided_win[group_ids]) * (1 - push_rate[group_ids])
+    return {
+        'b': b,
+        'returns': returns,
+        'stakes': np.array([float(bet['amount'] or 0) for bet in rows]),
+        'group_ids': group_ids,
+        'win_prob': decided_win * (1 - push_rate),
+        'push_rate': push_rate,
+        'kelly': np.clip((b * p - q) / b, 0, None),  # full Kelly for each past bet
+        'groups': [{
+            'sport': sports[group // len(ODDS_BUCKET_NAMES)],
+            'odds': ODDS_BUCKET_NAMES[group % len(ODDS_BUCKET_NAMES)],
+            'bets': int(count[i]),
+            'win_rate': round(float(wins[i] / count[i] * 100), 1),
+            'win_probability': round(float(decided_win[i] * (1 - push_rate[i]) * 100), 1)
+        } for i, group in enumerate(groups)]
+    }
+
+def band_steps(bets):
+    """Steps (bets placed) at which percentile bands are reported"""
+    return np.unique(np.linspace(1, bets, min(bets, BAND_POINTS)).round().astype(int))
+
+def run_paths(record, params, paths, seed):
+    """Simulate `paths` paths; returns the bankroll at each band step, the
+    final bankroll, the max drawdown and whether each path was ruined"""
+    rng = np.random.default_rng(seed)
+    bets = params['bets']
+    start = params['bankroll']
+    ruin_level = start * params['ruin']
+    if params['staking'] == 'flat':
+        ruin_level = max(ruin_level, params['stake'])
+    steps = band_steps(bets) - 1
+    block = max(1, BLOCK_CELLS // bets)
+
+    parts = []
+    for first in range(0, paths, block):
+        m = min(block, paths - first)
+        picks = rng.integers(0, len(record['b']), size=(m, bets))
+
+        if params['method'] == 'bootstrap':
+            r = record['returns'][picks]
+        else:
+            groups = record['group_ids'][picks]
+            u = rng.random((m, bets))
+            r = np.where(u < record['win_prob'][groups], record['b'][picks],
+                         np.where(u >= 1 - record['push_rate'][groups], 0.0, -1.0))
+
+        if params['staking'] == 'flat':
+            change = params['stake'] * r
+            bankroll = start + np.cumsum(change, axis=1)
+        else:
+            if params['staking'] == 'kelly':
+                fraction = np.minimum(record['kelly'][picks] * params['kelly_fraction'], MAX_KELLY)
+            else:
+                fraction = params['fraction']
+            growth = 1 + fraction * r
+            bankroll = start * np.cumprod(growth, axis=1)
+
+        # Ruined paths stop betting: undo every step after the first ruin
+        hit = bankroll < ruin_level
+        stopped = np.zeros_like(hit)
+        stopped[:, 1:] = np.logical_or.accumulate(hit, axis=1)[:, :-1]
+        if stopped.any():
+            if params['staking'] == 'flat':
+                change[stopped] = 0
+                bankroll = start + np.cumsum(change, axis=1)
+            else:
+                growth[stopped] = 1
+                bankroll = start * np.cumprod(growth, axis=1)
+
+        peak = np.maximum(np.maximum.accumulate(bankroll, axis=1), start)
+        drawdown = ((peak - bankroll) / peak).max(axis=1)
+        parts.append((bankroll[:, steps].astype(np.float32), bankroll[:, -1], drawdown, hit.any(axis=1)))
+
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+def summarise(record, params, results):
+    """Merge run_paths() results into the response"""
+    bands, final, drawdown, ruined = (np.concatenate(column) for column in zip(*results))
+    start = params['bankroll']
+    band = np.percentile(bands, PERCENTILES, axis=0)
+    money = lambda values: [round(float(value), 2) for value in values]
+
+    stakes = record['stakes']
+    return {
+        'paths': int(len(final)),
+        'bets': params['bets'],
+        'staking': params['staking'],
+        'method': params['method'],
+        'starting_bankroll': start,
+        'bands': dict(
+            {'step': [0] + band_steps(params['bets']).tolist()},
+            **{f'p{pct}': [start] + money(values) for pct, values in zip(PERCENTILES, band)}
+        ),
+        'final': dict(
+            {f'p{pct}': value for pct, value in zip(PERCENTILES, money(np.percentile(final, PERCENTILES)))},
+            mean=round(float(final.mean()), 2),
+            profit_probability=round(float((final > start).mean() * 100), 1)
+        ),
+        'max_drawdown': {
+            'p50': round(float(np.percentile(drawdown, 50) * 100), 1),
+            'p95': round(float(np.percentile(drawdown, 95) * 100), 1),
+            'mean': round(float(drawdown.mean() * 100), 1)
+        },
+        'risk_of_ruin': round(float(ruined.mean() * 100), 2),
+        'record': {
+            'bets': int(len(record['b'])),
+            'win_rate': round(float((record['returns'] > 0).mean() * 100), 1),
+            'roi': round(float((record['returns'] * stakes).sum() / stakes.sum() * 100), 1) if stakes.sum() else 0,
+            'groups': record['groups']
+        }
+    }
@@ -0,0 +1,73 @@
+"""
+LockTracker - Request coalescing
+When several requests in one worker ask for the same thing at the same
+moment (a dashboard tab, an analytics tab and the extension popup all
+loading one user's bets), only the first runs the query. The others wait for
+it and get a copy of its result, or its exception.
+
+    flights = SingleFlight()
+    bets = flights.do(('user_bets', user_id, columns), fetch)
+
+The first item of a key names it in the metrics: how many calls ran
+(issued) and how many shared another call's result (coalesced).
+"""
+
+import copy
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Concurrent calls with the same key share one run of the function"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._metrics = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            counts = self._metrics.setdefault(key[0], {'issued': 0, 'coalesced': 0})
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                counts['issued'] += 1
+            else:
+                call.waiters += 1
+                counts['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            call.error = e
+            call.done.set()
+            raise
+
+        with self._lock:
+            del self._calls[key]  # later callers start a new call
+            waiting = call.waiters
+        if waiting:
+            # Callers change the lists they get back (sort, +=), so the
+            # waiters copy a snapshot taken before ours is handed back
+            call.result = copy.deepcopy(result)
+        call.done.set()
+        return result
+
+    def metrics(self):
+        """{name: {'issued': n, 'coalesced': n}} since the worker started"""
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._metrics.items()}
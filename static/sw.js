@@ -1,18 +1,19 @@
 // LockTracker Service Worker
-const CACHE_NAME = 'locktracker-v1';
-const STATIC_ASSETS = [
-  '/static/style.css',
-  '/static/favicon.svg',
-  '/static/manifest.json',
+// Registered as /sw.js?v=<asset version>. A new asset version means a new
+// worker URL, so the browser installs a fresh worker with a fresh cache.
+const ASSET_VERSION = new URL(self.location).searchParams.get('v') || 'dev';
+const CACHE_NAME = `locktracker-${ASSET_VERSION}`;
+const EXTERNAL_ASSETS = [
   'https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap'
 ];
 
-// Install - cache static assets
+// Install - precache the fingerprinted assets listed by the server
 self.addEventListener('install', (event) => {
   event.waitUntil(
-    caches.open(CACHE_NAME).then((cache) => {
-      return cache.addAll(STATIC_ASSETS);
-    })
+    fetch('/asset-manifest.json')
+      .then((response) => response.json())
+      .then((manifest) => caches.open(CACHE_NAME)
+        .then((cache) => cache.addAll(manifest.assets.concat(EXTERNAL_ASSETS))))
   );
   self.skipWaiting();
 });
@@ -31,7 +32,7 @@ self.addEventListener('activate', (event) => {
   self.clients.claim();
 });
 
-// Fetch - network first, fallback to cache for static assets
+// Fetch - fingerprinted static files never change, so serve them from cache
 self.addEventListener('fetch', (event) => {
   const { request } = event;
   const url = new URL(request.url);
@@ -42,30 +43,35 @@ self.addEventListener('fetch', (event) => {
   // Skip API requests - always go to network
   if (url.pathname.startsWith('/api/')) return;
 
-  // For static assets, try cache first then network
   if (url.pathname.startsWith('/static/')) {
-    event.respondWith(
-      caches.match(request).then((cached) => {
-        if (cached) {
-          // Return cached but also update in background
-          fetch(request).then((response) => {
+    // Fingerprinted (?v=hash): cache first, no revalidation needed
+    if (url.searchParams.has('v')) {
+      event.respondWith(
+        caches.match(request).then((cached) => {
+          if (cached) return cached;
+          return fetch(request).then((response) => {
             if (response.ok) {
-              caches.open(CACHE_NAME).then((cache) => {
-                cache.put(request, response);
-              });
+              const clone = response.clone();
+              caches.open(CACHE_NAME).then((cache) => cache.put(request, clone));
             }
+            return response;
           });
-          return cached;
-        }
-        return fetch(request).then((response) => {
+        })
+      );
+      return;
+    }
+
+    // Unversioned static URL: serve cached copy, refresh it in the background
+    event.respondWith(
+      caches.match(request).then((cached) => {
+        const network = fetch(request).then((response) => {
           if (response.ok) {
             const clone = response.clone();
-            caches.open(CACHE_NAME).then((cache) => {
-              cache.put(request, clone);
-            });
+            caches.open(CACHE_NAME).then((cache) => cache.put(request, clone));
           }
           return response;
         });
+        return cached || network;
       })
     );
     return;
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from cache import FileCache, MemoryCache, make_cache
+
+@pytest.fixture(params=['memory', 'file'])
+def cache(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryCache()
+    return FileCache(str(tmp_path / 'cache.db'))
+
+def test_invalidate_user_moves_to_a_new_namespace(cache):
+    key = cache.user_key('u1', 'stats')
+    cache.set(key, {'total_bets': 3}, 60)
+    other = cache.user_key('u2', 'stats')
+    cache.set(other, {'total_bets': 1}, 60)
+
+    cache.invalidate_user('u1')
+    assert cache.user_key('u1', 'stats') != key
+    assert cache.get(cache.user_key('u1', 'stats')) is None
+    # Other users keep theirs
+    assert cache.get(cache.user_key('u2', 'stats')) == {'total_bets': 1}
+
+    cache.invalidate_user('u1')
+    assert len({key, cache.user_key('u1', 'stats')}) == 2
+
+def test_namespace_versions_survive_eviction():
+    cache = MemoryCache(max_entries=3)
+    cache.invalidate_user('u1')
+    old_key = 'u:u1:0:stats'
+    cache.set(old_key, 'before', 60)
+    for i in range(10):
+        cache.set(f'filler:{i}', i, 60)
+    cache.set(old_key, 'before', 60)  # a late write into the old namespace
+    assert cache.user_key('u1', 'stats') == 'u:u1:1:stats'
+    assert cache.get(cache.user_key('u1', 'stats')) is None
+
+def test_entries_expire(cache):
+    cache.set('k', 'v', 0.05)
+    assert cache.get('k') == 'v'
+    time.sleep(0.1)
+    assert cache.get('k') is None
+
+def test_get_or_set_computes_once_for_concurrent_callers(cache):
+    calls = []
+    started = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'value': 42}
+
+    results = []
+
+    def worker():
+        started.wait()
+        results.append(cache.get_or_set('stats', compute, 60))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{'value': 42}] * 8
+
+def test_failed_compute_releases_the_lock(cache):
+    def broken():
+        raise RuntimeError('supabase down')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_set('stats', broken, 60)
+    assert cache.get_raw('lock:stats') is None
+
+    # The next caller computes straight away instead of waiting out LOCK_SECONDS
+    start = time.time()
+    assert cache.get_or_set('stats', lambda: 'fresh', 60) == 'fresh'
+    assert time.time() - start < 1
+    assert cache.get_raw('lock:stats') is None
+
+def test_stuck_lock_holder_is_waited_out(cache, monkeypatch):
+    monkeypatch.setattr(cache, 'LOCK_SECONDS', 0.2)
+    assert cache.add_raw('lock:stats', '1', 60)  # another process died holding it
+    assert cache.get_or_set('stats', lambda: 'computed', 60) == 'computed'
+
+def test_add_raw_only_sets_missing_keys(cache):
+    assert cache.add_raw('lock:k', '1', 60)
+    assert not cache.add_raw('lock:k', '1', 60)
+    cache.delete('lock:k')
+    assert cache.add_raw('lock:k', '1', 60)
+
+def test_make_cache_picks_the_backend(tmp_path):
+    assert isinstance(make_cache(None), MemoryCache)
+    assert isinstance(make_cache('memory://'), MemoryCache)
+    assert isinstance(make_cache(f'file://{tmp_path}/cache.db'), FileCache)
+    with pytest.raises(ValueError):
+        make_cache('memcached://localhost')
@@ -0,0 +1,76 @@
+import pytest
+
+from local_cache import LocalBetCache
+
+def bet(id, created_at, result='pending', user_id='u1', **fields):
+    row = {'id': id, 'user_id': user_id, 'date': created_at[:10], 'sport': 'NBA', 'bet_type': 'Spread',
+           'sportsbook': 'FanDuel', 'result': result, 'odds': -110, 'amount': 10.0, 'profit': 0,
+           'created_at': created_at}
+    row.update(fields)
+    return row
+
+@pytest.fixture
+def cache(tmp_path):
+    return LocalBetCache(str(tmp_path / 'bets.db'), max_users=2)
+
+def test_load_then_add_moves_the_cursor(cache):
+    assert cache.sync_state('u1') is None
+    assert cache.load('u1', [bet(1, '2025-01-01T10:00:00'), bet(2, '2025-01-03T10:00:00')], archive_version='v1')
+    cursor, _, archive_version = cache.sync_state('u1')
+    assert cursor == '2025-01-03T10:00:00'
+    assert archive_version == 'v1'
+
+    assert cache.add('u1', [bet(3, '2025-01-05T10:00:00')])
+    assert cache.sync_state('u1')[0] == '2025-01-05T10:00:00'
+    # Nothing new keeps the cursor where it was
+    assert cache.add('u1', [])
+    assert cache.sync_state('u1')[0] == '2025-01-05T10:00:00'
+    assert [row['id'] for row in cache.get_bets('u1')] == [3, 2, 1]
+
+def test_load_replaces_everything(cache):
+    cache.load('u1', [bet(1, '2025-01-01T10:00:00'), bet(2, '2025-01-03T10:00:00')])
+    cache.load('u1', [bet(2, '2025-01-03T10:00:00', result='win', profit=9.09)])
+    assert cache.get_bets('u1') == [bet(2, '2025-01-03T10:00:00', result='win', profit=9.09)]
+
+def test_invalidate_drops_only_that_user(cache):
+    cache.load('u1', [bet(1, '2025-01-01T10:00:00')])
+    cache.load('u2', [bet(2, '2025-01-01T10:00:00', user_id='u2')])
+    cache.invalidate('u1')
+    assert cache.sync_state('u1') is None
+    assert cache.get_bets('u1') == []
+    assert [row['id'] for row in cache.get_bets('u2')] == [2]
+
+def test_sync_started_before_an_invalidate_is_discarded(cache):
+    cache.load('u1', [bet(1, '2025-01-01T10:00:00')])
+    generation = cache.generation('u1')
+    # ...rows are read from Supabase, then a write elsewhere invalidates...
+    cache.invalidate('u1')
+    assert not cache.add('u1', [bet(2, '2025-01-02T10:00:00')], generation=generation)
+    assert not cache.load('u1', [bet(1, '2025-01-01T10:00:00')], generation=generation)
+    assert cache.sync_state('u1') is None
+
+    generation = cache.generation('u1')
+    assert cache.load('u1', [bet(1, '2025-01-01T10:00:00', result='win')], generation=generation)
+    assert cache.get_bets('u1')[0]['result'] == 'win'
+
+def test_generations_are_shared_through_the_file(cache):
+    other_worker = LocalBetCache(cache.path)
+    generation = cache.generation('u1')
+    other_worker.invalidate('u1')
+    assert not cache.load('u1', [bet(1, '2025-01-01T10:00:00')], generation=generation)
+
+def test_least_recently_used_users_are_evicted(cache):
+    cache.load('u1', [bet(1, '2025-01-01T10:00:00')])
+    cache.load('u2', [bet(2, '2025-01-01T10:00:00', user_id='u2')])
+    cache.touch('u1')
+    cache.load('u3', [bet(3, '2025-01-01T10:00:00', user_id='u3')])
+    assert cache.sync_state('u2') is None
+    assert cache.sync_state('u1') is not None
+    assert cache.sync_state('u3') is not None
+
+def test_settled_status_and_dates_filter(cache):
+    cache.load('u1', [bet(1, '2025-01-01T10:00:00', result='win'), bet(2, '2025-01-05T10:00:00'),
+                      bet(3, '2025-02-01T10:00:00', result='loss')])
+    assert [row['id'] for row in cache.get_bets('u1', status='settled')] == [3, 1]
+    assert [row['id'] for row in cache.get_bets('u1', start_date='2025-01-02', end_date='2025-01-31')] == [2]
+    assert cache.get_bets('u1', status='win', columns=['id', 'result']) == [{'id': 1, 'result': 'win'}]
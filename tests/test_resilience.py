@@ -0,0 +1,174 @@
+import httpx
+import pytest
+
+import resilience
+from resilience import CircuitOpenError, GuardedTransport, Remote, RemoteUnavailable, RetryBudget
+
+class Clock:
+    """Stands in for the time module so tests don't sleep"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience, 'time', clock)
+    return clock
+
+def failing(error=ConnectionError):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise error('down')
+    return fn, calls
+
+def test_breaker_opens_after_threshold_failures(clock):
+    remote = Remote('test', deadline=8, retries=0)
+    fn, calls = failing()
+    for _ in range(Remote.FAILURE_THRESHOLD):
+        with pytest.raises(RemoteUnavailable):
+            remote.call(fn)
+    assert remote.breaker.state == 'open'
+
+    with pytest.raises(CircuitOpenError):
+        remote.call(fn)
+    assert len(calls) == Remote.FAILURE_THRESHOLD
+    assert remote.metrics()['rejected'] == 1
+    assert remote.metrics()['times_opened'] == 1
+
+def test_half_open_trial_closes_or_reopens(clock):
+    remote = Remote('test', deadline=8, retries=0)
+    fn, _ = failing()
+    for _ in range(Remote.FAILURE_THRESHOLD):
+        with pytest.raises(RemoteUnavailable):
+            remote.call(fn)
+
+    # A failed trial reopens at once
+    clock.now += Remote.RESET_SECONDS
+    with pytest.raises(RemoteUnavailable):
+        remote.call(fn)
+    assert remote.breaker.state == 'open'
+    assert remote.metrics()['times_opened'] == 2
+
+    # A successful one closes it
+    clock.now += Remote.RESET_SECONDS
+    assert remote.call(lambda: 'ok') == 'ok'
+    assert remote.breaker.state == 'closed'
+    assert remote.breaker.failures == 0
+
+def test_one_trial_at_a_time(clock):
+    breaker = resilience.CircuitBreaker(threshold=1, reset_seconds=30)
+    breaker.failure()
+    clock.now += 30
+    assert breaker.allow()
+    assert not breaker.allow()
+    # A trial that never reports back stops blocking after reset_seconds
+    clock.now += 30
+    assert breaker.allow()
+
+def test_answered_errors_pass_through(clock):
+    remote = Remote('test', deadline=8)
+    fn, calls = failing(ValueError)
+    for _ in range(Remote.FAILURE_THRESHOLD + 1):
+        with pytest.raises(ValueError):
+            remote.call(fn, idempotent=True)
+    assert len(calls) == Remote.FAILURE_THRESHOLD + 1
+    assert remote.breaker.state == 'closed'
+    assert remote.metrics()['failed'] == 0
+
+def test_only_idempotent_calls_retry(clock):
+    remote = Remote('test', deadline=8, retries=2)
+    fn, calls = failing()
+    with pytest.raises(RemoteUnavailable):
+        remote.call(fn)
+    assert len(calls) == 1
+
+    fn, calls = failing()
+    with pytest.raises(RemoteUnavailable):
+        remote.call(fn, idempotent=True)
+    assert len(calls) == 3
+    assert remote.metrics()['retries'] == 2
+
+def test_retry_budget_runs_out(clock):
+    remote = Remote('test', deadline=8, retries=2)
+    remote.budget = RetryBudget(ratio=0, burst=1)
+    fn, calls = failing()
+    with pytest.raises(RemoteUnavailable):
+        remote.call(fn, idempotent=True)
+    assert len(calls) == 2
+    assert remote.metrics()['retries'] == 1
+    assert remote.metrics()['retries_denied'] == 1
+
+def test_budget_refills_with_calls():
+    budget = RetryBudget(ratio=0.5, burst=1)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+
+def test_no_retry_past_the_deadline(clock):
+    remote = Remote('test', deadline=8, retries=2)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        clock.now += 8
+        raise TimeoutError('slow')
+    with pytest.raises(RemoteUnavailable):
+        remote.call(slow, idempotent=True)
+    assert len(calls) == 1
+
+def seen_timeouts(remote, client_timeout):
+    seen = []
+
+    def handler(request):
+        seen.append(request.extensions['timeout'])
+        return httpx.Response(200, json=[])
+    client = httpx.Client(transport=GuardedTransport(remote, httpx.MockTransport(handler)), timeout=client_timeout)
+    client.get('http://supabase.test/rest/v1/bets')
+    return seen[0]
+
+def test_attempt_timeouts_capped_by_client_and_deadline():
+    remote = Remote('test', deadline=3)
+    timeouts = seen_timeouts(remote, httpx.Timeout(5))
+    assert all(seconds <= 3 for seconds in timeouts.values())
+
+    timeouts = seen_timeouts(Remote('test', deadline=8), httpx.Timeout(5))
+    assert timeouts == {'connect': 5, 'read': 5, 'write': 5, 'pool': 5}
+
+def test_raised_deadline_lifts_attempt_timeout():
+    remote = Remote('test', deadline=8)
+    with remote.deadline(60, 30):
+        timeouts = seen_timeouts(remote, httpx.Timeout(5))
+    assert timeouts['connect'] == 5
+    assert timeouts['read'] == timeouts['write'] == timeouts['pool'] == 30
+
+    with remote.deadline(60):
+        timeouts = seen_timeouts(remote, httpx.Timeout(5))
+    assert 55 < timeouts['read'] <= 60
+
+    # ...and only inside the block
+    assert seen_timeouts(remote, httpx.Timeout(5))['read'] == 5
+
+def test_unavailable_status_counts_as_failure(clock):
+    remote = Remote('test', deadline=8, retries=0, is_failure=resilience.http_failure)
+    client = httpx.Client(transport=GuardedTransport(remote, httpx.MockTransport(lambda request: httpx.Response(503))))
+    for _ in range(Remote.FAILURE_THRESHOLD):
+        with pytest.raises(RemoteUnavailable):
+            client.get('http://supabase.test/rest/v1/bets')
+    assert remote.breaker.state == 'open'
+
+    # A 4xx is an answer, not an outage
+    remote = Remote('test', deadline=8, retries=0, is_failure=resilience.http_failure)
+    client = httpx.Client(transport=GuardedTransport(remote, httpx.MockTransport(lambda request: httpx.Response(409))))
+    assert client.get('http://supabase.test/rest/v1/bets').status_code == 409
+    assert remote.breaker.failures == 0
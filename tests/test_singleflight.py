@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+def run_together(count, fn):
+    """Call fn() from `count` threads at once; returns (results, errors)"""
+    results, errors = [], []
+    barrier = threading.Barrier(count)
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+def test_concurrent_calls_share_one_run():
+    flights = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return [{'id': 1}]
+
+    results, errors = run_together(6, lambda: flights.do(('user_bets', 'u1'), fetch))
+    assert not errors
+    assert len(calls) == 1
+    assert results == [[{'id': 1}]] * 6
+    assert flights.metrics() == {'user_bets': {'issued': 1, 'coalesced': 5}}
+
+def test_waiters_get_their_own_copy():
+    flights = SingleFlight()
+    results, _ = run_together(3, lambda: flights.do(('user_bets', 'u1'), lambda: time.sleep(0.1) or [3, 1, 2]))
+    results[0].append(4)
+    results[1].sort()
+    assert [3, 1, 2] in results
+
+def test_errors_reach_every_waiter():
+    flights = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        raise ConnectionError('supabase down')
+
+    results, errors = run_together(5, lambda: flights.do(('user_bets', 'u1'), fetch))
+    assert not results
+    assert len(calls) == 1
+    assert len(errors) == 5
+    assert all(isinstance(e, ConnectionError) for e in errors)
+
+def test_a_failed_call_is_not_remembered():
+    flights = SingleFlight()
+    with pytest.raises(ValueError):
+        flights.do(('tier', 'u1'), lambda: (_ for _ in ()).throw(ValueError('bad')))
+    assert flights.do(('tier', 'u1'), lambda: 'free') == 'free'
+    assert flights.metrics()['tier']['issued'] == 2
+
+def test_different_keys_run_separately():
+    flights = SingleFlight()
+    calls = []
+
+    def fetch(user_id):
+        calls.append(user_id)
+        time.sleep(0.05)
+        return user_id
+
+    results, _ = run_together(2, lambda: flights.do(('tier', threading.get_ident()), lambda: fetch(threading.get_ident())))
+    assert len(calls) == 2
+    assert sorted(results) == sorted(calls)